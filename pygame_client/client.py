@@ -9,8 +9,23 @@ import websockets
 import json
 import time
 import sys
-from typing import Optional, Dict
+import queue
+import struct
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, List, Tuple
 from dataclasses import dataclass
+from urllib.parse import urlparse
+
+
+# UDP datagrams (see server/udp_transport.py): kind u8 | sequence u32 | payload
+UDP_HELLO = 1
+UDP_WELCOME = 2
+UDP_SNAPSHOT = 3
+UDP_INPUT = 4
+UDP_HEADER = struct.Struct("<BI")
+UDP_INPUT_COPIES = 3  # Each input is sent this many times...
+UDP_INPUT_SPACING = 0.008  # ...this many seconds apart
 
 
 @dataclass
@@ -29,6 +44,291 @@ class GameState:
     state: str = "waiting"
 
 
+class TextCache:
+    """Caches rendered text surfaces keyed by font, text and color."""
+    
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._surfaces: OrderedDict = OrderedDict()  # (font id, text, color) -> Surface
+    
+    def render(self, font: pygame.font.Font, text: str, color) -> pygame.Surface:
+        """Return a rendered surface, calling font.render only on a cache miss."""
+        key = (id(font), text, tuple(color))
+        surface = self._surfaces.get(key)
+        if surface is None:
+            surface = font.render(text, True, color)
+            self._surfaces[key] = surface
+            if len(self._surfaces) > self.max_entries:
+                self._surfaces.popitem(last=False)
+        else:
+            self._surfaces.move_to_end(key)
+        return surface
+
+
+class ClockSync:
+    """
+    NTP-style estimate of the server clock from ping/pong exchanges.
+    
+    Each exchange gives an offset and a round-trip delay. Only the fastest
+    half of the recent samples is trusted (queueing only ever adds error),
+    and drift is the least-squares slope of their offsets over local time.
+    Mirrors web_client/clock_sync.js. All times are wall-clock milliseconds.
+    """
+    
+    MAX_DRIFT = 500e-6  # Real clocks drift tens of ppm; more is noise
+    
+    def __init__(self, window: int = 16):
+        self.window = window
+        self.samples: List[Tuple[float, float, float]] = []  # (local time, offset, delay)
+        self.offset = 0.0
+        self.drift = 0.0
+        self.reference = 0.0
+        self.delay: Optional[float] = None
+    
+    @property
+    def ready(self) -> bool:
+        return self.delay is not None
+    
+    def add_sample(self, t0: float, t1: float, t2: float, t3: float):
+        """Client send, server receive, server send, client receive."""
+        delay = (t3 - t0) - (t2 - t1)
+        if delay < 0:
+            return
+        offset = ((t1 - t0) + (t2 - t3)) / 2
+        
+        self.samples.append((t3, offset, delay))
+        if len(self.samples) > self.window:
+            self.samples.pop(0)
+        
+        best = sorted(self.samples, key=lambda s: s[2])[:(len(self.samples) + 1) // 2]
+        mean_at = sum(s[0] for s in best) / len(best)
+        mean_offset = sum(s[1] for s in best) / len(best)
+        
+        drift = 0.0
+        span = max(s[0] for s in best) - min(s[0] for s in best)
+        if len(best) >= 3 and span >= 10000:
+            num = sum((s[0] - mean_at) * (s[1] - mean_offset) for s in best)
+            den = sum((s[0] - mean_at) ** 2 for s in best)
+            drift = max(-self.MAX_DRIFT, min(self.MAX_DRIFT, num / den))
+        
+        self.reference = mean_at
+        self.offset = mean_offset
+        self.drift = drift
+        self.delay = best[0][2]
+    
+    def to_server_time(self, local_ms: float) -> float:
+        return local_ms + self.offset + self.drift * (local_ms - self.reference)
+    
+    def to_local_time(self, server_ms: float) -> float:
+        return (server_ms - self.offset + self.drift * self.reference) / (1 + self.drift)
+    
+    def one_way_delay(self, server_ms: float, local_ms: float) -> float:
+        """How long ago (ms) the server produced something stamped server_ms."""
+        return self.to_server_time(local_ms) - server_ms
+
+
+class UDPChannel(asyncio.DatagramProtocol):
+    """Datagram endpoint that hands packets to the network thread."""
+    
+    def __init__(self, net: 'NetworkThread'):
+        self.net = net
+        self.transport: Optional[asyncio.DatagramTransport] = None
+    
+    def connection_made(self, transport):
+        self.transport = transport
+    
+    def datagram_received(self, data: bytes, addr):
+        self.net.datagram_received(data, time.perf_counter())
+    
+    def error_received(self, exc):
+        print(f"UDP error: {exc}")
+
+
+class NetworkThread(threading.Thread):
+    """
+    Owns the WebSocket on its own asyncio loop, off the render thread.
+    
+    Every message is stamped with time.perf_counter() the moment it arrives
+    and queued for the game loop, so a slow frame delays drawing, not
+    receiving. Pings are sent and their pongs timed entirely on this thread,
+    which keeps the measured round trip free of frame-pacing jitter.
+    
+    If the server advertises a UDP port, snapshots and paddle inputs switch
+    to datagrams once the server acknowledges our HELLO; everything else
+    stays on the WebSocket. Stale or reordered snapshots are dropped by
+    sequence number.
+    """
+    
+    def __init__(self, url: str):
+        super().__init__(name="netpong-network", daemon=True)
+        self.url = url
+        self.inbox: queue.SimpleQueue = queue.SimpleQueue()  # (arrived_at, message)
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.ws = None
+        self.connected = False
+        self.pings: Dict[float, float] = {}  # ping timestamp -> perf_counter at send
+        self.clock = ClockSync()
+        
+        # Optional UDP channel
+        self.use_udp = True
+        self.udp: Optional[UDPChannel] = None
+        self.udp_ready = False
+        self.session_token: Optional[str] = None
+        self.snapshot_seq = 0
+        self.input_seq = 0
+        self.stale_snapshots = 0
+    
+    def run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self.receive_messages())
+        finally:
+            self.loop.close()
+    
+    async def receive_messages(self):
+        """Connect, then timestamp and queue every incoming message."""
+        try:
+            self.ws = await websockets.connect(self.url)
+        except Exception as e:
+            self.inbox.put((time.perf_counter(), {'type': 'connection_error', 'message': str(e)}))
+            return
+        
+        self.connected = True
+        try:
+            async for message in self.ws:
+                arrived_at = time.perf_counter()
+                data = json.loads(message)
+                msg_type = data.get('type')
+                if msg_type == 'pong':
+                    await self.handle_pong(data, arrived_at)
+                elif msg_type == 'connected' and data.get('udp_port') and self.use_udp:
+                    self.session_token = data['session_token']
+                    await self.open_udp(data['udp_port'])
+                elif msg_type == 'resumed' and self.udp:
+                    # Our player id changed; rebind the datagram address to it
+                    self.session_token = data['session_token']
+                    self.loop.create_task(self.bind_udp())
+                self.inbox.put((arrived_at, data))
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            self.connected = False
+            self.udp_ready = False
+            if self.udp and self.udp.transport:
+                self.udp.transport.close()
+            self.inbox.put((time.perf_counter(), {'type': 'connection_closed'}))
+    
+    async def open_udp(self, port: int):
+        """Open the datagram socket and start binding it to our session."""
+        host = urlparse(self.url).hostname or 'localhost'
+        try:
+            _, self.udp = await self.loop.create_datagram_endpoint(
+                lambda: UDPChannel(self),
+                remote_addr=(host, port)
+            )
+        except OSError as e:
+            print(f"UDP unavailable, staying on WebSocket: {e}")
+            return
+        self.loop.create_task(self.bind_udp())
+    
+    async def bind_udp(self, attempts: int = 20, interval: float = 0.25):
+        """Send HELLO until the server answers; until then we stay on TCP."""
+        self.udp_ready = False
+        for attempt in range(attempts):
+            if self.udp_ready or not self.udp.transport:
+                return
+            self.udp.transport.sendto(
+                UDP_HEADER.pack(UDP_HELLO, attempt) + self.session_token.encode('utf-8')
+            )
+            await asyncio.sleep(interval)
+        if not self.udp_ready:
+            print("UDP bind timed out, staying on WebSocket")
+    
+    def datagram_received(self, data: bytes, arrived_at: float):
+        if len(data) < UDP_HEADER.size:
+            return
+        kind, seq = UDP_HEADER.unpack_from(data, 0)
+        
+        if kind == UDP_WELCOME and not self.udp_ready:
+            # The server numbers snapshots from 1 again after every bind
+            self.snapshot_seq = 0
+            self.udp_ready = True
+        
+        elif kind == UDP_SNAPSHOT:
+            if seq <= self.snapshot_seq:
+                self.stale_snapshots += 1
+                return
+            self.snapshot_seq = seq
+            self.inbox.put((arrived_at, json.loads(data[UDP_HEADER.size:])))
+    
+    def send(self, data: dict):
+        """Queue a message for sending; safe to call from any thread."""
+        if not (self.loop and self.connected):
+            return
+        if data.get('type') == 'paddle_input' and self.udp_ready:
+            self.loop.call_soon_threadsafe(self.send_input, data['direction'])
+        else:
+            asyncio.run_coroutine_threadsafe(self.send_now(data), self.loop)
+    
+    def send_input(self, direction: int):
+        """Send a paddle input over UDP, repeated to ride out packet loss."""
+        self.input_seq += 1
+        packet = UDP_HEADER.pack(UDP_INPUT, self.input_seq) + struct.pack('<b', direction)
+        for copy in range(UDP_INPUT_COPIES):
+            self.loop.call_later(copy * UDP_INPUT_SPACING, self.send_datagram, packet)
+    
+    def send_datagram(self, packet: bytes):
+        if self.udp and self.udp.transport:
+            self.udp.transport.sendto(packet)
+    
+    def ping(self):
+        """Send a latency ping, stamped when it actually leaves."""
+        if self.loop and self.connected:
+            asyncio.run_coroutine_threadsafe(self.send_ping(), self.loop)
+    
+    def close(self):
+        """Close the socket and wait briefly for the thread to finish."""
+        if self.loop and self.ws and self.is_alive():
+            asyncio.run_coroutine_threadsafe(self.ws.close(), self.loop)
+            self.join(timeout=1.0)
+    
+    async def send_now(self, data: dict):
+        try:
+            await self.ws.send(json.dumps(data))
+        except Exception as e:
+            print(f"Send error: {e}")
+    
+    async def send_ping(self):
+        timestamp = time.time() * 1000  # milliseconds
+        self.pings[timestamp] = time.perf_counter()
+        if len(self.pings) > 16:  # Drop pings whose pong never came
+            self.pings.pop(next(iter(self.pings)))
+        await self.send_now({'type': 'ping', 'timestamp': timestamp})
+    
+    async def handle_pong(self, data: dict, arrived_at: float):
+        """Time the round trip on arrival and report it to the server."""
+        if 'server_received_ms' in data:
+            self.clock.add_sample(
+                data['client_timestamp'],
+                data['server_received_ms'],
+                data['server_sent_ms'],
+                time.time() * 1000
+            )
+        
+        sent_at = self.pings.pop(data['client_timestamp'], None)
+        if sent_at is not None:
+            latency = (arrived_at - sent_at) * 1000
+        else:
+            latency = time.time() * 1000 - data['client_timestamp']
+        data['latency_ms'] = latency
+        
+        await self.send_now({
+            'type': 'latency_update',
+            'latency_ms': latency
+        })
+
+
 class NetPongClient:
     """PyGame-based NetPong client."""
     
@@ -52,30 +352,52 @@ class NetPongClient:
         pygame.init()
         self.screen = pygame.display.set_mode((self.WINDOW_WIDTH, self.WINDOW_HEIGHT))
         pygame.display.set_caption("NetPong 2025")
-        self.clock = pygame.time.Clock()
         
         # Fonts
         self.font_large = pygame.font.Font(None, 72)
         self.font_medium = pygame.font.Font(None, 36)
         self.font_small = pygame.font.Font(None, 24)
+        self.text_cache = TextCache()
+        
+        # Dirty-rect rendering state for the game screen
+        self.game_background = self.build_game_background()
+        self.full_redraw = True
+        self.sprite_rects: List[pygame.Rect] = []
+        self.hud_rects: Dict[str, Tuple[pygame.Surface, pygame.Rect]] = {}
         
         # Game state
         self.game_state = GameState()
         self.player_id: Optional[str] = None
         self.room_code: Optional[str] = None
         self.player_index: int = -1
+        self.room_code_length = 4  # Replaced by the server's format on connect
+        self.room_code_alphabet: Optional[str] = None
         
         # Input
         self.current_input = 0
         
         # Connection
-        self.ws = None
-        self.connected = False
+        self.net: Optional[NetworkThread] = None
         self.server_url = "ws://localhost:8000/ws"
+        self.session_token: Optional[str] = None  # Proves our seat when we reconnect
+        self.fresh_session_token: Optional[str] = None  # Issued by the latest connect
+        self.reconnect_at: Optional[float] = None  # perf_counter time of the next attempt
+        self.reconnect_delay = 3.0  # seconds; the server can ask for less while restarting
         
         # Latency tracking
         self.last_ping_time = 0
         self.ping_interval = 1.0  # seconds
+        self.latency_ms: Optional[float] = None
+        self.quick_match_pending = False  # Waiting on a first RTT sample before queueing
+        self.state_received_at = 0.0  # perf_counter when the last snapshot arrived
+        self.one_way_ms: Optional[float] = None  # Server tick to snapshot arrival
+        
+        # Trajectory protocol: motion segments arrive only when something
+        # changes, and frames in between are computed locally. Each segment
+        # carries the perf_counter time it starts at.
+        self.use_trajectory = True
+        self.ball_segment: Optional[Tuple[float, float, float, float, float]] = None  # start, x, y, vx, vy
+        self.paddle_segments: Dict[int, Tuple[float, float, float]] = {}  # slot -> start, y, vy
         
         # UI state
         self.screen_state = "menu"  # menu, waiting, playing, gameover
@@ -87,53 +409,114 @@ class NetPongClient:
         # Running flag
         self.running = True
     
-    async def connect(self):
-        """Connect to WebSocket server."""
-        try:
-            self.ws = await websockets.connect(self.server_url)
-            self.connected = True
-            self.status_message = "Connected"
-            print("✅ Connected to server")
-            
-            # Wait for connection confirmation
-            msg = await self.ws.recv()
-            data = json.loads(msg)
-            if data['type'] == 'connected':
-                self.player_id = data['player_id']
-                print(f"Player ID: {self.player_id}")
-        
-        except Exception as e:
-            print(f"❌ Connection error: {e}")
-            self.connected = False
-            self.status_message = f"Connection error: {e}"
+    def connect(self):
+        """Start the network thread; it connects in the background."""
+        self.net = NetworkThread(self.server_url)
+        self.net.start()
+    
+    def schedule_reconnect(self):
+        """
+        Mid-match the server holds our seat only for a short grace period,
+        so come straight back; otherwise wait (longer if it is restarting).
+        """
+        in_match = self.room_code and self.session_token and self.screen_state in ('playing', 'waiting')
+        delay = min(self.reconnect_delay, 0.5) if in_match else self.reconnect_delay
+        self.clear_trajectory()  # Freeze the court until fresh segments arrive
+        self.reconnect_at = time.perf_counter() + delay
+        self.reconnect_delay = 3.0
     
-    async def send(self, data: dict):
+    def send(self, data: dict):
         """Send message to server."""
-        if self.ws and self.connected:
-            try:
-                await self.ws.send(json.dumps(data))
-            except Exception as e:
-                print(f"Send error: {e}")
+        if self.net:
+            self.net.send(data)
     
-    async def receive_messages(self):
-        """Receive and handle messages from server."""
-        if not self.ws:
+    async def process_messages(self):
+        """Handle everything the network thread received since the last frame."""
+        if not self.net:
             return
         
-        try:
-            async for message in self.ws:
-                data = json.loads(message)
-                await self.handle_message(data)
-        except websockets.exceptions.ConnectionClosed:
-            print("Connection closed")
-            self.connected = False
-            self.status_message = "Disconnected"
+        while True:
+            try:
+                arrived_at, data = self.net.inbox.get_nowait()
+            except queue.Empty:
+                break
+            if data.get('type') == 'game_state':
+                self.state_received_at = arrived_at
+                clock = self.net.clock
+                if 'server_time' in data and clock.ready:
+                    # Arrival on the wall clock the server stamps with
+                    arrived_ms = (time.time() - (time.perf_counter() - arrived_at)) * 1000
+                    self.one_way_ms = clock.one_way_delay(data['server_time'], arrived_ms)
+            elif data.get('type') == 'trajectory':
+                self.apply_trajectory(data, self.segment_start(data, arrived_at))
+            await self.handle_message(data)
+    
+    def segment_start(self, data: dict, arrived_at: float) -> float:
+        """
+        When (perf_counter) to show a segment's first tick: as long after the
+        server produced it as the best one-way latency, which is the delay
+        frames would have had. Without clock sync, on arrival.
+        """
+        clock = self.net.clock
+        if 'server_time' not in data or not clock.ready:
+            return arrived_at
+        arrived_ms = (time.time() - (time.perf_counter() - arrived_at)) * 1000
+        late_ms = clock.one_way_delay(data['server_time'], arrived_ms) - clock.delay / 2
+        return arrived_at - late_ms / 1000
     
     async def handle_message(self, data: dict):
         """Handle incoming messages."""
         msg_type = data.get('type')
         
-        if msg_type == 'room_created':
+        if msg_type == 'connected':
+            self.player_id = data['player_id']
+            self.fresh_session_token = data['session_token']
+            self.status_message = "Connected"
+            if data.get('room_code_length'):
+                self.room_code_length = data['room_code_length']
+                self.room_code_alphabet = data.get('room_code_alphabet')
+            print("✅ Connected to server")
+            print(f"Player ID: {self.player_id}")
+            # Reclaim our seat if we were mid-match when the link dropped
+            if self.session_token and self.room_code and self.screen_state in ('playing', 'waiting'):
+                self.send({'type': 'resume', 'session_token': self.session_token})
+                self.status_message = "Reconnecting..."
+            else:
+                self.session_token = data['session_token']
+            if self.use_trajectory:
+                self.send({'type': 'set_protocol', 'mode': 'trajectory'})
+        
+        elif msg_type == 'connection_error':
+            print(f"❌ Connection error: {data['message']}")
+            self.status_message = f"Connection error: {data['message']}"
+            self.schedule_reconnect()
+        
+        elif msg_type == 'connection_closed':
+            print("Connection closed")
+            self.status_message = "Disconnected"
+            self.schedule_reconnect()
+        
+        elif msg_type == 'resumed':
+            self.player_id = data['player_id']
+            self.room_code = data['room_code']
+            self.session_token = data['session_token']
+            self.player_index = -1
+            self.clear_trajectory()
+            self.update_game_state(data['state'])
+            self.screen_state = 'playing'
+            self.status_message = "Reconnected"
+            print(f"Resumed room: {self.room_code}")
+        
+        elif msg_type == 'resume_failed':
+            self.session_token = self.fresh_session_token
+            self.room_code = None
+            self.screen_state = 'menu'
+            self.status_message = "Could not rejoin the match"
+        
+        elif msg_type == 'server_draining':
+            self.reconnect_delay = data.get('retry_after_ms', 250) / 1000
+        
+        elif msg_type == 'room_created':
             self.room_code = data['room_code']
             self.screen_state = 'waiting'
             print(f"Room created: {self.room_code}")
@@ -141,10 +524,23 @@ class NetPongClient:
         elif msg_type == 'room_joined':
             self.room_code = data['room_code']
             self.screen_state = 'playing'
+            self.clear_trajectory()
             print(f"Joined room: {self.room_code}")
         
+        elif msg_type == 'match_queued':
+            self.screen_state = 'waiting'
+            self.status_message = f"Searching for opponent ({data['queue_size']} in queue)"
+        
+        elif msg_type == 'match_found':
+            self.room_code = data['room_code']
+            self.screen_state = 'playing'
+            self.status_message = f"Matched with {data['opponent_name']}"
+            self.clear_trajectory()
+            print(f"Quick match: {self.room_code}")
+        
         elif msg_type == 'player_joined':
             self.screen_state = 'playing'
+            self.clear_trajectory()
             print("Second player joined!")
         
         elif msg_type == 'game_state':
@@ -157,6 +553,14 @@ class NetPongClient:
             self.screen_state = 'gameover'
             self.status_message = f"{data['winner']} WINS!"
         
+        elif msg_type == 'player_detached':
+            # Paused while the server holds their seat; stop extrapolating
+            self.clear_trajectory()
+            self.status_message = "Opponent reconnecting..."
+        
+        elif msg_type == 'player_resumed':
+            self.status_message = "Opponent is back"
+        
         elif msg_type == 'player_disconnected':
             self.status_message = "Opponent disconnected"
             self.screen_state = 'menu'
@@ -193,26 +597,60 @@ class NetPongClient:
             self.game_state.player2_score = data['players'][1]['score']
             self.game_state.player2_latency = data['players'][1]['latency_ms']
     
-    async def send_ping(self):
+    def apply_trajectory(self, data: dict, start: float):
+        """Store new motion segments; scores ride along with them."""
+        ball = data.get('ball')
+        if ball:
+            self.ball_segment = (start, ball['x'], ball['y'], ball['vx'], ball['vy'])
+        for paddle in data.get('paddles', []):
+            self.paddle_segments[paddle['slot']] = (start, paddle['y'], paddle['vy'])
+        scores = data.get('scores')
+        if scores and len(scores) >= 2:
+            self.game_state.player1_score, self.game_state.player2_score = scores[0], scores[1]
+    
+    def clear_trajectory(self):
+        self.ball_segment = None
+        self.paddle_segments = {}
+    
+    def extrapolate_trajectory(self, now: float):
+        """
+        Move the ball and paddles along their segments. Positions are clamped
+        to the court in case a bounce's segment is running late.
+        """
+        if self.ball_segment:
+            start, x, y, vx, vy = self.ball_segment
+            elapsed = now - start
+            self.game_state.ball_x = x + vx * elapsed
+            self.game_state.ball_y = max(10, min(self.CANVAS_HEIGHT - 10, y + vy * elapsed))
+        
+        for slot, (start, y, vy) in self.paddle_segments.items():
+            paddle_y = max(50, min(self.CANVAS_HEIGHT - 50, y + vy * (now - start)))
+            if slot == 0:
+                self.game_state.player1_paddle_y = paddle_y
+            elif slot == 1:
+                self.game_state.player2_paddle_y = paddle_y
+    
+    def send_ping(self):
         """Send ping for latency measurement."""
-        current_time = time.time()
+        current_time = time.perf_counter()
         if current_time - self.last_ping_time >= self.ping_interval:
             self.last_ping_time = current_time
-            await self.send({
-                'type': 'ping',
-                'timestamp': time.time() * 1000  # milliseconds
-            })
+            self.net.ping()
     
     def handle_pong(self, data: dict):
-        """Handle pong response and calculate latency."""
-        now = time.time() * 1000
-        latency = now - data['client_timestamp']
-        
-        # Send latency update
-        asyncio.create_task(self.send({
-            'type': 'latency_update',
-            'latency_ms': latency
-        }))
+        """Record the round trip the network thread measured on arrival."""
+        self.latency_ms = data['latency_ms']
+        if self.quick_match_pending:
+            self.send_quick_match()
+    
+    def send_quick_match(self):
+        """Queue for a quick match with our measured RTT."""
+        self.quick_match_pending = False
+        self.send({
+            'type': 'quick_match',
+            'player_name': self.player_name,
+            'latency_ms': self.latency_ms
+        })
     
     async def handle_input(self):
         """Handle pygame events."""
@@ -238,7 +676,7 @@ class NetPongClient:
             
             if new_input != self.current_input:
                 self.current_input = new_input
-                await self.send({
+                self.send({
                     'type': 'paddle_input',
                     'direction': new_input
                 })
@@ -266,6 +704,13 @@ class NetPongClient:
             elif key == pygame.K_j:  # Join room
                 self.input_mode = 'room_code'
                 self.input_text = ""
+            elif key == pygame.K_q:  # Quick match
+                if self.latency_ms is None:
+                    # Pairing is by RTT, so measure one before queueing
+                    self.quick_match_pending = True
+                    self.net.ping()
+                else:
+                    self.send_quick_match()
         
         elif self.screen_state == 'gameover':
             if key == pygame.K_SPACE:
@@ -279,7 +724,7 @@ class NetPongClient:
         """Submit text input."""
         if self.input_mode == 'name':
             self.player_name = self.input_text or "Player"
-            await self.send({
+            self.send({
                 'type': 'create_room',
                 'player_name': self.player_name
             })
@@ -288,8 +733,9 @@ class NetPongClient:
         
         elif self.input_mode == 'room_code':
             room_code = self.input_text.strip()
-            if len(room_code) == 4:
-                await self.send({
+            valid_chars = not self.room_code_alphabet or all(c in self.room_code_alphabet for c in room_code)
+            if len(room_code) == self.room_code_length and valid_chars:
+                self.send({
                     'type': 'join_room',
                     'room_code': room_code,
                     'player_name': self.player_name
@@ -297,23 +743,31 @@ class NetPongClient:
             self.input_mode = None
             self.input_text = ""
     
+    def text(self, font: pygame.font.Font, text: str, color) -> pygame.Surface:
+        """Render text through the surface cache."""
+        return self.text_cache.render(font, text, color)
+    
     def render(self):
         """Render the current screen."""
+        if self.screen_state == 'playing':
+            self.render_game()
+            return
+        
+        # Menu screens are redrawn in full; the game screen must start clean
+        self.full_redraw = True
         self.screen.fill(self.COLOR_BG)
         
         if self.screen_state == 'menu':
             self.render_menu()
         elif self.screen_state == 'waiting':
             self.render_waiting()
-        elif self.screen_state == 'playing':
-            self.render_game()
         elif self.screen_state == 'gameover':
             self.render_gameover()
         
         # Status message
-        status_text = self.font_small.render(
+        status_text = self.text(
+            self.font_small,
             f"Status: {self.status_message}",
-            True,
             self.COLOR_GRAY
         )
         self.screen.blit(status_text, (10, self.WINDOW_HEIGHT - 30))
@@ -323,7 +777,7 @@ class NetPongClient:
     def render_menu(self):
         """Render main menu."""
         # Title
-        title = self.font_large.render("NETPONG 2025", True, self.COLOR_NEON_BLUE)
+        title = self.text(self.font_large, "NETPONG 2025", self.COLOR_NEON_BLUE)
         title_rect = title.get_rect(center=(self.WINDOW_WIDTH // 2, 150))
         self.screen.blit(title, title_rect)
         
@@ -332,29 +786,30 @@ class NetPongClient:
         instructions = [
             "Press C to CREATE ROOM",
             "Press J to JOIN ROOM",
+            "Press Q for QUICK MATCH",
             "ESC to cancel input",
         ]
         
         for text in instructions:
-            rendered = self.font_medium.render(text, True, self.COLOR_WHITE)
+            rendered = self.text(self.font_medium, text, self.COLOR_WHITE)
             rect = rendered.get_rect(center=(self.WINDOW_WIDTH // 2, y))
             self.screen.blit(rendered, rect)
             y += 50
         
         # Input mode
         if self.input_mode == 'name':
-            prompt = self.font_medium.render(
+            prompt = self.text(
+                self.font_medium,
                 f"Enter name: {self.input_text}_",
-                True,
                 self.COLOR_NEON_GREEN
             )
             rect = prompt.get_rect(center=(self.WINDOW_WIDTH // 2, 500))
             self.screen.blit(prompt, rect)
         
         elif self.input_mode == 'room_code':
-            prompt = self.font_medium.render(
+            prompt = self.text(
+                self.font_medium,
                 f"Enter room code: {self.input_text}_",
-                True,
                 self.COLOR_NEON_GREEN
             )
             rect = prompt.get_rect(center=(self.WINDOW_WIDTH // 2, 500))
@@ -363,35 +818,33 @@ class NetPongClient:
     def render_waiting(self):
         """Render waiting for opponent screen."""
         # Title
-        title = self.font_large.render("WAITING...", True, self.COLOR_NEON_PINK)
+        title = self.text(self.font_large, "WAITING...", self.COLOR_NEON_PINK)
         title_rect = title.get_rect(center=(self.WINDOW_WIDTH // 2, 200))
         self.screen.blit(title, title_rect)
         
         # Room code
         if self.room_code:
-            code_text = self.font_large.render(
+            code_text = self.text(
+                self.font_large,
                 self.room_code,
-                True,
                 self.COLOR_NEON_BLUE
             )
             code_rect = code_text.get_rect(center=(self.WINDOW_WIDTH // 2, 350))
             self.screen.blit(code_text, code_rect)
             
-            label = self.font_medium.render("Share this code!", True, self.COLOR_GRAY)
+            label = self.text(self.font_medium, "Share this code!", self.COLOR_GRAY)
             label_rect = label.get_rect(center=(self.WINDOW_WIDTH // 2, 420))
             self.screen.blit(label, label_rect)
     
-    def render_game(self):
-        """Render active game."""
-        # Game area
+    def build_game_background(self) -> pygame.Surface:
+        """Pre-render everything on the game screen that never moves."""
         game_y_offset = 100
-        
-        # HUD
-        self.render_hud()
+        background = pygame.Surface((self.WINDOW_WIDTH, self.WINDOW_HEIGHT))
+        background.fill(self.COLOR_BG)
         
         # Game canvas background
         pygame.draw.rect(
-            self.screen,
+            background,
             (0, 0, 0),
             (0, game_y_offset, self.CANVAS_WIDTH, self.CANVAS_HEIGHT)
         )
@@ -399,130 +852,166 @@ class NetPongClient:
         # Center line
         for y in range(game_y_offset, game_y_offset + self.CANVAS_HEIGHT, 20):
             pygame.draw.rect(
-                self.screen,
+                background,
                 self.COLOR_GRAY,
                 (self.CANVAS_WIDTH // 2 - 2, y, 4, 10)
             )
         
-        # Paddles
+        return background.convert()
+    
+    def render_game(self):
+        """Render active game, pushing only the rectangles that changed."""
+        dirty: List[pygame.Rect] = []
+        sprites = self.sprite_shapes()
+        sprite_rects = [rect for _, rect, _ in sprites]
+        hud = self.hud_items()
+        
+        if self.full_redraw:
+            self.screen.blit(self.game_background, (0, 0))
+            self.sprite_rects = []
+            self.hud_rects = {}
+        
+        # Erase last frame's sprites
+        for rect in self.sprite_rects:
+            self.screen.blit(self.game_background, rect, rect)
+            dirty.append(rect)
+        
+        # HUD text is redrawn when it changed or a sprite touches it. Its area
+        # is cleared first (antialiased text blitted twice would smear), which
+        # can clip a neighbouring label, so clearing spreads until it settles.
+        erased: List[pygame.Rect] = []
+        redraw = set()
+        pending = True
+        while pending:
+            pending = False
+            for key, surface, rect in hud:
+                if key in redraw:
+                    continue
+                previous = self.hud_rects.get(key)
+                unchanged = previous is not None and previous[0] is surface and previous[1] == rect
+                if (unchanged and rect.collidelist(self.sprite_rects) == -1
+                        and rect.collidelist(sprite_rects) == -1
+                        and rect.collidelist(erased) == -1):
+                    continue
+                areas = [rect] if unchanged or previous is None else [rect, previous[1]]
+                for area in areas:
+                    self.screen.blit(self.game_background, area, area)
+                    erased.append(area)
+                redraw.add(key)
+                pending = True
+        dirty.extend(erased)
+        
+        # Moving objects, then HUD on top
+        for color, rect, radius in sprites:
+            if radius:
+                pygame.draw.circle(self.screen, color, rect.center, radius)
+            else:
+                pygame.draw.rect(self.screen, color, rect)
+        dirty.extend(sprite_rects)
+        self.sprite_rects = sprite_rects
+        
+        for key, surface, rect in hud:
+            if key in redraw:
+                self.screen.blit(surface, rect)
+                self.hud_rects[key] = (surface, rect)
+        
+        if self.full_redraw:
+            pygame.display.flip()
+            self.full_redraw = False
+        else:
+            pygame.display.update(dirty)
+    
+    def sprite_shapes(self) -> List[Tuple[Tuple[int, int, int], pygame.Rect, int]]:
+        """Paddles and ball as (color, bounding rect, circle radius or 0)."""
+        game_y_offset = 100
         paddle_width = 20
         paddle_height = 100
         paddle_offset = 30
+        ball_radius = 10
         
-        # Left paddle
-        pygame.draw.rect(
-            self.screen,
-            self.COLOR_NEON_BLUE,
-            (
-                paddle_offset,
-                game_y_offset + self.game_state.player1_paddle_y - paddle_height // 2,
-                paddle_width,
-                paddle_height
-            )
+        left = pygame.Rect(
+            paddle_offset,
+            game_y_offset + int(self.game_state.player1_paddle_y) - paddle_height // 2,
+            paddle_width,
+            paddle_height
         )
-        
-        # Right paddle
-        pygame.draw.rect(
-            self.screen,
-            self.COLOR_NEON_PINK,
-            (
-                self.CANVAS_WIDTH - paddle_offset - paddle_width,
-                game_y_offset + self.game_state.player2_paddle_y - paddle_height // 2,
-                paddle_width,
-                paddle_height
-            )
+        right = pygame.Rect(
+            self.CANVAS_WIDTH - paddle_offset - paddle_width,
+            game_y_offset + int(self.game_state.player2_paddle_y) - paddle_height // 2,
+            paddle_width,
+            paddle_height
         )
-        
-        # Ball
-        pygame.draw.circle(
-            self.screen,
-            self.COLOR_WHITE,
-            (int(self.game_state.ball_x), int(game_y_offset + self.game_state.ball_y)),
-            10
+        ball = pygame.Rect(
+            int(self.game_state.ball_x) - ball_radius,
+            int(game_y_offset + self.game_state.ball_y) - ball_radius,
+            ball_radius * 2 + 1,
+            ball_radius * 2 + 1
         )
+        
+        return [
+            (self.COLOR_NEON_BLUE, left, 0),
+            (self.COLOR_NEON_PINK, right, 0),
+            (self.COLOR_WHITE, ball, ball_radius),
+        ]
     
-    def render_hud(self):
-        """Render game HUD."""
-        # Player 1 info
-        p1_name = self.font_small.render(
-            self.game_state.player1_name,
-            True,
-            self.COLOR_GRAY
-        )
-        self.screen.blit(p1_name, (20, 20))
+    def hud_items(self) -> List[Tuple[str, pygame.Surface, pygame.Rect]]:
+        """HUD text as (key, cached surface, position) for the current state."""
+        items = []
         
-        p1_score = self.font_large.render(
-            str(self.game_state.player1_score),
-            True,
-            self.COLOR_NEON_BLUE
-        )
-        self.screen.blit(p1_score, (20, 40))
-        
-        # Player 1 latency
-        latency_color = self.get_latency_color(self.game_state.player1_latency)
-        p1_latency = self.font_small.render(
-            f"{int(self.game_state.player1_latency)}ms",
-            True,
-            latency_color
-        )
-        self.screen.blit(p1_latency, (20, 80))
+        def add(key: str, font: pygame.font.Font, text: str, color, **anchor):
+            surface = self.text(font, text, color)
+            items.append((key, surface, surface.get_rect(**anchor)))
+        
+        # Player 1 info
+        add("p1_name", self.font_small, self.game_state.player1_name, self.COLOR_GRAY, topleft=(20, 20))
+        add("p1_score", self.font_large, str(self.game_state.player1_score), self.COLOR_NEON_BLUE,
+            topleft=(20, 40))
+        add("p1_latency", self.font_small, f"{int(self.game_state.player1_latency)}ms",
+            self.get_latency_color(self.game_state.player1_latency), topleft=(20, 80))
         
         # Player 2 info
-        p2_name = self.font_small.render(
-            self.game_state.player2_name,
-            True,
-            self.COLOR_GRAY
-        )
-        p2_name_rect = p2_name.get_rect(topright=(self.WINDOW_WIDTH - 20, 20))
-        self.screen.blit(p2_name, p2_name_rect)
+        right = self.WINDOW_WIDTH - 20
+        add("p2_name", self.font_small, self.game_state.player2_name, self.COLOR_GRAY, topright=(right, 20))
+        add("p2_score", self.font_large, str(self.game_state.player2_score), self.COLOR_NEON_PINK,
+            topright=(right, 40))
+        add("p2_latency", self.font_small, f"{int(self.game_state.player2_latency)}ms",
+            self.get_latency_color(self.game_state.player2_latency), topright=(right, 80))
         
-        p2_score = self.font_large.render(
-            str(self.game_state.player2_score),
-            True,
-            self.COLOR_NEON_PINK
-        )
-        p2_score_rect = p2_score.get_rect(topright=(self.WINDOW_WIDTH - 20, 40))
-        self.screen.blit(p2_score, p2_score_rect)
-        
-        # Player 2 latency
-        latency_color = self.get_latency_color(self.game_state.player2_latency)
-        p2_latency = self.font_small.render(
-            f"{int(self.game_state.player2_latency)}ms",
-            True,
-            latency_color
-        )
-        p2_latency_rect = p2_latency.get_rect(topright=(self.WINDOW_WIDTH - 20, 80))
-        self.screen.blit(p2_latency, p2_latency_rect)
+        # Status message
+        add("status", self.font_small, f"Status: {self.status_message}", self.COLOR_GRAY,
+            topleft=(10, self.WINDOW_HEIGHT - 30))
+        
+        return items
     
     def render_gameover(self):
         """Render game over screen."""
-        title = self.font_large.render("GAME OVER", True, self.COLOR_NEON_PINK)
+        title = self.text(self.font_large, "GAME OVER", self.COLOR_NEON_PINK)
         title_rect = title.get_rect(center=(self.WINDOW_WIDTH // 2, 200))
         self.screen.blit(title, title_rect)
         
         # Winner
-        winner_text = self.font_medium.render(
+        winner_text = self.text(
+            self.font_medium,
             self.status_message,
-            True,
             self.COLOR_NEON_GREEN
         )
         winner_rect = winner_text.get_rect(center=(self.WINDOW_WIDTH // 2, 300))
         self.screen.blit(winner_text, winner_rect)
         
         # Scores
-        scores = self.font_medium.render(
+        scores = self.text(
+            self.font_medium,
             f"{self.game_state.player1_name}: {self.game_state.player1_score}  -  "
             f"{self.game_state.player2_name}: {self.game_state.player2_score}",
-            True,
             self.COLOR_WHITE
         )
         scores_rect = scores.get_rect(center=(self.WINDOW_WIDTH // 2, 400))
         self.screen.blit(scores, scores_rect)
         
         # Instruction
-        instruction = self.font_small.render(
+        instruction = self.text(
+            self.font_small,
             "Press SPACE to return to menu",
-            True,
             self.COLOR_GRAY
         )
         instruction_rect = instruction.get_rect(center=(self.WINDOW_WIDTH // 2, 500))
@@ -542,32 +1031,47 @@ class NetPongClient:
     async def game_loop(self):
         """Main game loop."""
         # Connect to server
-        await self.connect()
+        self.connect()
         
-        # Start message receiver
-        asyncio.create_task(self.receive_messages())
+        frame_time = 1.0 / self.FPS
+        next_frame = time.perf_counter()
         
         # Main loop
         while self.running:
+            # Network messages received since last frame
+            await self.process_messages()
+            
+            if self.reconnect_at is not None and time.perf_counter() >= self.reconnect_at:
+                self.reconnect_at = None
+                self.connect()
+            
             # Handle input
             await self.handle_input()
             
-            # Send ping if playing
+            # Keep RTT fresh in the menu too: quick match pairs by it
+            if self.net and self.net.connected:
+                self.send_ping()
+            
+            # Fill in positions between trajectory segments
             if self.screen_state == 'playing':
-                await self.send_ping()
+                self.extrapolate_trajectory(time.perf_counter())
             
             # Render
             self.render()
             
-            # Cap framerate
-            self.clock.tick(self.FPS)
-            
-            # Small async yield
-            await asyncio.sleep(0)
+            # Pace frames without blocking the event loop; after a long
+            # frame, start over rather than rushing to catch up
+            next_frame += frame_time
+            delay = next_frame - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                next_frame = time.perf_counter()
+                await asyncio.sleep(0)
         
         # Cleanup
-        if self.ws:
-            await self.ws.close()
+        if self.net:
+            self.net.close()
         
         pygame.quit()
         sys.exit()
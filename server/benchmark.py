@@ -0,0 +1,195 @@
+"""
+In-process capacity benchmark for the simulation and broadcast pipeline.
+
+Spins up N synthetic rooms inside a ConnectionManager: real game loops on
+one event loop, exactly as the server runs them, but with bots from
+simulate.py on the paddles and in-memory sink connections in place of
+WebSockets. Sinks still encode every message to JSON like Starlette does,
+so serialization is measured; only the network stack is left out.
+
+    python benchmark.py --rooms 25 50 100 200 --seconds 10
+
+For each step it reports the tick rate rooms actually achieved, tick
+busy-time and lateness percentiles, process CPU per room, and a
+rooms-per-core estimate. Ramping stops once rooms fall well short of 60 Hz.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import List
+
+from game import Game, GameState
+from room_manager import ConnectionManager
+from settings import settings
+from simulate import POLICIES, percentile
+
+
+class SinkSocket:
+    """Stands in for a WebSocket: encodes what it is sent and counts it."""
+
+    def __init__(self):
+        self.messages = 0
+        self.bytes = 0
+
+    async def send_json(self, data: dict):
+        await self.send_text(json.dumps(data, separators=(",", ":"), ensure_ascii=False))
+
+    async def send_text(self, text: str):
+        self.messages += 1
+        self.bytes += len(text)
+
+
+class TickStats:
+    """Collects every tick the manager's game loops report."""
+
+    def __init__(self):
+        self.recording = False
+        self.busy: List[float] = []
+        self.lag: List[float] = []
+
+    def __call__(self, room_code: str, busy: float, lag: float):
+        if self.recording:
+            self.busy.append(busy)
+            self.lag.append(max(0.0, lag))
+
+
+async def drive_bots(manager: ConnectionManager, codes: List[str], policies: List[str],
+                     reaction_ticks: int, rng: random.Random, bot_time: List[float]):
+    """Feed bot decisions in through queue_input, as a client's inputs would be."""
+    interval = reaction_ticks * Game.FRAME_TIME
+    while True:
+        started = time.process_time()
+        for code in codes:
+            game = manager.rooms.get(code)
+            if game is None or game.state != GameState.PLAYING:
+                continue
+            for slot, player in enumerate(game.players.values()):
+                direction = POLICIES[policies[slot]](game, player, slot, rng, rng.gauss(0, 30))
+                manager.queue_input(player.player_id, direction)
+        bot_time[0] += time.process_time() - started
+        await asyncio.sleep(interval)
+
+
+async def run_step(rooms: int, args: argparse.Namespace) -> dict:
+    """Run `rooms` synthetic matches and measure them."""
+    manager = ConnectionManager()
+    stats = TickStats()
+    manager.tick_listener = stats
+    sinks: List[SinkSocket] = []
+    codes: List[str] = []
+
+    for i in range(rooms):
+        first, second = SinkSocket(), SinkSocket()
+        code = await manager.create_room(f"bot-{i}-a", f"Bot {i}A", first)
+        if code is None:
+            break
+        # Matches should last the whole measurement
+        manager.rooms[code].WINNING_SCORE = 10 ** 9
+        await manager.join_room(code, f"bot-{i}-b", f"Bot {i}B", second)
+        sinks += [first, second]
+        if args.trajectory:
+            manager.trajectory_players.update((f"bot-{i}-a", f"bot-{i}-b"))
+        for j in range(args.spectators):
+            spectator = SinkSocket()
+            await manager.spectate_room(code, f"spectator-{i}-{j}", spectator)
+            sinks.append(spectator)
+        codes.append(code)
+
+    bot_time = [0.0]
+    bots = asyncio.create_task(drive_bots(
+        manager, codes, [args.left, args.right], args.reaction_ticks, random.Random(args.seed), bot_time
+    ))
+
+    await asyncio.sleep(args.warmup)
+    ticks_before = {code: manager.rooms[code].tick for code in codes}
+    bytes_before = sum(s.bytes for s in sinks)
+    bot_time[0] = 0.0
+    stats.recording = True
+    wall_started, cpu_started = time.perf_counter(), time.process_time()
+
+    await asyncio.sleep(args.seconds)
+
+    stats.recording = False
+    wall = time.perf_counter() - wall_started
+    cpu = time.process_time() - cpu_started
+    ticks = sum(manager.rooms[code].tick - ticks_before[code] for code in codes)
+    sent = sum(s.bytes for s in sinks) - bytes_before
+    game_cpu = cpu - bot_time[0]
+
+    bots.cancel()
+    for code in codes:
+        manager.close_room(code)
+    await asyncio.sleep(0)
+
+    busy = sorted(stats.busy)
+    lag = sorted(stats.lag)
+    n = len(codes)
+    return {
+        "rooms": n,
+        "tick_hz": round(ticks / wall / n, 2) if n else 0.0,
+        "busy_ms": {p: round(percentile(busy, p) * 1000, 3) for p in (50, 90, 99)},
+        "lag_ms": {p: round(percentile(lag, p) * 1000, 3) for p in (50, 90, 99)},
+        "loop_utilization": round(sum(busy) / wall, 3),
+        "cpu_ms_per_room_s": round(game_cpu / wall / n * 1000, 3) if n else 0.0,
+        "bot_cpu_share": round(bot_time[0] / cpu, 3) if cpu else 0.0,
+        "rooms_per_core": round(n * wall / game_cpu) if game_cpu else None,
+        "kbit_s_per_room": round(sent * 8 / wall / n / 1000, 1) if n else 0.0,
+    }
+
+
+def print_step(step: dict):
+    print(f"🏓 {step['rooms']:>5} rooms  {step['tick_hz']:>6.2f} Hz  "
+          f"busy p50/p99 {step['busy_ms'][50]:.3f}/{step['busy_ms'][99]:.3f} ms  "
+          f"lag p50/p99 {step['lag_ms'][50]:.2f}/{step['lag_ms'][99]:.2f} ms  "
+          f"loop {step['loop_utilization']:.0%}  "
+          f"cpu {step['cpu_ms_per_room_s']:.2f} ms/room·s  "
+          f"~{step['rooms_per_core']} rooms/core  "
+          f"{step['kbit_s_per_room']} kbit/s/room")
+
+
+async def run(args: argparse.Namespace) -> List[dict]:
+    steps: List[dict] = []
+    for rooms in args.rooms:
+        step = await run_step(rooms, args)
+        steps.append(step)
+        if not args.json:
+            print_step(step)
+        if step["tick_hz"] < Game.FPS * args.min_rate:
+            break
+    return steps
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark synthetic NetPong rooms in-process.")
+    parser.add_argument("--rooms", type=int, nargs="+", default=[10, 25, 50, 100, 200, 400],
+                        help="Room counts to ramp through")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Measurement time per step")
+    parser.add_argument("--warmup", type=float, default=1.0, help="Unmeasured time before each step")
+    parser.add_argument("--left", choices=POLICIES, default="predictor")
+    parser.add_argument("--right", choices=POLICIES, default="tracker")
+    parser.add_argument("--reaction-ticks", type=int, default=6)
+    parser.add_argument("--spectators", type=int, default=0, help="Spectators per room")
+    parser.add_argument("--trajectory", action="store_true", help="Players use the trajectory protocol")
+    parser.add_argument("--min-rate", type=float, default=0.95,
+                        help="Stop ramping once rooms tick slower than this share of 60 Hz")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="Print the steps as JSON")
+    args = parser.parse_args()
+
+    # Benchmarks shouldn't fill the replay directory
+    settings.record_matches = False
+
+    steps = asyncio.run(run(args))
+
+    held = [s for s in steps if s["tick_hz"] >= Game.FPS * args.min_rate]
+    if args.json:
+        print(json.dumps({"steps": steps, "max_rooms_at_rate": held[-1]["rooms"] if held else 0}, indent=2))
+    elif held:
+        print(f"\nHeld {Game.FPS * args.min_rate:.0f}+ Hz up to {held[-1]['rooms']} rooms on one event loop")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Startup timing for cold starts.
+
+Import this module first in main.py: it stamps the moment the server code
+began loading, and `mark()` records named phases after that. `report()`
+summarizes them together with how long the interpreter had already been
+running (read from /proc where available).
+"""
+
+import os
+import time
+from typing import List, Optional, Tuple
+
+STARTED = time.perf_counter()
+_phases: List[Tuple[str, float]] = []
+_first_websocket: Optional[float] = None
+
+
+def _process_age() -> Optional[float]:
+    """Seconds since the OS started this process, if the platform exposes it."""
+    try:
+        with open("/proc/self/stat") as f:
+            # Field 22 (starttime) follows the parenthesized command name
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+# Time the interpreter spent before any server code ran
+PRE_IMPORT = _process_age()
+
+
+def mark(label: str):
+    """Record a startup phase as milliseconds since server code began loading."""
+    _phases.append((label, (time.perf_counter() - STARTED) * 1000))
+
+
+def first_websocket() -> bool:
+    """Record the first accepted WebSocket. Returns True only the first time."""
+    global _first_websocket
+    if _first_websocket is not None:
+        return False
+    _first_websocket = (time.perf_counter() - STARTED) * 1000
+    return True
+
+
+def report() -> str:
+    """One-line summary of startup phases."""
+    parts = []
+    if PRE_IMPORT is not None:
+        parts.append(f"interpreter={PRE_IMPORT * 1000:.0f}ms")
+    previous = 0.0
+    for label, at in _phases:
+        parts.append(f"{label}=+{at - previous:.0f}ms")
+        previous = at
+    if _first_websocket is not None:
+        parts.append(f"first_websocket={_first_websocket:.0f}ms")
+    return "⏱️  Startup: " + " ".join(parts)
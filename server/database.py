@@ -1,6 +1,14 @@
-from datetime import datetime
-from typing import Optional
-from sqlmodel import SQLModel, Field, create_engine, Session, select
+import json
+import time
+from datetime import datetime, timezone
+from typing import AsyncIterator, List, Optional, Tuple
+from sqlalchemy import case, event, func
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel, Field, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from latency_stats import ROLLUP_SECONDS, LatencySeries, bucket_index, empty_histogram, merge_rollups
+from rankings import PlayerTotals
+from settings import settings
 
 
 class LeaderboardEntry(SQLModel, table=True):
@@ -13,30 +21,107 @@ class LeaderboardEntry(SQLModel, table=True):
     player_score: int
     opponent_score: int
     avg_latency_ms: float
-    match_date: datetime = Field(default_factory=datetime.utcnow)
+    match_date: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     
     @property
     def won(self) -> bool:
         return self.player_score > self.opponent_score
 
 
-# Database setup
-DATABASE_URL = "sqlite:///./netpong.db"
-engine = create_engine(DATABASE_URL, echo=False)
+class MatchLatency(SQLModel, table=True):
+    """A match's RTT samples, compressed, with per-player percentiles."""
+    __tablename__ = "match_latency"
 
+    id: Optional[int] = Field(default=None, primary_key=True)
+    match_id: str = Field(index=True, unique=True)
+    started: float  # Unix time
+    ended: float = Field(index=True)
+    player1_name: str
+    player2_name: str
+    winner_slot: int
+    samples: int
+    player1_p95_ms: float
+    player2_p95_ms: float
+    series: bytes  # LatencySeries.encode()
+
+
+class LatencyRollup(SQLModel, table=True):
+    """RTT histogram for one hour, summed over every match that had samples in it."""
+    __tablename__ = "latency_rollup"
+
+    hour: int = Field(primary_key=True)  # Unix time of the hour's start
+    samples: int = 0
+    matches: int = 0
+    rtt_sum_ms: float = 0.0
+    rtt_max_ms: float = 0.0
+    histogram: str = ""  # JSON bucket counts, RTT_BUCKETS_MS plus +Inf
+    p95_players: str = ""  # Players per bucket of their match p95, counted in the hour the match ended
+    p95_wins: str = ""  # How many of those won
+
+
+def async_database_url(url: str) -> str:
+    """Pick the async driver for a plain URL, e.g. one handed out by a hosting provider."""
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    for scheme, driver in (("sqlite://", "sqlite+aiosqlite://"), ("postgresql://", "postgresql+asyncpg://")):
+        if url.startswith(scheme):
+            return driver + url[len(scheme):]
+    return url
+
+
+def _create_engine():
+    url = async_database_url(settings.database_url)
+    options = {}
+    if url.startswith("sqlite"):
+        # Each pooled connection keeps its compiled statements, so repeated
+        # queries skip SQLite's parser (asyncpg prepares statements by itself)
+        options["connect_args"] = {"cached_statements": settings.database_statement_cache_size}
+    else:
+        options["pool_pre_ping"] = True
+    if ":memory:" not in url:
+        options.update(
+            pool_size=settings.database_pool_size,
+            max_overflow=settings.database_max_overflow,
+            pool_timeout=settings.database_pool_timeout_seconds,
+        )
+    engine = create_async_engine(url, echo=False, **options)
+
+    if url.startswith("sqlite"):
+        @event.listens_for(engine.sync_engine, "connect")
+        def _sqlite_pragmas(dbapi_connection, _record):
+            # WAL lets readers run while a match result is being written
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute(f"PRAGMA busy_timeout={int(settings.database_pool_timeout_seconds * 1000)}")
+            cursor.close()
 
-def create_db_and_tables():
+    return engine
+
+
+# Database setup: NETPONG_DATABASE_URL picks the backend
+engine = _create_engine()
+async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+async def create_db_and_tables():
     """Initialize database tables."""
-    SQLModel.metadata.create_all(engine)
+    async with engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+
 
+async def close_database():
+    """Close pooled connections."""
+    await engine.dispose()
 
-def get_session():
+
+async def get_session() -> AsyncIterator[AsyncSession]:
     """Get database session."""
-    with Session(engine) as session:
+    async with async_session() as session:
         yield session
 
 
-def add_match_result(
+async def add_match_result(
     player_name: str,
     opponent_name: str,
     player_score: int,
@@ -44,7 +129,7 @@ def add_match_result(
     avg_latency_ms: float
 ) -> LeaderboardEntry:
     """Save a match result to the leaderboard."""
-    with Session(engine) as session:
+    async with async_session() as session:
         entry = LeaderboardEntry(
             player_name=player_name,
             opponent_name=opponent_name,
@@ -53,48 +138,149 @@ def add_match_result(
             avg_latency_ms=avg_latency_ms
         )
         session.add(entry)
-        session.commit()
-        session.refresh(entry)
+        await session.commit()
         return entry
 
 
-def get_leaderboard(limit: int = 10):
+def _player_totals_query():
+    return select(
+        LeaderboardEntry.player_name,
+        func.sum(case((LeaderboardEntry.player_score > LeaderboardEntry.opponent_score, 1), else_=0)),
+        func.count(),
+        func.sum(LeaderboardEntry.player_score),
+        func.sum(LeaderboardEntry.avg_latency_ms),
+    ).group_by(LeaderboardEntry.player_name)
+
+
+def _player_totals(rows) -> List[PlayerTotals]:
+    return [
+        PlayerTotals(name, int(wins or 0), matches, int(score or 0), float(latency or 0.0))
+        for name, wins, matches, score, latency in rows
+    ]
+
+
+async def get_leaderboard(limit: int = 10):
     """Get top players by win count and total score."""
-    with Session(engine) as session:
-        # Get all entries and calculate stats
-        statement = select(LeaderboardEntry)
-        results = session.exec(statement).all()
-        
-        # Aggregate by player
-        player_stats = {}
-        for entry in results:
-            name = entry.player_name
-            if name not in player_stats:
-                player_stats[name] = {
-                    "player_name": name,
-                    "total_wins": 0,
-                    "total_matches": 0,
-                    "total_score": 0,
-                    "avg_latency_ms": 0,
-                    "latency_sum": 0
-                }
-            
-            stats = player_stats[name]
-            stats["total_matches"] += 1
-            stats["total_score"] += entry.player_score
-            stats["latency_sum"] += entry.avg_latency_ms
-            if entry.won:
-                stats["total_wins"] += 1
-        
-        # Calculate averages and sort
-        leaderboard = []
-        for stats in player_stats.values():
-            stats["avg_latency_ms"] = round(stats["latency_sum"] / stats["total_matches"], 2)
-            stats["win_rate"] = round(stats["total_wins"] / stats["total_matches"] * 100, 1)
-            del stats["latency_sum"]  # Remove temporary field
-            leaderboard.append(stats)
-        
-        # Sort by wins, then total score
-        leaderboard.sort(key=lambda x: (x["total_wins"], x["total_score"]), reverse=True)
-        
-        return leaderboard[:limit]
+    async with async_session() as session:
+        # Aggregated and sorted by the database; only the top rows come back
+        wins = func.sum(case((LeaderboardEntry.player_score > LeaderboardEntry.opponent_score, 1), else_=0))
+        statement = (
+            _player_totals_query()
+            .order_by(wins.desc(), func.sum(LeaderboardEntry.player_score).desc())
+            .limit(limit)
+        )
+        return [player.to_dict() for player in _player_totals(await session.exec(statement))]
+
+
+async def get_player_totals() -> Tuple[List[PlayerTotals], int]:
+    """Every player's aggregate stats, and the last leaderboard row they include."""
+    async with async_session() as session:
+        totals = _player_totals(await session.exec(_player_totals_query()))
+        last_id = (await session.exec(select(func.max(LeaderboardEntry.id)))).one()
+        return totals, last_id or 0
+
+
+async def add_match_latency(
+    series: LatencySeries,
+    player1_name: str,
+    player2_name: str,
+    winner_slot: int
+) -> MatchLatency:
+    """Store a match's latency series and fold it into the hourly rollups."""
+    ended = time.time()
+    summaries = [series.summary(slot) for slot in (0, 1)]
+    hours = series.hourly_histograms()
+    end_hour = int(ended // ROLLUP_SECONDS * ROLLUP_SECONDS)
+    hours.setdefault(end_hour, (empty_histogram(), 0.0, 0.0))
+
+    async with async_session() as session:
+        entry = MatchLatency(
+            match_id=series.match_id,
+            started=series.started,
+            ended=ended,
+            player1_name=player1_name,
+            player2_name=player2_name,
+            winner_slot=winner_slot,
+            samples=len(series),
+            player1_p95_ms=summaries[0]["p95_ms"],
+            player2_p95_ms=summaries[1]["p95_ms"],
+            series=series.encode()
+        )
+        session.add(entry)
+
+        for hour, (counts, rtt_sum, rtt_max) in hours.items():
+            rollup = await session.get(LatencyRollup, hour) or LatencyRollup(
+                hour=hour,
+                histogram=json.dumps(empty_histogram()),
+                p95_players=json.dumps(empty_histogram()),
+                p95_wins=json.dumps(empty_histogram())
+            )
+            histogram = json.loads(rollup.histogram)
+            rollup.histogram = json.dumps([a + b for a, b in zip(histogram, counts)])
+            rollup.samples += sum(counts)
+            rollup.rtt_sum_ms += rtt_sum
+            rollup.rtt_max_ms = max(rollup.rtt_max_ms, rtt_max)
+
+            if hour == end_hour:
+                rollup.matches += 1
+                players = json.loads(rollup.p95_players)
+                wins = json.loads(rollup.p95_wins)
+                for slot, summary in enumerate(summaries):
+                    if summary["samples"]:
+                        index = bucket_index(summary["p95_ms"])
+                        players[index] += 1
+                        wins[index] += slot == winner_slot
+                rollup.p95_players = json.dumps(players)
+                rollup.p95_wins = json.dumps(wins)
+            session.add(rollup)
+
+        await session.commit()
+        return entry
+
+
+async def get_latency_stats(since: float, until: float, step_seconds: Optional[int] = None) -> dict:
+    """
+    RTT percentiles, histogram and win rate by match p95 over [since, until),
+    from the hourly rollups. With `step_seconds`, also a series of smaller windows.
+    """
+    first = int(since // ROLLUP_SECONDS * ROLLUP_SECONDS)
+    async with async_session() as session:
+        statement = (
+            select(LatencyRollup)
+            .where(LatencyRollup.hour >= first, LatencyRollup.hour < until)
+            .order_by(LatencyRollup.hour)
+        )
+        rows = [rollup.model_dump() for rollup in (await session.exec(statement)).all()]
+
+    stats = merge_rollups(rows)
+    if step_seconds:
+        step = max(ROLLUP_SECONDS, step_seconds // ROLLUP_SECONDS * ROLLUP_SECONDS)
+        windows: List[dict] = []
+        for start in range(first, int(until), step):
+            window = merge_rollups([row for row in rows if start <= row["hour"] < start + step])
+            windows.append({
+                "from": start,
+                "samples": window["samples"],
+                "matches": window["matches"],
+                **window["percentiles"],
+            })
+        stats["windows"] = windows
+    return stats
+
+
+async def get_match_latency(match_id: str) -> Optional[dict]:
+    """One match's decoded series with exact per-player percentiles."""
+    async with async_session() as session:
+        entry = (await session.exec(select(MatchLatency).where(MatchLatency.match_id == match_id))).first()
+    if entry is None:
+        return None
+    series = LatencySeries.decode(entry.match_id, entry.series)
+    return {
+        "match_id": entry.match_id,
+        "players": [entry.player1_name, entry.player2_name],
+        "winner_slot": entry.winner_slot,
+        "ended": entry.ended,
+        "compressed_bytes": len(entry.series),
+        "summary": [series.summary(slot) for slot in (0, 1)],
+        "series": series.to_dict()
+    }
@@ -1,6 +1,6 @@
-import time
 import math
-from typing import Dict, Optional, Tuple
+import random
+from typing import Callable, Dict, Optional, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
 
@@ -77,14 +77,27 @@ class Game:
     FPS = 60
     FRAME_TIME = 1.0 / FPS
     
-    def __init__(self, room_code: str):
+    def __init__(self, room_code: str, seed: Optional[int] = None):
         self.room_code = room_code
         self.state = GameState.WAITING
         self.players: Dict[str, PlayerState] = {}
         self.ball = Ball()
-        self.last_update = time.time()
         self.frame_count = 0
         
+        # Determinism: per-room RNG and a count of fixed steps simulated
+        self.seed = seed if seed is not None else random.SystemRandom().getrandbits(63)
+        self.rng = random.Random(self.seed)
+        self.tick = 0
+        
+        # Called with (tick, player_slot, direction) whenever an input changes
+        self.input_listener: Optional[Callable[[int, int, int], None]] = None
+        
+        # Called with the name of each collision branch taken (for simulate.py)
+        self.collision_listener: Optional[Callable[[str], None]] = None
+        
+        # Latest direction received per player since the last tick
+        self.pending_inputs: Dict[str, int] = {}
+        
     def add_player(self, player_id: str, name: str) -> bool:
         """Add a player to the game. Returns True if successful."""
         if len(self.players) >= 2:
@@ -119,11 +132,10 @@ class Game:
     
     def reset_ball(self, direction: int = 1):
         """Reset ball to center with random angle."""
-        import random
         self.ball.position = Vector2(self.CANVAS_WIDTH / 2, self.CANVAS_HEIGHT / 2)
         
         # Random angle between -45 and 45 degrees
-        angle = random.uniform(-math.pi / 4, math.pi / 4)
+        angle = self.rng.uniform(-math.pi / 4, math.pi / 4)
         speed = 300.0
         
         self.ball.velocity = Vector2(
@@ -131,26 +143,49 @@ class Game:
             speed * math.sin(angle)
         )
     
+    def player_slot(self, player_id: str) -> int:
+        """Index of a player (0 = left, 1 = right), or -1 if not in the game."""
+        for slot, pid in enumerate(self.players):
+            if pid == player_id:
+                return slot
+        return -1
+    
     def update_paddle_input(self, player_id: str, direction: int):
         """Update paddle velocity based on input (-1, 0, or 1)."""
         if player_id in self.players:
+            direction = max(-1, min(1, int(direction)))
             paddle = self.players[player_id].paddle
-            paddle.velocity = direction * paddle.speed
+            velocity = direction * paddle.speed
+            
+            if velocity != paddle.velocity and self.input_listener:
+                self.input_listener(self.tick, self.player_slot(player_id), direction)
+            paddle.velocity = velocity
+    
+    def queue_paddle_input(self, player_id: str, direction: int):
+        """Buffer an input; only the last one before the next tick is applied."""
+        self.pending_inputs[player_id] = direction
+    
+    def apply_pending_inputs(self):
+        """Apply buffered inputs at the tick boundary."""
+        if self.pending_inputs:
+            for player_id, direction in self.pending_inputs.items():
+                self.update_paddle_input(player_id, direction)
+            self.pending_inputs.clear()
     
     def update(self) -> Optional[str]:
         """
-        Update game state. Returns event type if significant event occurs.
+        Advance the game by one fixed step of FRAME_TIME.
+        Returns event type if significant event occurs.
         Should be called at FPS rate.
         """
+        self.apply_pending_inputs()
+        
         if self.state != GameState.PLAYING:
             return None
         
-        current_time = time.time()
-        dt = current_time - self.last_update
-        self.last_update = current_time
-        
-        # Cap delta time to prevent large jumps
-        dt = min(dt, self.FRAME_TIME * 2)
+        # Fixed step so a match replays identically from its seed and inputs
+        dt = self.FRAME_TIME
+        self.tick += 1
         
         # Update paddles
         player_list = list(self.players.values())
@@ -166,12 +201,17 @@ class Game:
         self.ball.position = self.ball.position + self.ball.velocity * dt
         
         # Ball collision with top/bottom walls
+        listener = self.collision_listener
         if self.ball.position.y - self.ball.radius <= 0:
             self.ball.position.y = self.ball.radius
             self.ball.velocity.y = abs(self.ball.velocity.y)
+            if listener:
+                listener("wall_top")
         elif self.ball.position.y + self.ball.radius >= self.CANVAS_HEIGHT:
             self.ball.position.y = self.CANVAS_HEIGHT - self.ball.radius
             self.ball.velocity.y = -abs(self.ball.velocity.y)
+            if listener:
+                listener("wall_bottom")
         
         # Ball collision with paddles
         if len(player_list) >= 2:
@@ -189,6 +229,10 @@ class Game:
                     # Add spin based on paddle position
                     relative_intersect = (left_paddle.y - self.ball.position.y) / (left_paddle.height / 2)
                     self.ball.velocity.y += -relative_intersect * 100
+                    if listener:
+                        listener("paddle_left")
+                elif listener:
+                    listener("paddle_left_receding")
             
             # Right paddle (player 1)
             right_paddle = player_list[1].paddle
@@ -204,6 +248,10 @@ class Game:
                     # Add spin based on paddle position
                     relative_intersect = (right_paddle.y - self.ball.position.y) / (right_paddle.height / 2)
                     self.ball.velocity.y += -relative_intersect * 100
+                    if listener:
+                        listener("paddle_right")
+                elif listener:
+                    listener("paddle_right_receding")
         
         # Cap ball speed
         speed = math.sqrt(self.ball.velocity.x ** 2 + self.ball.velocity.y ** 2)
@@ -211,6 +259,8 @@ class Game:
             scale = self.ball.max_speed / speed
             self.ball.velocity.x *= scale
             self.ball.velocity.y *= scale
+            if listener:
+                listener("speed_cap")
         
         # Check for scoring
         if self.ball.position.x < 0:
@@ -264,6 +314,56 @@ class Game:
             ]
         }
     
+    def to_snapshot(self) -> dict:
+        """Full simulation state, for persisting a room across restarts."""
+        version, internal, gauss_next = self.rng.getstate()
+        return {
+            "room_code": self.room_code,
+            "state": self.state.value,
+            "seed": self.seed,
+            "rng": [version, list(internal), gauss_next],
+            "tick": self.tick,
+            "frame": self.frame_count,
+            "ball": [
+                self.ball.position.x, self.ball.position.y,
+                self.ball.velocity.x, self.ball.velocity.y
+            ],
+            "players": [
+                {
+                    "id": p.player_id,
+                    "name": p.name,
+                    "paddle_y": p.paddle.y,
+                    "paddle_velocity": p.paddle.velocity,
+                    "score": p.score,
+                    "latency_samples": list(p.latency_samples)
+                }
+                for p in self.players.values()
+            ]
+        }
+    
+    @classmethod
+    def from_snapshot(cls, data: dict) -> "Game":
+        """Rebuild a game from to_snapshot() output without re-running start_game."""
+        game = cls(data["room_code"], seed=data["seed"])
+        version, internal, gauss_next = data["rng"]
+        game.rng.setstate((version, tuple(internal), gauss_next))
+        game.state = GameState(data["state"])
+        game.tick = data["tick"]
+        game.frame_count = data["frame"]
+        
+        x, y, vx, vy = data["ball"]
+        game.ball.position = Vector2(x, y)
+        game.ball.velocity = Vector2(vx, vy)
+        
+        for p in data["players"]:
+            player = PlayerState(player_id=p["id"], name=p["name"], score=p["score"])
+            player.paddle.y = p["paddle_y"]
+            player.paddle.velocity = p["paddle_velocity"]
+            player.latency_samples = list(p["latency_samples"])
+            game.players[player.player_id] = player
+        
+        return game
+    
     def get_match_result(self) -> Optional[Tuple[str, str, int, int, float]]:
         """Get match result (player1_name, player2_name, score1, score2, avg_latency)."""
         if self.state != GameState.FINISHED or len(self.players) < 2:
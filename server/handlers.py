@@ -0,0 +1,260 @@
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Optional
+from fastapi import WebSocket
+
+from log import bind
+from rate_limit import ConnectionLimiter
+from room_manager import manager
+from settings import settings
+
+
+@dataclass
+class ClientConnection:
+    """Per-socket state for the /ws endpoint."""
+    player_id: str
+    websocket: WebSocket
+    last_latency_ms: float = 0.0
+    received_at_ms: float = 0.0  # Wall clock when the current message arrived
+    closing: bool = False
+    limiter: ConnectionLimiter = field(default_factory=lambda: ConnectionLimiter(
+        message_rate=settings.ws_message_rate,
+        message_burst=settings.ws_message_burst,
+        violation_rate=settings.ws_violation_rate,
+        violation_burst=settings.ws_violation_burst,
+    ))
+
+    @property
+    def room_code(self) -> Optional[str]:
+        # Quick match can seat this player in a room between messages
+        return manager.get_player_room(self.player_id)
+
+    async def send(self, message: dict):
+        await self.websocket.send_json(message)
+
+    async def error(self, message: str):
+        await self.send({"type": "error", "message": message})
+
+
+def valid_latency(value) -> bool:
+    """A client-reported RTT we can use: a finite, non-negative number."""
+    return isinstance(value, (int, float)) and not isinstance(value, bool) \
+        and math.isfinite(value) and value >= 0
+
+
+DRAINING_MESSAGE = "Server is restarting. Please try again shortly."
+OVERLOADED_MESSAGE = "Server is busy. Please try again shortly."
+
+
+async def admit(conn: ClientConnection) -> bool:
+    """
+    Gate for anything that can start a match. Refused when draining, or when
+    existing matches are already using up the tick budget; the retry hint
+    lets clients back off (or a directory send them elsewhere).
+    """
+    if manager.draining:
+        await conn.error(DRAINING_MESSAGE)
+        return False
+    if manager.overloaded:
+        await conn.send({
+            "type": "error",
+            "message": OVERLOADED_MESSAGE,
+            "reason": "overloaded",
+            "retry_after_ms": settings.admission_retry_ms
+        })
+        return False
+    return True
+
+
+async def handle_create_room(conn: ClientConnection, data: dict):
+    """Create a room with this connection as the first player."""
+    if not await admit(conn):
+        return
+
+    manager.cancel_quick_match(conn.player_id)
+    player_name = data.get("player_name", "Player")
+    room_code = await manager.create_room(conn.player_id, player_name, conn.websocket)
+
+    if room_code:
+        await conn.send({
+            "type": "room_created",
+            "room_code": room_code,
+            "player_id": conn.player_id
+        })
+    else:
+        await conn.error("Server is full. Please try again later.")
+
+
+async def handle_join_room(conn: ClientConnection, data: dict):
+    """Join an existing room by code."""
+    if not await admit(conn):
+        return
+
+    manager.cancel_quick_match(conn.player_id)
+    requested_code = manager.room_codes.normalize(data.get("room_code", ""))
+    player_name = data.get("player_name", "Player")
+
+    success = bool(requested_code) and await manager.join_room(
+        requested_code, conn.player_id, player_name, conn.websocket
+    )
+
+    if success:
+        await conn.send({
+            "type": "room_joined",
+            "room_code": requested_code,
+            "player_id": conn.player_id
+        })
+
+        # Notify other players
+        await manager.broadcast_to_room(requested_code, {
+            "type": "player_joined",
+            "player_name": player_name
+        }, exclude=conn.player_id)
+    else:
+        await conn.error("Failed to join room. Room may be full or not exist.")
+
+
+async def handle_quick_match(conn: ClientConnection, data: dict):
+    """Queue for a latency-matched opponent."""
+    if not await admit(conn):
+        return
+    if conn.room_code:
+        await conn.error("Already in a room.")
+        return
+
+    player_name = data.get("player_name", "Player")
+    rtt_ms = data.get("latency_ms")
+    if not valid_latency(rtt_ms):
+        rtt_ms = conn.last_latency_ms
+
+    matched = await manager.quick_match(conn.player_id, player_name, rtt_ms, conn.websocket)
+    if not matched:
+        await conn.send({
+            "type": "match_queued",
+            "queue_size": len(manager.match_queue)
+        })
+
+
+async def handle_cancel_quick_match(conn: ClientConnection, data: dict):
+    """Leave the quick-match queue."""
+    manager.cancel_quick_match(conn.player_id)
+    await conn.send({"type": "match_cancelled"})
+
+
+async def handle_spectate_room(conn: ClientConnection, data: dict):
+    """Watch a room without playing."""
+    if conn.room_code:
+        await conn.error("Already in a room.")
+        return
+
+    requested_code = manager.room_codes.normalize(data.get("room_code", ""))
+
+    if not requested_code or not await manager.spectate_room(requested_code, conn.player_id, conn.websocket):
+        await conn.error("Failed to spectate. Room may not exist.")
+
+
+async def handle_paddle_input(conn: ClientConnection, data: dict):
+    """Buffer a paddle direction; inputs are coalesced until the next tick."""
+    direction = data.get("direction", 0)  # -1, 0, or 1
+    if not isinstance(direction, (int, float)):
+        return
+    direction = (direction > 0) - (direction < 0)
+
+    manager.queue_input(conn.player_id, direction)
+
+
+async def handle_ping(conn: ClientConnection, data: dict):
+    """
+    Respond to ping for latency measurement and clock sync. The client's
+    send time plus our receive and send times (ms) give the four NTP
+    timestamps for estimating clock offset and one-way delay.
+    """
+    client_timestamp = data.get("timestamp", time.time())
+
+    await conn.send({
+        "type": "pong",
+        "client_timestamp": client_timestamp,
+        "server_timestamp": time.time(),
+        "server_received_ms": conn.received_at_ms,
+        "server_sent_ms": time.time() * 1000
+    })
+
+
+async def handle_set_protocol(conn: ClientConnection, data: dict):
+    """
+    Choose how game state arrives: "frames" (a game_state every tick, the
+    default) or "trajectory" (segments only when motion changes, plus
+    periodic game_state keyframes).
+    """
+    mode = data.get("mode")
+    if mode not in ("frames", "trajectory"):
+        await conn.error("Unknown protocol mode")
+        return
+
+    await manager.set_protocol(conn.player_id, mode)
+    await conn.send({"type": "protocol", "mode": mode})
+
+
+async def handle_latency_update(conn: ClientConnection, data: dict):
+    """Record a client-measured latency sample."""
+    latency_ms = data.get("latency_ms", 0)
+    if not valid_latency(latency_ms):
+        return
+    conn.last_latency_ms = latency_ms
+
+    room_code = conn.room_code
+    if room_code:
+        game = manager.get_room(room_code)
+        if game and conn.player_id in game.players:
+            game.players[conn.player_id].add_latency_sample(latency_ms)
+            manager.record_latency(room_code, conn.player_id, latency_ms)
+
+
+async def handle_resume(conn: ClientConnection, data: dict):
+    """Take back a seat by session token, after a dropped connection or a server restart."""
+    token = data.get("session_token")
+    player_id = None
+    if isinstance(token, str) and not conn.room_code:
+        player_id = await manager.resume(token, conn.websocket)
+
+    if player_id is None:
+        await conn.send({"type": "resume_failed"})
+        return
+
+    # The fresh identity issued at connect is no longer needed
+    manager.forget_session(conn.player_id)
+    conn.player_id = player_id
+    bind(player=player_id)
+
+    room_code = manager.get_player_room(player_id)
+    game = manager.get_room(room_code)
+    await conn.send({
+        "type": "resumed",
+        "player_id": player_id,
+        "room_code": room_code,
+        "session_token": token,
+        "state": game.get_state_dict()
+    })
+
+
+async def handle_disconnect(conn: ClientConnection, data: dict):
+    """Client asked to close the connection."""
+    conn.closing = True
+
+
+MessageHandler = Callable[[ClientConnection, dict], Awaitable[None]]
+
+MESSAGE_HANDLERS: Dict[str, MessageHandler] = {
+    "create_room": handle_create_room,
+    "join_room": handle_join_room,
+    "quick_match": handle_quick_match,
+    "cancel_quick_match": handle_cancel_quick_match,
+    "spectate_room": handle_spectate_room,
+    "paddle_input": handle_paddle_input,
+    "ping": handle_ping,
+    "latency_update": handle_latency_update,
+    "set_protocol": handle_set_protocol,
+    "resume": handle_resume,
+    "disconnect": handle_disconnect,
+}
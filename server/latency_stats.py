@@ -0,0 +1,221 @@
+"""
+Per-match RTT time series and histogram rollups.
+
+During a match every `latency_update` is appended to a `LatencySeries`:
+three parallel columns (ms since the match started, player slot, RTT in
+tenths of a ms). At game over the columns are delta-encoded and zlib
+compressed into one blob, a few bytes per sample, and the same samples are
+folded into fixed-bucket histograms, one per hour. `/stats/latency` merges
+those hourly rollups, so answering a query never touches raw samples.
+"""
+
+import json
+import math
+import struct
+import sys
+import time
+import zlib
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Blob layout (little-endian): magic "NPL1" | version u8 | started f64 | count u32,
+# then zlib(time deltas u32[count] | slots u8[count] | rtt u16[count])
+MAGIC = b"NPL1"
+VERSION = 1
+HEADER = struct.Struct("<4sBdI")
+RTT_SCALE = 10  # RTT is stored in tenths of a millisecond
+RTT_MAX = 0xFFFF  # ~6.5 s; longer samples are clamped
+ROLLUP_SECONDS = 3600
+
+# Upper bounds (ms) of the RTT histogram buckets; the last is +Inf
+RTT_BUCKETS_MS = (
+    5, 10, 15, 20, 25, 30, 40, 50, 60, 70, 80, 90, 100, 120, 140, 160, 180, 200,
+    250, 300, 350, 400, 500, 600, 800, 1000, 1500, 2000, 3000, 5000,
+)
+PERCENTILES = (50, 90, 95, 99)
+
+
+def _little_endian(column: array) -> bytes:
+    if sys.byteorder == "big":
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+def _from_little_endian(typecode: str, data: bytes) -> array:
+    column = array(typecode)
+    column.frombytes(data)
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column
+
+
+def bucket_index(rtt_ms: float) -> int:
+    return bisect_left(RTT_BUCKETS_MS, rtt_ms)
+
+
+def empty_histogram() -> List[int]:
+    return [0] * (len(RTT_BUCKETS_MS) + 1)
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Exact percentile (linear interpolation) of an already sorted sequence."""
+    if not values:
+        return 0.0
+    rank = (len(values) - 1) * q / 100
+    low = math.floor(rank)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+def histogram_percentile(counts: Sequence[int], q: float, max_ms: float = 0.0) -> float:
+    """
+    Percentile estimated from bucket counts, interpolating inside the bucket
+    it falls in. The open-ended last bucket is capped at `max_ms`.
+    """
+    total = sum(counts)
+    if not total:
+        return 0.0
+    target = total * q / 100
+    seen = 0
+    for index, count in enumerate(counts):
+        if count and seen + count >= target:
+            lower = RTT_BUCKETS_MS[index - 1] if index else 0.0
+            upper = RTT_BUCKETS_MS[index] if index < len(RTT_BUCKETS_MS) else max(max_ms, lower)
+            if max_ms:
+                upper = min(upper, max(max_ms, lower))
+            return lower + (upper - lower) * (target - seen) / count
+        seen += count
+    return max_ms
+
+
+class LatencySeries:
+    """Columnar RTT samples for one match."""
+
+    def __init__(self, match_id: str, started: Optional[float] = None):
+        self.match_id = match_id
+        self.started = time.time() if started is None else started
+        self.offsets = array("I")  # ms since `started`
+        self.slots = array("B")
+        self.rtts = array("H")  # tenths of a ms
+
+    def __len__(self) -> int:
+        return len(self.rtts)
+
+    def add(self, slot: int, rtt_ms: float, now: Optional[float] = None):
+        """Append one sample; samples arrive in time order."""
+        now = time.time() if now is None else now
+        offset = max(0, int((now - self.started) * 1000))
+        if self.offsets and offset < self.offsets[-1]:
+            offset = self.offsets[-1]  # Wall clock stepped back; keep the column monotonic
+        self.offsets.append(min(offset, 0xFFFFFFFF))
+        self.slots.append(slot & 0xFF)
+        self.rtts.append(min(RTT_MAX, max(0, round(rtt_ms * RTT_SCALE))))
+
+    def encode(self) -> bytes:
+        """Delta-encode the time column and compress all three columns together."""
+        deltas = array("I", self.offsets)
+        for i in range(len(deltas) - 1, 0, -1):
+            deltas[i] -= deltas[i - 1]
+        body = _little_endian(deltas) + _little_endian(self.slots) + _little_endian(self.rtts)
+        return HEADER.pack(MAGIC, VERSION, self.started, len(self)) + zlib.compress(body, 9)
+
+    @classmethod
+    def decode(cls, match_id: str, blob: bytes) -> "LatencySeries":
+        magic, version, started, count = HEADER.unpack_from(blob)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a latency series")
+        body = zlib.decompress(blob[HEADER.size:])
+        if len(body) != count * 7:
+            raise ValueError("Truncated latency series")
+
+        series = cls(match_id, started)
+        series.offsets = _from_little_endian("I", body[:count * 4])
+        for i in range(1, count):
+            series.offsets[i] += series.offsets[i - 1]
+        series.slots = _from_little_endian("B", body[count * 4:count * 5])
+        series.rtts = _from_little_endian("H", body[count * 5:])
+        return series
+
+    def rtts_ms(self, slot: Optional[int] = None) -> List[float]:
+        return [
+            rtt / RTT_SCALE for s, rtt in zip(self.slots, self.rtts)
+            if slot is None or s == slot
+        ]
+
+    def summary(self, slot: Optional[int] = None) -> dict:
+        """Exact percentiles over this match's samples."""
+        values = sorted(self.rtts_ms(slot))
+        return {
+            "samples": len(values),
+            "mean_ms": round(sum(values) / len(values), 2) if values else 0.0,
+            "max_ms": values[-1] if values else 0.0,
+            **{f"p{q}_ms": round(percentile(values, q), 2) for q in PERCENTILES},
+        }
+
+    def hourly_histograms(self) -> Dict[int, Tuple[List[int], float, float]]:
+        """Rollup hour (Unix seconds) -> (bucket counts, RTT sum, RTT max)."""
+        hours: Dict[int, Tuple[List[int], float, float]] = {}
+        for offset, rtt in zip(self.offsets, self.rtts):
+            hour = int((self.started + offset / 1000) // ROLLUP_SECONDS * ROLLUP_SECONDS)
+            counts, total, peak = hours.get(hour) or (empty_histogram(), 0.0, 0.0)
+            rtt_ms = rtt / RTT_SCALE
+            counts[bucket_index(rtt_ms)] += 1
+            hours[hour] = (counts, total + rtt_ms, max(peak, rtt_ms))
+        return hours
+
+    def to_dict(self) -> dict:
+        return {
+            "match_id": self.match_id,
+            "started": self.started,
+            "offsets_ms": list(self.offsets),
+            "slots": list(self.slots),
+            "rtt_ms": self.rtts_ms(),
+        }
+
+
+def merge_rollups(rows: Sequence[dict]) -> dict:
+    """
+    Combine rollup rows (as stored: JSON-encoded bucket lists) into one
+    window's percentiles, histogram and RTT-vs-win-rate table.
+    """
+    counts = empty_histogram()
+    p95_players = empty_histogram()
+    p95_wins = empty_histogram()
+    samples = matches = 0
+    rtt_sum = rtt_max = 0.0
+    for row in rows:
+        for index, count in enumerate(json.loads(row["histogram"])):
+            counts[index] += count
+        for index, count in enumerate(json.loads(row["p95_players"])):
+            p95_players[index] += count
+        for index, count in enumerate(json.loads(row["p95_wins"])):
+            p95_wins[index] += count
+        samples += row["samples"]
+        matches += row["matches"]
+        rtt_sum += row["rtt_sum_ms"]
+        rtt_max = max(rtt_max, row["rtt_max_ms"])
+
+    bounds = list(RTT_BUCKETS_MS) + ["+Inf"]
+    return {
+        "samples": samples,
+        "matches": matches,
+        "mean_ms": round(rtt_sum / samples, 2) if samples else 0.0,
+        "max_ms": rtt_max,
+        "percentiles": {
+            f"p{q}_ms": round(histogram_percentile(counts, q, rtt_max), 2) for q in PERCENTILES
+        },
+        "histogram": [
+            {"le": bound, "count": count} for bound, count in zip(bounds, counts) if count
+        ],
+        "win_rate_by_p95": [
+            {
+                "le": bound,
+                "players": players,
+                "wins": wins,
+                "win_rate": round(wins / players * 100, 1),
+            }
+            for bound, players, wins in zip(bounds, p95_players, p95_wins) if players
+        ],
+    }
@@ -0,0 +1,184 @@
+import asyncio
+import json
+from bisect import bisect_right
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+from fastapi import WebSocket
+from log import log
+
+
+class RoomIndex:
+    """
+    Lobby-facing summary of every room, kept up to date as rooms change.
+
+    The room manager pushes a small summary row whenever something a lobby
+    cares about changes (players, state, spectators), so listing never walks
+    the game objects. Rows are ordered by creation; a cursor is the sequence
+    number of the last row a client saw, found again with a binary search.
+    Closed rooms leave a hole in the order that is compacted away once holes
+    outnumber live rows.
+    """
+
+    def __init__(self):
+        self.rooms: Dict[str, dict] = {}  # code -> summary row
+        self.listener: Optional[Callable[[str, Optional[dict]], None]] = None
+        self._seq = 0
+        self._order: List[int] = []  # creation sequence numbers, ascending
+        self._by_seq: Dict[int, str] = {}  # live sequence -> code
+        self._seq_of: Dict[str, int] = {}  # code -> sequence
+
+    def __len__(self) -> int:
+        return len(self.rooms)
+
+    def update(self, code: str, row: dict):
+        """Insert or replace a room's row. Unchanged rows are ignored."""
+        if self.rooms.get(code) == row:
+            return
+        if code not in self._seq_of:
+            self._seq += 1
+            self._order.append(self._seq)
+            self._by_seq[self._seq] = code
+            self._seq_of[code] = self._seq
+        self.rooms[code] = row
+        if self.listener:
+            self.listener(code, row)
+
+    def remove(self, code: str):
+        seq = self._seq_of.pop(code, None)
+        if seq is None:
+            return
+        del self._by_seq[seq]
+        del self.rooms[code]
+        if len(self._order) > 64 and len(self._order) > 2 * len(self._by_seq):
+            self._order = [s for s in self._order if s in self._by_seq]
+        if self.listener:
+            self.listener(code, None)
+
+    def page(
+        self,
+        limit: int,
+        cursor: Optional[int] = None,
+        state: Optional[str] = None,
+        joinable: Optional[bool] = None,
+    ) -> Tuple[List[dict], Optional[int]]:
+        """Up to `limit` matching rows after `cursor`, and the cursor for the next page."""
+        start = bisect_right(self._order, cursor) if cursor is not None else 0
+        rows: List[dict] = []
+        for seq in self._order[start:]:
+            code = self._by_seq.get(seq)
+            if code is None:
+                continue
+            row = self.rooms[code]
+            if state is not None and row["state"] != state:
+                continue
+            if joinable is not None and row["joinable"] != joinable:
+                continue
+            rows.append(row)
+            if len(rows) == limit:
+                return rows, seq
+        return rows, None
+
+    def all(self) -> List[dict]:
+        return [self.rooms[self._by_seq[s]] for s in self._order if s in self._by_seq]
+
+
+class LobbyFeed:
+    """
+    Pushes room index changes to lobby viewers over WebSocket.
+
+    Changes are coalesced per room for `flush_interval` seconds and sent as
+    one `lobby_update` batch, encoded once for every viewer. A new viewer
+    (or one that fell further behind than the kept history) gets a full
+    `lobby_snapshot` first. Rows are whole, so applying a batch that a
+    snapshot already reflects is harmless.
+    """
+
+    def __init__(self, index: RoomIndex, flush_interval: float = 0.25, history: int = 64):
+        self.index = index
+        self.flush_interval = flush_interval
+        self.version = 0
+        self.history: Deque[Tuple[int, str]] = deque(maxlen=history)  # (version, lobby_update text)
+        self._pending: Dict[str, Optional[dict]] = {}  # code -> row, None if closed
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._snapshot: Optional[Tuple[int, str]] = None
+        self._changed: Optional[asyncio.Future] = None
+        self._senders: Dict[str, asyncio.Task] = {}  # viewer_id -> sender task
+        index.listener = self.record
+
+    def __len__(self) -> int:
+        return len(self._senders)
+
+    def record(self, code: str, row: Optional[dict]):
+        """Note a room change; it goes out with the next batch."""
+        if not self._senders:
+            # Nobody to tell; the next viewer starts from a fresh snapshot
+            self.history.clear()
+            self._snapshot = None
+            return
+        self._pending[code] = row
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.flush_interval, self.flush)
+
+    def flush(self):
+        self._flush_handle = None
+        if not self._pending:
+            return
+        changes = [
+            {"op": "upsert", "room": row} if row is not None else {"op": "remove", "code": code}
+            for code, row in self._pending.items()
+        ]
+        self._pending.clear()
+        self.version += 1
+        self.history.append((self.version, json.dumps(
+            {"type": "lobby_update", "version": self.version, "changes": changes},
+            separators=(",", ":"),
+        )))
+        self._wake()
+
+    def snapshot_text(self) -> str:
+        if self._snapshot is None or self._snapshot[0] != self.version:
+            self._snapshot = (self.version, json.dumps(
+                {"type": "lobby_snapshot", "version": self.version, "rooms": self.index.all()},
+                separators=(",", ":"),
+            ))
+        return self._snapshot[1]
+
+    def add(self, viewer_id: str, websocket: WebSocket):
+        self.remove(viewer_id)
+        self._senders[viewer_id] = asyncio.create_task(self._sender(websocket))
+
+    def remove(self, viewer_id: str):
+        task = self._senders.pop(viewer_id, None)
+        if task:
+            task.cancel()
+
+    def _wake(self):
+        if self._changed is not None and not self._changed.done():
+            self._changed.set_result(None)
+        self._changed = None
+
+    async def _wait(self):
+        if self._changed is None:
+            self._changed = asyncio.get_running_loop().create_future()
+        await asyncio.shield(self._changed)
+
+    async def _sender(self, websocket: WebSocket):
+        sent: Optional[int] = None
+        try:
+            while True:
+                if sent is None or (self.history and sent < self.history[0][0] - 1) or \
+                        (not self.history and sent < self.version):
+                    sent = self.version
+                    await websocket.send_text(self.snapshot_text())
+                    continue
+                batches = [(v, text) for v, text in self.history if v > sent]
+                if not batches:
+                    await self._wait()
+                    continue
+                for version, text in batches:
+                    await websocket.send_text(text)
+                    sent = version
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            log.warning("Lobby send failed", error=e)
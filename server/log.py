@@ -0,0 +1,158 @@
+"""
+Structured, non-blocking logging for the server.
+
+Callers only build a LogRecord and put it on a queue; a background thread
+formats it and writes it out, so a slow terminal or log shipper can never
+stall the event loop (and with it, game ticks). Lines carry room and
+player context, taken from explicit fields or from the current task
+(see bind()).
+
+Warnings and errors that repeat (same message, room and player) are logged
+once per window; the rest are only counted, and the count is attached to
+the next line that gets through.
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional, Tuple
+
+_room: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("log_room", default=None)
+_player: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("log_player", default=None)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_lock = threading.Lock()
+
+
+def bind(room: Optional[str] = None, player: Optional[str] = None):
+    """
+    Set the room/player context for everything logged from the current task
+    (and tasks it creates afterwards). Omitted values are cleared.
+    """
+    _room.set(room)
+    _player.set(player)
+
+
+class _EnqueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that defers all formatting to the listener thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class StructuredFormatter(logging.Formatter):
+    """`time LEVEL message key=value ...` lines, or one JSON object per line."""
+
+    def __init__(self, as_json: bool = False):
+        super().__init__()
+        self.as_json = as_json
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = getattr(record, "fields", {})
+        timestamp = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+        timestamp += f".{int(record.msecs):03d}Z"
+
+        if self.as_json:
+            return json.dumps(
+                {"time": timestamp, "level": record.levelname, "message": record.getMessage(), **fields},
+                default=str,
+                ensure_ascii=False,
+            )
+
+        parts = [timestamp, f"{record.levelname:<7}", record.getMessage()]
+        for key, value in fields.items():
+            text = str(value)
+            if not text or any(c in text for c in ' "='):
+                text = json.dumps(text, ensure_ascii=False)
+            parts.append(f"{key}={text}")
+        return " ".join(parts)
+
+
+class StructuredLogger:
+    """Thin front end over a stdlib logger: fields, context and repeat limiting."""
+
+    def __init__(self, name: str, repeat_window: float = 10.0):
+        self._logger = logging.getLogger(name)
+        self.repeat_window = repeat_window
+        self._repeats: Dict[Tuple, list] = {}  # key -> [window start, suppressed count]
+        self.suppressed: Counter = Counter()  # message -> total suppressed
+
+    def debug(self, message: str, **fields):
+        self._log(logging.DEBUG, message, fields)
+
+    def info(self, message: str, **fields):
+        self._log(logging.INFO, message, fields)
+
+    def warning(self, message: str, **fields):
+        self._log(logging.WARNING, message, fields)
+
+    def error(self, message: str, **fields):
+        self._log(logging.ERROR, message, fields)
+
+    def _log(self, level: int, message: str, fields: dict):
+        if not self._logger.isEnabledFor(level):
+            return
+
+        room = fields.pop("room", None) or _room.get()
+        player = fields.pop("player", None) or _player.get()
+        context = {}
+        if room:
+            context["room"] = room
+        if player:
+            context["player"] = player
+
+        if level >= logging.WARNING:
+            key = (level, message, room, player)
+            now = time.monotonic()
+            entry = self._repeats.get(key)
+            if entry is not None and now - entry[0] < self.repeat_window:
+                entry[1] += 1
+                self.suppressed[message] += 1
+                return
+            if entry is not None and entry[1]:
+                fields["repeats"] = entry[1]
+            if len(self._repeats) >= 4096:
+                self._repeats.clear()
+            self._repeats[key] = [now, 0]
+
+        self._logger.log(level, message, extra={"fields": {**context, **fields}})
+
+
+def configure_logging(level: str = "INFO", as_json: bool = False, repeat_window: float = 10.0):
+    """Start the background writer. Safe to call more than once."""
+    global _listener
+    with _lock:
+        log.repeat_window = repeat_window
+        if _listener is not None:
+            return
+
+        records: queue.SimpleQueue = queue.SimpleQueue()
+        output = logging.StreamHandler(sys.stdout)
+        output.setFormatter(StructuredFormatter(as_json))
+        _listener = logging.handlers.QueueListener(records, output)
+        _listener.start()
+
+        root = logging.getLogger("netpong")
+        root.setLevel(level.upper())
+        root.addHandler(_EnqueueHandler(records))
+        root.propagate = False
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush queued lines and stop the writer thread."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+log = StructuredLogger("netpong")
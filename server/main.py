@@ -1,13 +1,34 @@
+import boot  # Must stay first: stamps the start of server imports
+
+import asyncio
+import importlib
+import json
+import os
+import re
 import time
 import uuid
 from typing import Optional
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi import FastAPI, Header, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 
-from database import create_db_and_tables, get_leaderboard
-from room_manager import manager
+boot.mark("fastapi")
+
+from handlers import MESSAGE_HANDLERS, ClientConnection  # noqa: E402
+from log import bind, configure_logging, log, shutdown_logging  # noqa: E402
+from metrics import render_metrics  # noqa: E402
+from rankings import Rankings  # noqa: E402
+from recording import REPLAY_SUFFIX, ReplayReader, list_replays, simulate_replay  # noqa: E402
+from room_manager import manager  # noqa: E402
+from settings import settings  # noqa: E402
+from watchdog import LoopWatchdog  # noqa: E402
+
+boot.mark("server_modules")
+
+configure_logging(settings.log_level, settings.log_json, settings.log_repeat_window_seconds)
+
+watchdog: Optional[LoopWatchdog] = None
 
 
 # Initialize FastAPI app
@@ -26,6 +47,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+boot.mark("app")
+
 
 # Pydantic models
 class CreateRoomRequest(BaseModel):
@@ -43,13 +66,19 @@ async def root():
     """API health check."""
     return {
         "name": "NetPong 2025 API",
-        "status": "online",
+        "status": "overloaded" if manager.overloaded else "online",
         "version": "1.0.0",
         "endpoints": {
             "websocket": "/ws",
             "leaderboard": "/leaderboard",
-            "rooms": "/rooms"
-        }
+            "rooms": "/rooms",
+            "lobby": "/lobby",
+            "replays": "/replays",
+            "latency_stats": "/stats/latency",
+            "metrics": "/metrics"
+        },
+        "matchmaking_queue": len(manager.match_queue),
+        "load": manager.load_report()
     }
 
 
@@ -57,7 +86,10 @@ async def root():
 async def leaderboard(limit: int = 10):
     """Get top players leaderboard."""
     try:
-        data = get_leaderboard(limit=limit)
+        await app.state.db_ready
+        from database import get_leaderboard
+        
+        data = await get_leaderboard(limit=limit)
         return JSONResponse(content={
             "success": True,
             "data": data,
@@ -67,136 +99,286 @@ async def leaderboard(limit: int = 10):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/leaderboard/rank/{player_name}")
+async def leaderboard_rank(player_name: str, radius: int = 5):
+    """A player's rank by wins then total score, with the players around them."""
+    await app.state.db_ready
+    
+    data = manager.rankings.rank(player_name, radius=max(0, min(radius, 50)))
+    if data is None:
+        raise HTTPException(status_code=404, detail="Player not found")
+    return JSONResponse(content={"success": True, **data})
+
+
 @app.get("/rooms")
-async def list_rooms():
-    """List active rooms (for debugging)."""
-    rooms = []
-    for code, game in manager.rooms.items():
-        rooms.append({
-            "code": code,
-            "state": game.state.value,
-            "players": len(game.players),
-            "frame": game.frame_count
-        })
+async def list_rooms(
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    state: Optional[str] = None,
+    joinable: Optional[bool] = None
+):
+    """
+    List rooms a page at a time, oldest first. Pass the returned
+    `next_cursor` back as `cursor` for the next page; filter with `state`
+    (waiting/playing/finished) and `joinable`.
+    """
+    limit = max(1, min(limit or settings.lobby_page_size, settings.lobby_max_page_size))
+    try:
+        after = int(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    rooms, next_cursor = manager.lobby.page(limit, after, state=state, joinable=joinable)
     
     return JSONResponse(content={
         "success": True,
         "rooms": rooms,
-        "count": len(rooms)
+        "count": len(rooms),
+        "total": len(manager.lobby),
+        "next_cursor": str(next_cursor) if next_cursor is not None else None,
+        "codes": manager.room_codes.stats()
+    })
+
+
+@app.get("/replays")
+async def replays():
+    """List recorded matches."""
+    data = list_replays(settings.replay_dir)
+    return JSONResponse(content={
+        "success": True,
+        "replays": data,
+        "count": len(data)
     })
 
 
+@app.get("/replays/{match_id}")
+async def replay(match_id: str, stride: int = 1):
+    """Re-simulate a recorded match and stream its snapshots as NDJSON."""
+    if not re.fullmatch(r"[A-Za-z0-9-]+", match_id):
+        raise HTTPException(status_code=400, detail="Invalid match id")
+    
+    path = os.path.join(settings.replay_dir, match_id + REPLAY_SUFFIX)
+    try:
+        reader = ReplayReader(path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Replay not found")
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    def stream():
+        with reader:
+            for state in simulate_replay(reader, stride=stride):
+                yield json.dumps(state, separators=(",", ":")) + "\n"
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@app.get("/stats/latency")
+async def latency_stats(hours: float = 24, step_hours: Optional[int] = None):
+    """
+    RTT percentiles, histogram and win rate by match p95 over the last
+    `hours`, merged from hourly rollups. `step_hours` adds a per-window series.
+    """
+    if not 0 < hours <= settings.latency_stats_max_hours:
+        raise HTTPException(status_code=400, detail="Invalid window")
+    if step_hours is not None and step_hours < 1:
+        raise HTTPException(status_code=400, detail="Invalid step")
+    
+    await app.state.db_ready
+    from database import get_latency_stats
+    
+    until = time.time()
+    since = until - hours * 3600
+    step = step_hours * 3600 if step_hours else None
+    data = await get_latency_stats(since, until, step)
+    return JSONResponse(content={
+        "success": True,
+        "from": since,
+        "to": until,
+        **data
+    })
+
+
+@app.get("/stats/latency/{match_id}")
+async def match_latency(match_id: str):
+    """One match's RTT series with exact per-player percentiles."""
+    if not re.fullmatch(r"[A-Za-z0-9-]+", match_id):
+        raise HTTPException(status_code=400, detail="Invalid match id")
+    
+    await app.state.db_ready
+    from database import get_match_latency
+    
+    data = await get_match_latency(match_id)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Match not found")
+    return JSONResponse(content={"success": True, **data})
+
+
+@app.post("/admin/drain")
+async def drain(x_admin_token: Optional[str] = Header(default=None)):
+    """Stop taking new rooms and snapshot live matches ahead of a deploy."""
+    if not settings.admin_token or x_admin_token != settings.admin_token:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    
+    saved = await manager.drain(settings.snapshot_path)
+    return JSONResponse(content={
+        "success": True,
+        "rooms_saved": saved
+    })
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: load, event loop lag and stalls by call site."""
+    return PlainTextResponse(render_metrics(manager, watchdog), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/admin/stalls")
+async def stalls(x_admin_token: Optional[str] = Header(default=None)):
+    """Event loop stalls by call site, with the stack captured during the latest one."""
+    if not settings.admin_token or x_admin_token != settings.admin_token:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    if watchdog is None:
+        raise HTTPException(status_code=404, detail="Watchdog disabled")
+    
+    return JSONResponse(content={"success": True, **watchdog.report()})
+
+
 # WebSocket endpoint
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """Main WebSocket endpoint for game communication."""
     await websocket.accept()
+    if boot.first_websocket():
+        log.info(boot.report())
     
     player_id = str(uuid.uuid4())
-    room_code: Optional[str] = None
+    bind(player=player_id)
+    conn = ClientConnection(player_id=player_id, websocket=websocket)
+    abusive = False
     
     try:
         # Send connection confirmation
         await websocket.send_json({
             "type": "connected",
             "player_id": player_id,
+            "session_token": manager.issue_session(player_id),
+            "udp_port": settings.udp_port if manager.udp else None,
+            "room_code_length": manager.room_codes.length,
+            "room_code_alphabet": manager.room_codes.alphabet,
             "message": "Connected to NetPong server"
         })
         
         # Main message loop
-        while True:
-            data = await websocket.receive_json()
-            message_type = data.get("type")
-            
-            # Handle different message types
-            if message_type == "create_room":
-                player_name = data.get("player_name", "Player")
-                room_code = await manager.create_room(player_id, player_name, websocket)
-                
-                await websocket.send_json({
-                    "type": "room_created",
-                    "room_code": room_code,
-                    "player_id": player_id
-                })
+        while not conn.closing:
+            raw = await websocket.receive_text()
+            conn.received_at_ms = time.time() * 1000
             
-            elif message_type == "join_room":
-                room_code = data.get("room_code", "").upper()
-                player_name = data.get("player_name", "Player")
+            # Cheap checks first so floods never reach the JSON parser.
+            # Each rejected frame counts as one violation; allow_frame
+            # records its own.
+            if len(raw) > settings.ws_max_message_bytes:
+                conn.limiter.violation()
+            elif conn.limiter.allow_frame():
+                try:
+                    data = json.loads(raw)
+                except ValueError:
+                    data = None
                 
-                success = await manager.join_room(room_code, player_id, player_name, websocket)
-                
-                if success:
-                    await websocket.send_json({
-                        "type": "room_joined",
-                        "room_code": room_code,
-                        "player_id": player_id
-                    })
-                    
-                    # Notify other players
-                    await manager.broadcast_to_room(room_code, {
-                        "type": "player_joined",
-                        "player_name": player_name
-                    }, exclude=player_id)
-                else:
-                    await websocket.send_json({
-                        "type": "error",
-                        "message": "Failed to join room. Room may be full or not exist."
-                    })
-            
-            elif message_type == "paddle_input":
-                # Update paddle velocity
-                direction = data.get("direction", 0)  # -1, 0, or 1
+                message_type = data.get("type") if isinstance(data, dict) else None
+                handler = MESSAGE_HANDLERS.get(message_type)
                 
-                if room_code:
-                    game = manager.get_room(room_code)
-                    if game:
-                        game.update_paddle_input(player_id, direction)
+                if handler is None:
+                    conn.limiter.violation()
+                elif conn.limiter.allow(message_type):
+                    await handler(conn, data)
             
-            elif message_type == "ping":
-                # Respond to ping for latency measurement
-                client_timestamp = data.get("timestamp", time.time())
-                
-                await websocket.send_json({
-                    "type": "pong",
-                    "client_timestamp": client_timestamp,
-                    "server_timestamp": time.time()
-                })
-                
-                # Update player latency
-                if room_code:
-                    game = manager.get_room(room_code)
-                    if game and player_id in game.players:
-                        # Client will send the calculated latency back
-                        pass
-            
-            elif message_type == "latency_update":
-                # Client sends calculated latency
-                latency_ms = data.get("latency_ms", 0)
-                
-                if room_code:
-                    game = manager.get_room(room_code)
-                    if game and player_id in game.players:
-                        game.players[player_id].add_latency_sample(latency_ms)
-            
-            elif message_type == "disconnect":
+            if conn.limiter.abusive:
+                abusive = True
+                manager.abusive_disconnects += 1
+                log.warning("Disconnecting abusive connection", violations=conn.limiter.violation_count)
+                await websocket.close(code=1008)
                 break
     
     except WebSocketDisconnect:
-        print(f"Player {player_id} disconnected")
+        log.info("Player disconnected")
     except Exception as e:
-        print(f"WebSocket error for player {player_id}: {e}")
+        log.error("WebSocket error", error=e)
     finally:
-        await manager.disconnect(player_id)
+        await manager.disconnect(conn.player_id, websocket, abusive=abusive)
+
+
+@app.websocket("/lobby")
+async def lobby_endpoint(websocket: WebSocket):
+    """
+    Live lobby: a lobby_snapshot of every room, then lobby_update batches of
+    upserted and removed rooms. Nothing needs to be sent by the viewer.
+    """
+    await websocket.accept()
+    viewer_id = str(uuid.uuid4())
+    manager.lobby_feed.add(viewer_id, websocket)
+    try:
+        # Only here to notice the disconnect; viewer messages are ignored
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    finally:
+        manager.lobby_feed.remove(viewer_id)
 
 
 # Startup event
 @app.on_event("startup")
 async def startup_event():
-    """Initialize database on startup."""
-    create_db_and_tables()
-    print("✅ Database initialized")
-    print("🚀 NetPong server ready on http://localhost:8000")
-    print("📡 WebSocket endpoint: ws://localhost:8000/ws")
+    """Start accepting connections; the database initializes in the background."""
+    global watchdog
+    app.state.db_ready = asyncio.create_task(prepare_database())
+    
+    if settings.watchdog_enabled:
+        watchdog = LoopWatchdog(settings.watchdog_interval_ms, settings.watchdog_stall_ms)
+        watchdog.start()
+    
+    if settings.udp_port:
+        await manager.start_udp(settings.udp_host, settings.udp_port)
+        log.info("📡 UDP channel open", host=settings.udp_host, port=settings.udp_port)
+    
+    restored = manager.restore(settings.snapshot_path)
+    if restored:
+        log.info("♻️  Restored rooms from snapshot", rooms=restored)
+    
+    boot.mark("startup")
+    log.info(boot.report())
+    log.info("🚀 NetPong server ready", http="http://localhost:8000", websocket="ws://localhost:8000/ws")
+
+
+async def prepare_database():
+    """Create tables and load player rankings, then hand them to the manager."""
+    started = time.perf_counter()
+    # Imported in a thread: SQLModel is the slowest part of a cold start
+    database = await asyncio.to_thread(importlib.import_module, "database")
+    
+    await database.create_db_and_tables()
+    totals, last_entry_id = await database.get_player_totals()
+    rankings = await asyncio.to_thread(Rankings.build, totals)
+    manager.rankings.load(rankings, last_entry_id)
+    log.info("✅ Database initialized", ms=round((time.perf_counter() - started) * 1000), players=len(rankings))
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Snapshot live matches so the next process can resume them."""
+    if settings.snapshot_on_shutdown and not manager.draining:
+        saved = await manager.drain(settings.snapshot_path)
+        log.info("💾 Saved rooms to snapshot", rooms=saved)
+    
+    if manager.udp:
+        manager.udp.close()
+    if watchdog:
+        watchdog.stop()
+    
+    db_ready = app.state.db_ready
+    if db_ready.done() and not db_ready.cancelled() and db_ready.exception() is None:
+        from database import close_database
+        await close_database()
+    shutdown_logging()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,120 @@
+import itertools
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from sortedcontainers import SortedList
+
+
+@dataclass
+class QueueEntry:
+    """A player waiting for a quick match."""
+    player_id: str
+    player_name: str
+    rtt_ms: float
+    enqueued_at: float = field(default_factory=time.monotonic)
+    seq: int = 0
+
+    @property
+    def key(self) -> Tuple[float, int]:
+        return (self.rtt_ms, self.seq)
+
+
+class MatchmakingQueue:
+    """
+    Latency-aware quick-match queue.
+
+    Waiting players are kept in a SortedList ordered by RTT, so enqueue,
+    removal and nearest-latency lookup are O(log n). A player's tolerance for
+    an RTT gap starts at `base_tolerance_ms` and widens by
+    `widen_ms_per_second` for every second spent waiting, up to
+    `max_tolerance_ms`. Two players pair up when their RTT gap fits inside
+    the larger of their two tolerances.
+    """
+
+    def __init__(
+        self,
+        base_tolerance_ms: float = 20.0,
+        widen_ms_per_second: float = 15.0,
+        max_tolerance_ms: float = 500.0,
+    ):
+        self.base_tolerance_ms = base_tolerance_ms
+        self.widen_ms_per_second = widen_ms_per_second
+        self.max_tolerance_ms = max_tolerance_ms
+
+        self._by_rtt = SortedList(key=lambda e: e.key)
+        self._entries: Dict[str, QueueEntry] = {}  # player_id -> entry
+        self._seq = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, player_id: str) -> bool:
+        return player_id in self._entries
+
+    def tolerance(self, entry: QueueEntry, now: Optional[float] = None) -> float:
+        """Allowed RTT gap for a player, given how long they have waited."""
+        waited = (now if now is not None else time.monotonic()) - entry.enqueued_at
+        return min(self.max_tolerance_ms, self.base_tolerance_ms + waited * self.widen_ms_per_second)
+
+    def enqueue(self, player_id: str, player_name: str, rtt_ms: float) -> Optional[Tuple[QueueEntry, QueueEntry]]:
+        """
+        Add a player to the queue. If a compatible opponent is already
+        waiting, both are removed and returned as a pair instead.
+        """
+        rtt_ms = float(rtt_ms)
+        if not math.isfinite(rtt_ms):
+            raise ValueError("rtt_ms must be finite")
+        self.remove(player_id)
+        entry = QueueEntry(player_id, player_name, max(0.0, rtt_ms), seq=next(self._seq))
+
+        opponent = self._closest(entry, time.monotonic())
+        if opponent is not None:
+            self.remove(opponent.player_id)
+            return (opponent, entry)
+
+        self._by_rtt.add(entry)
+        self._entries[player_id] = entry
+        return None
+
+    def remove(self, player_id: str) -> bool:
+        """Drop a player from the queue. Returns True if they were queued."""
+        entry = self._entries.pop(player_id, None)
+        if entry is None:
+            return False
+        self._by_rtt.remove(entry)
+        return True
+
+    def sweep(self) -> List[Tuple[QueueEntry, QueueEntry]]:
+        """
+        Pair up players whose widened tolerances now overlap.
+
+        Only RTT-adjacent players are compared, so a sweep is a single
+        O(n) pass over the sorted queue.
+        """
+        now = time.monotonic()
+        pairs = []
+        i = 0
+        while i < len(self._by_rtt) - 1:
+            a, b = self._by_rtt[i], self._by_rtt[i + 1]
+            if b.rtt_ms - a.rtt_ms <= max(self.tolerance(a, now), self.tolerance(b, now)):
+                pairs.append((a, b))
+                self.remove(a.player_id)
+                self.remove(b.player_id)
+            else:
+                i += 1
+        return pairs
+
+    def _closest(self, entry: QueueEntry, now: float) -> Optional[QueueEntry]:
+        """Nearest-RTT waiting player within tolerance, if any."""
+        index = self._by_rtt.bisect_key_left(entry.key)
+        best = None
+        best_gap = None
+        for i in (index - 1, index):
+            if 0 <= i < len(self._by_rtt):
+                candidate = self._by_rtt[i]
+                gap = abs(candidate.rtt_ms - entry.rtt_ms)
+                if gap <= max(self.tolerance(entry, now), self.tolerance(candidate, now)):
+                    if best_gap is None or gap < best_gap:
+                        best, best_gap = candidate, gap
+        return best
@@ -0,0 +1,65 @@
+from typing import Iterable, List, Optional, Tuple
+
+from log import log
+from room_manager import ConnectionManager
+from watchdog import LAG_BUCKETS_MS, LoopWatchdog
+
+
+def _label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Exposition:
+    """Builds Prometheus text exposition format, one metric family at a time."""
+
+    def __init__(self):
+        self.lines: List[str] = []
+
+    def family(self, name: str, kind: str, help_text: str,
+               samples: Iterable[Tuple[Optional[dict], float]], suffix: str = ""):
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            self.sample(name + suffix, labels, value)
+
+    def sample(self, name: str, labels: Optional[dict], value: float):
+        if labels:
+            rendered = ",".join(f'{key}="{_label(val)}"' for key, val in labels.items())
+            self.lines.append(f"{name}{{{rendered}}} {value}")
+        else:
+            self.lines.append(f"{name} {value}")
+
+    def text(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+def render_metrics(manager: ConnectionManager, watchdog: Optional[LoopWatchdog]) -> str:
+    """Current server metrics in Prometheus text format."""
+    out = _Exposition()
+
+    load = manager.tick_load.snapshot()
+    out.family("netpong_rooms", "gauge", "Rooms open on this process.", [(None, len(manager.rooms))])
+    out.family("netpong_active_games", "gauge", "Rooms with a running game loop.", [(None, len(manager.game_loops))])
+    out.family("netpong_tick_utilization", "gauge", "Share of the event loop spent on game ticks.",
+               [(None, load["tick_utilization"])])
+    out.family("netpong_tick_lag_ms", "gauge", "Mean lateness of game ticks against their schedule.",
+               [(None, load["tick_lag_ms"])])
+    out.family("netpong_accepting_rooms", "gauge", "1 if new matches are being admitted.",
+               [(None, int(not (manager.draining or manager.overloaded)))])
+
+    if watchdog is not None:
+        report = watchdog.report()
+        out.lines.append("# HELP netpong_event_loop_lag_ms Lateness of the watchdog heartbeat.")
+        out.lines.append("# TYPE netpong_event_loop_lag_ms histogram")
+        cumulative = 0
+        for bound, count in zip(list(LAG_BUCKETS_MS) + ["+Inf"], watchdog.lag_buckets):
+            cumulative += count
+            out.sample("netpong_event_loop_lag_ms_bucket", {"le": bound}, cumulative)
+        out.sample("netpong_event_loop_lag_ms_sum", None, round(watchdog.lag_sum_ms, 3))
+        out.sample("netpong_event_loop_lag_ms_count", None, watchdog.lag_count)
+        out.family("netpong_event_loop_stalls", "counter", "Event loop stalls by blocking call site.",
+                   [({"site": site["site"]}, site["stalls"]) for site in report["sites"]], suffix="_total")
+
+    out.family("netpong_log_suppressed", "counter", "Repeated warnings and errors that were not printed.",
+               [({"message": message}, count) for message, count in log.suppressed.items()], suffix="_total")
+    return out.text()
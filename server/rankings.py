@@ -0,0 +1,112 @@
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+from sortedcontainers import SortedList
+
+
+@dataclass
+class PlayerTotals:
+    """A player's aggregate leaderboard stats."""
+    player_name: str
+    total_wins: int = 0
+    total_matches: int = 0
+    total_score: int = 0
+    latency_sum: float = 0.0
+
+    @property
+    def key(self) -> Tuple[int, int, str]:
+        # Ascending order puts the most wins, then the highest score, first
+        return (-self.total_wins, -self.total_score, self.player_name)
+
+    def to_dict(self) -> dict:
+        return {
+            "player_name": self.player_name,
+            "total_wins": self.total_wins,
+            "total_matches": self.total_matches,
+            "total_score": self.total_score,
+            "avg_latency_ms": round(self.latency_sum / self.total_matches, 2) if self.total_matches else 0.0,
+            "win_rate": round(self.total_wins / self.total_matches * 100, 1) if self.total_matches else 0.0,
+        }
+
+
+class Rankings:
+    """
+    Player standings ordered by (total_wins, total_score), as an
+    order-statistic index.
+
+    A SortedList of keys gives a player's position, the number of players
+    strictly ahead (their rank; ties share it) and the players around them
+    in O(log n). It is loaded from the leaderboard table at startup and
+    updated per recorded match. Matches recorded while the load is still
+    running are held back and replayed if the load did not include them.
+    """
+
+    def __init__(self):
+        self._order = SortedList()
+        self._players: Dict[str, PlayerTotals] = {}
+        self._pending: List[Tuple[int, str, bool, int, float]] = []
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._players)
+
+    @classmethod
+    def build(cls, totals: Iterable[PlayerTotals]) -> "Rankings":
+        """Index totals read from the database; slow for big tables, so done off the loop."""
+        built = cls()
+        built._players = {player.player_name: player for player in totals}
+        built._order = SortedList(player.key for player in built._players.values())
+        built.loaded = True
+        return built
+
+    def load(self, built: "Rankings", last_entry_id: int = 0):
+        """Take over a built index, then apply matches recorded since it was read."""
+        self._players, self._order = built._players, built._order
+        self.loaded = True
+
+        pending, self._pending = self._pending, []
+        for entry_id, *result in pending:
+            if entry_id > last_entry_id:
+                self.record(entry_id, *result)
+
+    def record(self, entry_id: int, player_name: str, won: bool, score: int, latency_ms: float):
+        """Apply one leaderboard row (a match from one player's side)."""
+        if not self.loaded:
+            self._pending.append((entry_id, player_name, won, score, latency_ms))
+            return
+
+        player = self._players.get(player_name)
+        if player is None:
+            player = self._players[player_name] = PlayerTotals(player_name)
+        else:
+            self._order.remove(player.key)
+        player.total_wins += int(won)
+        player.total_matches += 1
+        player.total_score += score
+        player.latency_sum += latency_ms
+        self._order.add(player.key)
+
+    def rank(self, player_name: str, radius: int = 5) -> Optional[dict]:
+        """
+        A player's rank (1 = best; players tied on wins and score share it)
+        and up to `radius` players on either side of them.
+        """
+        player = self._players.get(player_name)
+        if player is None:
+            return None
+
+        position = self._order.index(player.key)
+        rank = self._order.bisect_left((player.key[0], player.key[1], "")) + 1
+        above = [self._row(key) for key in self._order.islice(max(0, position - radius), position)]
+        below = [self._row(key) for key in self._order.islice(position + 1, position + 1 + radius)]
+        return {
+            "player": {**player.to_dict(), "rank": rank, "position": position + 1},
+            "above": above,
+            "below": below,
+            "total_players": len(self._order),
+        }
+
+    def _row(self, key: Tuple[int, int, str]) -> dict:
+        return {
+            **self._players[key[2]].to_dict(),
+            "rank": self._order.bisect_left((key[0], key[1], "")) + 1,
+        }
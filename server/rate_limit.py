@@ -0,0 +1,88 @@
+import time
+from typing import Dict, Optional, Tuple
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding up to `burst`."""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def consume(self, amount: float = 1.0, now: Optional[float] = None) -> bool:
+        """Take tokens if available. Returns False if the bucket is empty."""
+        now = now if now is not None else time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return True
+        return False
+
+
+# Per message type (rate per second, burst). Unknown types share "default".
+MESSAGE_LIMITS: Dict[str, Tuple[float, float]] = {
+    "paddle_input": (120.0, 60.0),
+    "ping": (5.0, 10.0),
+    "latency_update": (5.0, 10.0),
+    "create_room": (1.0, 5.0),
+    "join_room": (2.0, 10.0),
+    "quick_match": (1.0, 5.0),
+    "cancel_quick_match": (1.0, 5.0),
+    "spectate_room": (2.0, 10.0),
+    "resume": (1.0, 5.0),
+    "set_protocol": (1.0, 5.0),
+    "default": (5.0, 10.0),
+}
+
+
+class ConnectionLimiter:
+    """
+    Rate limits for one WebSocket connection.
+
+    Every frame first passes a connection-wide bucket (checked before the
+    JSON is even parsed), then a bucket for its message type. Each rejected
+    frame is a violation; violations drain their own bucket, and once it is
+    empty the connection is considered abusive.
+    """
+
+    def __init__(
+        self,
+        message_rate: float = 200.0,
+        message_burst: float = 100.0,
+        violation_rate: float = 2.0,
+        violation_burst: float = 50.0,
+    ):
+        self.messages = TokenBucket(message_rate, message_burst)
+        self.violations = TokenBucket(violation_rate, violation_burst)
+        self.by_type: Dict[str, TokenBucket] = {}
+        self.violation_count = 0
+        self.abusive = False
+
+    def allow_frame(self) -> bool:
+        """Connection-wide check, done before parsing."""
+        if self.messages.consume():
+            return True
+        self.violation()
+        return False
+
+    def allow(self, message_type: str) -> bool:
+        """Per-type check for a parsed message."""
+        key = message_type if message_type in MESSAGE_LIMITS else "default"
+        bucket = self.by_type.get(key)
+        if bucket is None:
+            bucket = self.by_type[key] = TokenBucket(*MESSAGE_LIMITS[key])
+        if bucket.consume():
+            return True
+        self.violation()
+        return False
+
+    def violation(self):
+        """Record misbehaviour; flags the connection once the budget runs out."""
+        self.violation_count += 1
+        if not self.violations.consume():
+            self.abusive = True
@@ -0,0 +1,174 @@
+import mmap
+import os
+import struct
+import time
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Tuple
+from game import Game, GameState
+
+
+# File layout (little-endian):
+#   header:  magic "NPR1" | version u8 | seed u64 | fps u16 | started f64
+#            then room code, player 1 name, player 2 name as u8 length + UTF-8
+#   records: tick u32 | slot u8 | direction i8   (6 bytes each, append-only)
+# A record with slot END_SLOT marks the tick the match ended on.
+MAGIC = b"NPR1"
+VERSION = 1
+HEADER = struct.Struct("<4sBQHd")
+RECORD = struct.Struct("<IBb")
+END_SLOT = 0xFF
+REPLAY_SUFFIX = ".npr"
+MAX_REPLAY_TICKS = 60 * 60 * 60  # Stop truncated recordings after an hour of play
+
+
+@dataclass
+class ReplayHeader:
+    """Everything needed to rebuild a match before its inputs are applied."""
+    seed: int
+    fps: int
+    started: float
+    room_code: str
+    player_names: Tuple[str, str]
+
+
+class MatchRecorder:
+    """Appends a match's seed and input log to a compact binary replay file."""
+
+    def __init__(self, directory: str, game: Game):
+        os.makedirs(directory, exist_ok=True)
+        started = time.time()
+        self.match_id = f"{game.room_code}-{int(started * 1000)}"
+        self.path = os.path.join(directory, self.match_id + REPLAY_SUFFIX)
+        self._file = open(self.path, "ab")
+
+        names = [p.name for p in game.players.values()][:2]
+        header = HEADER.pack(MAGIC, VERSION, game.seed, game.FPS, started)
+        for text in [game.room_code, *names]:
+            encoded = text.encode("utf-8")[:255]
+            header += bytes([len(encoded)]) + encoded
+        self._file.write(header)
+
+        # Inputs held before the match started still move the paddles
+        for slot, player in enumerate(list(game.players.values())[:2]):
+            if player.paddle.velocity:
+                self.record_input(game.tick, slot, 1 if player.paddle.velocity > 0 else -1)
+
+        game.input_listener = self.record_input
+
+    def record_input(self, tick: int, slot: int, direction: int):
+        """Append one input change."""
+        if self._file and 0 <= slot < END_SLOT:
+            self._file.write(RECORD.pack(tick, slot, direction))
+
+    def close(self, final_tick: int):
+        """Write the end marker and close the file."""
+        if self._file:
+            self._file.write(RECORD.pack(final_tick, END_SLOT, 0))
+            self._file.close()
+            self._file = None
+
+
+class ReplayReader:
+    """Reads a replay file through mmap so long matches aren't loaded into memory."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"Empty replay file: {path}")
+        self.header, self._records_start = self._parse_header()
+
+    def _parse_header(self) -> Tuple[ReplayHeader, int]:
+        if len(self._map) < HEADER.size:
+            raise ValueError(f"Truncated replay header: {self.path}")
+        magic, version, seed, fps, started = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a NetPong replay: {self.path}")
+
+        offset = HEADER.size
+        texts = []
+        for _ in range(3):
+            length = self._map[offset]
+            texts.append(bytes(self._map[offset + 1:offset + 1 + length]).decode("utf-8", "replace"))
+            offset += 1 + length
+
+        return ReplayHeader(seed, fps, started, texts[0], (texts[1], texts[2])), offset
+
+    def inputs(self) -> Iterator[Tuple[int, int, int]]:
+        """Yield (tick, slot, direction) records in file order."""
+        end = len(self._map) - (len(self._map) - self._records_start) % RECORD.size
+        for offset in range(self._records_start, end, RECORD.size):
+            yield RECORD.unpack_from(self._map, offset)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def simulate_replay(reader: ReplayReader, stride: int = 1) -> Iterator[dict]:
+    """
+    Re-simulate a recorded match, yielding a state snapshot every `stride`
+    ticks and on every score or game over.
+    """
+    header = reader.header
+    game = Game(header.room_code, seed=header.seed)
+    slots = ["p1", "p2"]
+    for player_id, name in zip(slots, header.player_names):
+        game.add_player(player_id, name)
+
+    stride = max(1, stride)
+    end_tick: Optional[int] = None
+    inputs = reader.inputs()
+    pending = next(inputs, None)
+
+    yield game.get_state_dict()
+
+    while game.state == GameState.PLAYING:
+        # Apply every input recorded before this step
+        while pending is not None and pending[0] <= game.tick:
+            tick, slot, direction = pending
+            if slot == END_SLOT:
+                end_tick = tick
+            elif slot < len(slots):
+                game.update_paddle_input(slots[slot], direction)
+            pending = next(inputs, None)
+
+        if end_tick is not None and game.tick >= end_tick:
+            break
+        if game.tick >= MAX_REPLAY_TICKS:
+            break
+
+        event = game.update()
+        if event or game.tick % stride == 0:
+            state = game.get_state_dict()
+            if event:
+                state["event"] = event
+            yield state
+
+
+def list_replays(directory: str) -> List[dict]:
+    """Replay files in a directory, newest first."""
+    if not os.path.isdir(directory):
+        return []
+
+    replays = []
+    for entry in os.scandir(directory):
+        if entry.is_file() and entry.name.endswith(REPLAY_SUFFIX):
+            stat = entry.stat()
+            replays.append({
+                "match_id": entry.name[:-len(REPLAY_SUFFIX)],
+                "bytes": stat.st_size,
+                "modified": stat.st_mtime
+            })
+
+    replays.sort(key=lambda r: r["modified"], reverse=True)
+    return replays
@@ -0,0 +1,161 @@
+import random
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+
+class RoomCodeAllocator:
+    """
+    Hands out unique room codes in O(1) and recycles them after a quarantine.
+
+    The code space (alphabet ** length) is never materialized. Free codes are
+    kept as a lazily shuffled range of integers: the first `_free_count` slots
+    of a virtual array hold every code that can be issued, and only slots that
+    have been swapped are stored in `_swapped`. Allocation picks a random slot
+    and swaps the last free slot into its place (one step of Fisher-Yates).
+
+    Released codes wait in a FIFO quarantine so a stale client still holding
+    an old code can't land in a brand new room.
+    """
+
+    def __init__(
+        self,
+        length: int = 4,
+        alphabet: str = "23456789ABCDEFGHJKMNPQRSTUVWXYZ",
+        quarantine_seconds: float = 300.0,
+        rng: Optional[random.Random] = None,
+    ):
+        alphabet = alphabet.upper()
+        if length < 1:
+            raise ValueError("Room code length must be at least 1")
+        if len(set(alphabet)) != len(alphabet) or len(alphabet) < 2:
+            raise ValueError("Room code alphabet must have 2+ unique characters")
+
+        self.length = length
+        self.alphabet = alphabet
+        self.quarantine_seconds = quarantine_seconds
+        self.capacity = len(alphabet) ** length
+
+        self._char_index = {c: i for i, c in enumerate(alphabet)}
+        self._rng = rng or random.Random()
+        self._free_count = self.capacity
+        self._swapped: Dict[int, int] = {}  # slot -> code value
+        self._position: Dict[int, int] = {}  # code value -> slot, for swapped slots
+        self._in_use: set = set()
+        self._quarantine: Deque[Tuple[float, int]] = deque()  # (release time, value)
+
+    @property
+    def in_use(self) -> int:
+        return len(self._in_use)
+
+    @property
+    def quarantined(self) -> int:
+        return len(self._quarantine)
+
+    def allocate(self) -> Optional[str]:
+        """Reserve a random free code. Returns None if the space is exhausted."""
+        self._recycle_expired()
+        if self._free_count == 0:
+            return None
+
+        value = self._take(self._rng.randrange(self._free_count))
+        self._in_use.add(value)
+        return self._encode(value)
+
+    def reserve(self, code: str) -> bool:
+        """Claim a specific code (e.g. a restored room). Returns False if taken."""
+        self._recycle_expired()
+        value = self._decode(code)
+        if value is None:
+            return False
+
+        if value in self._position:
+            slot = self._position[value]
+        elif value < self._free_count and value not in self._swapped:
+            slot = value
+        else:
+            return False  # In use or quarantined
+
+        self._take(slot)
+        self._in_use.add(value)
+        return True
+
+    def release(self, code: str):
+        """Return a code to the pool once its quarantine period has passed."""
+        value = self._decode(code)
+        if value is None or value not in self._in_use:
+            return
+
+        self._in_use.discard(value)
+        if self.quarantine_seconds <= 0:
+            self._push_free(value)
+        else:
+            self._quarantine.append((time.monotonic() + self.quarantine_seconds, value))
+
+    def normalize(self, code: str) -> Optional[str]:
+        """Canonicalize user input. Returns None if it can't be a valid code."""
+        code = (code or "").strip().upper()
+        if len(code) != self.length or any(c not in self._char_index for c in code):
+            return None
+        return code
+
+    def stats(self) -> dict:
+        """Allocator occupancy for diagnostics."""
+        return {
+            "capacity": self.capacity,
+            "in_use": self.in_use,
+            "quarantined": self.quarantined,
+            "free": self._free_count,
+        }
+
+    def _recycle_expired(self):
+        """Move codes whose quarantine has elapsed back into the free pool."""
+        now = time.monotonic()
+        while self._quarantine and self._quarantine[0][0] <= now:
+            _, value = self._quarantine.popleft()
+            self._push_free(value)
+
+    def _take(self, slot: int) -> int:
+        """Remove the code at a free slot, filling the hole with the last free slot."""
+        last = self._free_count - 1
+        value = self._swapped.get(slot, slot)
+        last_value = self._swapped.get(last, last)
+
+        self._clear(last)
+        if slot != last:
+            self._place(slot, last_value)
+        self._free_count = last
+        return value
+
+    def _push_free(self, value: int):
+        self._place(self._free_count, value)
+        self._free_count += 1
+
+    def _place(self, slot: int, value: int):
+        self._clear(slot)
+        if value != slot:
+            self._swapped[slot] = value
+            self._position[value] = slot
+
+    def _clear(self, slot: int):
+        value = self._swapped.pop(slot, None)
+        if value is not None:
+            self._position.pop(value, None)
+
+    def _encode(self, value: int) -> str:
+        base = len(self.alphabet)
+        chars = []
+        for _ in range(self.length):
+            value, digit = divmod(value, base)
+            chars.append(self.alphabet[digit])
+        return ''.join(reversed(chars))
+
+    def _decode(self, code: str) -> Optional[int]:
+        code = self.normalize(code)
+        if code is None:
+            return None
+        base = len(self.alphabet)
+        value = 0
+        for c in code:
+            value = value * base + self._char_index[c]
+        return value
@@ -1,11 +1,23 @@
 import asyncio
-import random
-import string
+import json
+import secrets
 import time
-from typing import Dict, Optional
+from typing import Callable, Dict, List, Optional, Set
 from fastapi import WebSocket
-from game import Game
-from database import add_match_result
+from game import Game, GameState
+from latency_stats import LatencySeries
+from lobby import LobbyFeed, RoomIndex
+from log import bind, log
+from matchmaking import MatchmakingQueue, QueueEntry
+from rankings import Rankings
+from recording import MatchRecorder
+from room_codes import RoomCodeAllocator
+from settings import settings
+from snapshots import load_snapshot, save_snapshot
+from spectators import SpectatorChannel
+from tick_load import TickLoad
+from trajectory import TrajectoryEncoder
+from udp_transport import UDPTransport, start_udp_transport
 
 
 class ConnectionManager:
@@ -16,31 +28,96 @@ class ConnectionManager:
         self.connections: Dict[str, WebSocket] = {}  # player_id -> websocket
         self.player_to_room: Dict[str, str] = {}  # player_id -> room_code
         self.game_loops: Dict[str, asyncio.Task] = {}  # room_code -> game loop task
+        self.room_codes = RoomCodeAllocator(
+            length=settings.room_code_length,
+            alphabet=settings.room_code_alphabet,
+            quarantine_seconds=settings.room_code_quarantine_seconds,
+        )
+        self.match_queue = MatchmakingQueue(
+            base_tolerance_ms=settings.matchmaking_base_tolerance_ms,
+            widen_ms_per_second=settings.matchmaking_widen_ms_per_second,
+            max_tolerance_ms=settings.matchmaking_max_tolerance_ms,
+        )
+        self.queued_connections: Dict[str, WebSocket] = {}  # player_id -> websocket (waiting for match)
+        self.matchmaking_task: Optional[asyncio.Task] = None
+        self.spectators: Dict[str, SpectatorChannel] = {}  # room_code -> spectator fan-out
+        self.spectator_to_room: Dict[str, str] = {}  # spectator_id -> room_code
+        self.recorders: Dict[str, MatchRecorder] = {}  # room_code -> replay recorder
+        self.latency: Dict[str, LatencySeries] = {}  # room_code -> RTT samples of the running match
+        self.abusive_disconnects = 0
+        self.sessions: Dict[str, str] = {}  # session token -> player_id
+        self.session_tokens: Dict[str, str] = {}  # player_id -> session token
+        self.resume_timeouts: Dict[str, asyncio.Task] = {}  # room_code -> expiry of detached players
+        self.paused: Dict[str, asyncio.Event] = {}  # room_code -> set once every player is back
+        self.draining = False
+        self.udp: Optional[UDPTransport] = None
+        self.trajectory_players: Set[str] = set()  # players that asked for trajectory segments
+        self.trajectories: Dict[str, TrajectoryEncoder] = {}  # room_code -> encoder of the running loop
+        self.tick_load = TickLoad(settings.tick_load_window_seconds)
+        self.tick_listener: Optional[Callable[[str, float, float], None]] = None  # (room, busy s, lag s), for benchmarks
+        self.lobby = RoomIndex()
+        self.rankings = Rankings()
+        self.lobby_feed = LobbyFeed(self.lobby, flush_interval=settings.lobby_flush_interval)
     
-    def generate_room_code(self) -> str:
-        """Generate a unique 4-character room code."""
-        while True:
-            code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=4))
-            if code not in self.rooms:
-                return code
+    @property
+    def overloaded(self) -> bool:
+        """True once ticks leave too little headroom to take on another match."""
+        if settings.admission_max_utilization > 0 and \
+                self.tick_load.utilization >= settings.admission_max_utilization:
+            return True
+        if settings.admission_max_tick_lag_ms > 0 and \
+                self.tick_load.lag_ms >= settings.admission_max_tick_lag_ms:
+            return True
+        return False
     
-    async def create_room(self, player_id: str, player_name: str, websocket: WebSocket) -> str:
-        """Create a new game room."""
+    def load_report(self) -> dict:
+        """Tick load and admission state, for health checks."""
+        return {
+            **self.tick_load.snapshot(),
+            "rooms": len(self.rooms),
+            "active_games": len(self.game_loops),
+            "accepting_rooms": not (self.draining or self.overloaded),
+        }
+    
+    def update_lobby(self, room_code: str):
+        """Refresh a room's lobby row after anything a lobby shows has changed."""
+        game = self.rooms.get(room_code)
+        if game is None:
+            self.lobby.remove(room_code)
+            return
+        self.lobby.update(room_code, {
+            "code": room_code,
+            "state": game.state.value,
+            "players": len(game.players),
+            "spectators": len(self.spectators.get(room_code, ())),
+            "joinable": game.state == GameState.WAITING and len(game.players) < 2,
+        })
+    
+    def generate_room_code(self) -> Optional[str]:
+        """Reserve a unique room code. Returns None if none are free."""
+        return self.room_codes.allocate()
+    
+    async def create_room(self, player_id: str, player_name: str, websocket: WebSocket) -> Optional[str]:
+        """Create a new game room. Returns None if no room code is available."""
         room_code = self.generate_room_code()
+        if room_code is None:
+            return None
+        
         game = Game(room_code)
         game.add_player(player_id, player_name)
         
         self.rooms[room_code] = game
         self.connections[player_id] = websocket
         self.player_to_room[player_id] = room_code
+        self.update_lobby(room_code)
         
         return room_code
     
     async def join_room(self, room_code: str, player_id: str, player_name: str, websocket: WebSocket) -> bool:
         """Join an existing room. Returns True if successful."""
-        room_code = room_code.upper()
+        room_code = self.room_codes.normalize(room_code)
         
-        if room_code not in self.rooms:
+        if room_code is None or room_code not in self.rooms:
             return False
         
         game = self.rooms[room_code]
@@ -52,17 +129,171 @@ class ConnectionManager:
         
         # Start game loop when second player joins
         if len(game.players) == 2 and room_code not in self.game_loops:
+            if settings.record_matches:
+                try:
+                    self.recorders[room_code] = MatchRecorder(settings.replay_dir, game)
+                except OSError as e:
+                    log.error("Could not start recording", room=room_code, error=e)
             self.game_loops[room_code] = asyncio.create_task(self.game_loop(room_code))
         
+        self.update_lobby(room_code)
         return True
     
-    async def disconnect(self, player_id: str):
-        """Handle player disconnection."""
+    async def quick_match(self, player_id: str, player_name: str, rtt_ms: float, websocket: WebSocket) -> bool:
+        """
+        Queue a player for a quick match. Returns True if they were paired
+        immediately, False if they are waiting in the queue.
+        """
+        pair = self.match_queue.enqueue(player_id, player_name, rtt_ms)
+        self.queued_connections[player_id] = websocket
+        
+        if pair:
+            await self.create_match(*pair)
+            return True
+        
+        if self.matchmaking_task is None or self.matchmaking_task.done():
+            self.matchmaking_task = asyncio.create_task(self.matchmaking_loop())
+        return False
+    
+    def cancel_quick_match(self, player_id: str):
+        """Remove a player from the matchmaking queue."""
+        self.match_queue.remove(player_id)
+        self.queued_connections.pop(player_id, None)
+    
+    async def matchmaking_loop(self):
+        """Periodically pair queued players as their latency tolerance widens."""
+        try:
+            while len(self.match_queue) > 0:
+                await asyncio.sleep(settings.matchmaking_sweep_interval)
+                # Same gate as admit(): queued players wait rather than get seated
+                if self.draining or self.overloaded:
+                    continue
+                for first, second in self.match_queue.sweep():
+                    # One bad pair (e.g. a socket that just closed) must not stop matchmaking
+                    try:
+                        await self.create_match(first, second)
+                    except Exception as e:
+                        log.error("Could not create match", players=[first.player_id, second.player_id], error=e)
+        except asyncio.CancelledError:
+            pass
+    
+    async def create_match(self, first: QueueEntry, second: QueueEntry) -> Optional[str]:
+        """
+        Create a room for two matched players and start it.
+        
+        This process hosts a single room table, so it is always the
+        least-loaded candidate; a sharded deployment would pick the target
+        shard here.
+        """
+        first_ws = self.queued_connections.pop(first.player_id, None)
+        second_ws = self.queued_connections.pop(second.player_id, None)
+        if first_ws is None or second_ws is None:
+            # One side vanished while matching; requeue the survivor
+            for entry, ws in ((first, first_ws), (second, second_ws)):
+                if ws is not None:
+                    await self.quick_match(entry.player_id, entry.player_name, entry.rtt_ms, ws)
+            return None
+        
+        room_code = await self.create_room(first.player_id, first.player_name, first_ws)
+        if room_code is None:
+            for entry, ws in ((first, first_ws), (second, second_ws)):
+                await self.send_to_websocket(ws, {
+                    "type": "error",
+                    "message": "Server is full. Please try again later."
+                })
+            return None
+        
+        await self.join_room(room_code, second.player_id, second.player_name, second_ws)
+        
+        for entry, opponent in ((first, second), (second, first)):
+            await self.send_to_player(entry.player_id, {
+                "type": "match_found",
+                "room_code": room_code,
+                "player_id": entry.player_id,
+                "opponent_name": opponent.player_name,
+                "opponent_latency_ms": round(opponent.rtt_ms, 2)
+            })
+        
+        return room_code
+    
+    async def spectate_room(self, room_code: str, spectator_id: str, websocket: WebSocket) -> bool:
+        """Attach a spectator to a room. Returns True if successful."""
+        room_code = self.room_codes.normalize(room_code)
+        
+        if room_code is None or room_code not in self.rooms:
+            return False
+        
+        self.stop_spectating(spectator_id)
+        
+        # Acknowledge with a full snapshot before the shared stream starts,
+        # so the confirmation always arrives first
+        await websocket.send_json({
+            "type": "spectating",
+            "room_code": room_code,
+            "snapshot_hz": settings.spectator_snapshot_hz,
+            "state": self.rooms[room_code].get_state_dict()
+        })
+        if room_code not in self.rooms:
+            await websocket.send_json({"type": "room_closed", "room_code": room_code})
+            return True
+        
+        channel = self.spectators.get(room_code)
+        if channel is None:
+            channel = self.spectators[room_code] = SpectatorChannel(room_code)
+        
+        channel.add(spectator_id, websocket)
+        self.spectator_to_room[spectator_id] = room_code
+        self.update_lobby(room_code)
+        return True
+    
+    def stop_spectating(self, spectator_id: str):
+        """Detach a spectator from whatever room they are watching."""
+        room_code = self.spectator_to_room.pop(spectator_id, None)
+        if room_code and room_code in self.spectators:
+            self.spectators[room_code].remove(spectator_id)
+            self.update_lobby(room_code)
+    
+    def close_spectators(self, room_code: str, message: dict):
+        """Send a final message to a room's spectators and detach them."""
+        channel = self.spectators.pop(room_code, None)
+        if channel:
+            channel.close(message)
+            for spectator_id, watched in list(self.spectator_to_room.items()):
+                if watched == room_code:
+                    del self.spectator_to_room[spectator_id]
+            self.update_lobby(room_code)
+    
+    async def disconnect(self, player_id: str, websocket: Optional[WebSocket] = None, abusive: bool = False):
+        """
+        Handle player disconnection. A connection closed for abuse loses its
+        seat and session outright: no grace period, and no resume.
+        """
+        if websocket is not None and self.connections.get(player_id, websocket) is not websocket:
+            # A resume already moved this player to a newer socket
+            return
+        
+        self.cancel_quick_match(player_id)
+        self.stop_spectating(player_id)
+        
+        if self.draining:
+            # Rooms are already snapshotted; the player will resume elsewhere
+            self.connections.pop(player_id, None)
+            if abusive:
+                self.forget_session(player_id)
+            return
+        
         if player_id not in self.player_to_room:
+            self.forget_session(player_id)
             return
         
         room_code = self.player_to_room[player_id]
         
+        # Mid-match drops are usually transient: hold the seat for a while
+        game = self.rooms.get(room_code)
+        if game and game.state == GameState.PLAYING and settings.reconnect_grace_seconds > 0 and not abusive:
+            await self.detach(player_id, room_code)
+            return
+        
         # Notify other players
         await self.broadcast_to_room(room_code, {
             "type": "player_disconnected",
@@ -76,16 +307,244 @@ class ConnectionManager:
             
             # If game is now empty, clean up room
             if len(game.players) == 0:
-                if room_code in self.game_loops:
-                    self.game_loops[room_code].cancel()
-                    del self.game_loops[room_code]
-                del self.rooms[room_code]
+                self.close_room(room_code)
+            else:
+                self.update_lobby(room_code)
         
         if player_id in self.connections:
             del self.connections[player_id]
         
         if player_id in self.player_to_room:
             del self.player_to_room[player_id]
+        
+        self.forget_session(player_id)
+    
+    async def detach(self, player_id: str, room_code: str):
+        """
+        Keep a dropped player's seat (PlayerState, session, room) for the
+        grace period. The room pauses until everyone is back (see resume);
+        if the grace period runs out, it closes as on a normal disconnect.
+        """
+        self.connections.pop(player_id, None)
+        if self.udp:
+            self.udp.unbind(player_id)
+        self.paused.setdefault(room_code, asyncio.Event())
+        
+        await self.broadcast_to_room(room_code, {
+            "type": "player_detached",
+            "player_id": player_id,
+            "grace_ms": int(settings.reconnect_grace_seconds * 1000)
+        }, exclude=player_id)
+        
+        if room_code not in self.resume_timeouts:
+            self.resume_timeouts[room_code] = asyncio.create_task(
+                self.expire_detached(room_code, settings.reconnect_grace_seconds)
+            )
+        log.info("Player detached", room=room_code, player=player_id)
+    
+    def close_room(self, room_code: str):
+        """Tear down a room and everything attached to it."""
+        if room_code in self.game_loops:
+            self.game_loops[room_code].cancel()
+            del self.game_loops[room_code]
+        
+        timeout = self.resume_timeouts.pop(room_code, None)
+        if timeout:
+            timeout.cancel()
+        self.paused.pop(room_code, None)
+        
+        game = self.rooms.pop(room_code, None)
+        if game:
+            for player_id in game.players:
+                if self.player_to_room.get(player_id) == room_code:
+                    del self.player_to_room[player_id]
+                    # Players still connected keep their session (and protocol) for the next room
+                    if self.connections.pop(player_id, None) is None:
+                        self.forget_session(player_id)
+        
+        self.room_codes.release(room_code)
+        self.close_spectators(room_code, {"type": "room_closed", "room_code": room_code})
+        self.lobby.remove(room_code)
+    
+    def issue_session(self, player_id: str) -> str:
+        """Create the token a client presents to resume as this player."""
+        token = secrets.token_urlsafe(24)
+        self.sessions[token] = player_id
+        self.session_tokens[player_id] = token
+        return token
+    
+    def forget_session(self, player_id: str):
+        """Invalidate a player's session token."""
+        token = self.session_tokens.pop(player_id, None)
+        if token:
+            self.sessions.pop(token, None)
+        if self.udp:
+            self.udp.unbind(player_id)
+        self.trajectory_players.discard(player_id)
+    
+    async def set_protocol(self, player_id: str, mode: str):
+        """Switch a player between per-tick frames and trajectory segments."""
+        if mode != "trajectory":
+            self.trajectory_players.discard(player_id)
+            return
+        
+        self.trajectory_players.add(player_id)
+        # Mid-match switch: the client has no segments yet, so send all of them
+        room_code = self.player_to_room.get(player_id)
+        encoder = self.trajectories.get(room_code) if room_code else None
+        game = self.rooms.get(room_code) if room_code else None
+        if encoder and game:
+            await self.send_to_player(player_id, encoder.keyframe(game, time.time() * 1000))
+    
+    async def start_udp(self, host: str, port: int):
+        """Open the optional UDP channel for snapshots and inputs."""
+        self.udp = await start_udp_transport(
+            host,
+            port,
+            resolve_token=self.sessions.get,
+            on_input=self.queue_input,
+            loss=settings.udp_simulate_loss,
+            latency_ms=settings.udp_simulate_latency_ms,
+        )
+    
+    def queue_input(self, player_id: str, direction: int):
+        """Buffer a paddle direction for the player's room, if any."""
+        room_code = self.player_to_room.get(player_id)
+        game = self.rooms.get(room_code) if room_code else None
+        if game:
+            game.queue_paddle_input(player_id, direction)
+    
+    async def resume(self, token: str, websocket: WebSocket) -> Optional[str]:
+        """
+        Re-bind a new connection to a player's seat, after a dropped link or
+        a server restart. Returns the player_id, or None if the token is
+        unknown or the player no longer has a seat.
+        """
+        player_id = self.sessions.get(token or "")
+        if player_id is None:
+            return None
+        
+        room_code = self.player_to_room.get(player_id)
+        game = self.rooms.get(room_code) if room_code else None
+        if game is None or player_id not in game.players:
+            return None
+        
+        await self.broadcast_to_room(room_code, {
+            "type": "player_resumed",
+            "player_id": player_id
+        }, exclude=player_id)
+        
+        # The client can notice a dead link before we do; the token proves
+        # it is the same player, so the new socket takes over
+        previous = self.connections.get(player_id)
+        self.connections[player_id] = websocket
+        if previous is not None and previous is not websocket:
+            asyncio.create_task(self.retire_websocket(previous))
+        
+        # Once everyone is back, the match picks up where it stopped
+        if all(pid in self.connections for pid in game.players):
+            timeout = self.resume_timeouts.pop(room_code, None)
+            if timeout:
+                timeout.cancel()
+            paused = self.paused.pop(room_code, None)
+            if paused:
+                paused.set()
+            if len(game.players) == 2 and room_code not in self.game_loops and game.state.value == "playing":
+                self.game_loops[room_code] = asyncio.create_task(self.game_loop(room_code))
+        
+        log.info("Player resumed", room=room_code, player=player_id)
+        return player_id
+    
+    async def retire_websocket(self, websocket: WebSocket):
+        """Close a replaced socket in the background; a dead link may never answer."""
+        try:
+            await websocket.close(code=4000)
+        except Exception:
+            pass
+    
+    async def expire_detached(self, room_code: str, delay: float):
+        """Close a room if its players haven't all reconnected in time."""
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            return
+        
+        self.resume_timeouts.pop(room_code, None)
+        game = self.rooms.get(room_code)
+        if game is None:
+            return
+        
+        await self.broadcast_to_room(room_code, {"type": "player_disconnected", "player_id": None})
+        self.close_room(room_code)
+    
+    async def drain(self, path: str) -> int:
+        """
+        Stop accepting rooms, snapshot in-progress matches to disk and close
+        every connection with a resume hint. Returns the number of rooms saved.
+        """
+        self.draining = True
+        
+        for task in list(self.game_loops.values()):
+            task.cancel()
+        await asyncio.gather(*self.game_loops.values(), return_exceptions=True)
+        
+        records: List[dict] = []
+        for room_code, game in self.rooms.items():
+            if game.state.value != "playing" or len(game.players) != 2:
+                continue
+            records.append({
+                "game": game.to_snapshot(),
+                "sessions": {pid: self.session_tokens[pid] for pid in game.players if pid in self.session_tokens}
+            })
+        
+        save_snapshot(path, records)
+        
+        sockets = list(self.connections.items()) + list(self.queued_connections.items())
+        for player_id, websocket in sockets:
+            await self.send_to_websocket(websocket, {
+                "type": "server_draining",
+                "retry_after_ms": settings.drain_retry_ms
+            })
+            try:
+                await websocket.close(code=1012)  # Service restart
+            except Exception:
+                pass
+        
+        return len(records)
+    
+    def restore(self, path: str) -> int:
+        """Load snapshotted rooms and wait for their players to resume."""
+        try:
+            records = load_snapshot(path)
+        except (OSError, ValueError) as e:
+            log.error("Could not load room snapshot", path=path, error=e)
+            return 0
+        
+        restored = 0
+        for record in records:
+            # One bad record costs its own room, not the restart
+            try:
+                game = Game.from_snapshot(record["game"])
+                sessions = dict(record["sessions"])
+            except Exception as e:
+                log.error("Skipping unreadable room in snapshot", path=path, error=e)
+                continue
+            if not self.room_codes.reserve(game.room_code):
+                continue
+            
+            self.rooms[game.room_code] = game
+            for player_id, token in sessions.items():
+                self.player_to_room[player_id] = game.room_code
+                self.sessions[token] = player_id
+                self.session_tokens[player_id] = token
+            
+            self.resume_timeouts[game.room_code] = asyncio.create_task(
+                self.expire_detached(game.room_code, settings.resume_window_seconds)
+            )
+            self.update_lobby(game.room_code)
+            restored += 1
+        
+        return restored
     
     async def broadcast_to_room(self, room_code: str, message: dict, exclude: Optional[str] = None):
         """Send message to all players in a room."""
@@ -98,7 +557,52 @@ class ConnectionManager:
                 try:
                     await self.connections[player_id].send_json(message)
                 except Exception as e:
-                    print(f"Error sending to {player_id}: {e}")
+                    log.warning("Send failed", room=room_code, player=player_id, error=e)
+    
+    async def broadcast_state(
+        self,
+        room_code: str,
+        state_text: str,
+        segment_text: Optional[str] = None,
+        keyframe: bool = True,
+    ):
+        """
+        Send a tick's state, already JSON-encoded, to the room: over UDP for
+        players bound to it, as trajectory segments (plus keyframes) for
+        players that asked for them, and as a full game_state to everyone else.
+        """
+        game = self.rooms.get(room_code)
+        if game is None:
+            return
+        
+        payload = None
+        for player_id in game.players.keys():
+            if self.udp and self.udp.is_bound(player_id):
+                if payload is None:
+                    payload = state_text.encode("utf-8")
+                self.udp.send_snapshot(player_id, payload)
+                continue
+            
+            websocket = self.connections.get(player_id)
+            if websocket is None:
+                continue
+            try:
+                if player_id in self.trajectory_players:
+                    if segment_text is not None:
+                        await websocket.send_text(segment_text)
+                    if keyframe:
+                        await websocket.send_text(state_text)
+                else:
+                    await websocket.send_text(state_text)
+            except Exception as e:
+                log.warning("Send failed", room=room_code, player=player_id, error=e)
+    
+    async def send_to_websocket(self, websocket: WebSocket, message: dict):
+        """Send message to a connection that isn't bound to a room."""
+        try:
+            await websocket.send_json(message)
+        except Exception as e:
+            log.warning("Send failed", error=e)
     
     async def send_to_player(self, player_id: str, message: dict):
         """Send message to a specific player."""
@@ -106,26 +610,69 @@ class ConnectionManager:
             try:
                 await self.connections[player_id].send_json(message)
             except Exception as e:
-                print(f"Error sending to {player_id}: {e}")
+                log.warning("Send failed", room=self.player_to_room.get(player_id), player=player_id, error=e)
     
     async def game_loop(self, room_code: str):
         """Main game loop for a room (60 FPS)."""
         if room_code not in self.rooms:
             return
         
+        bind(room=room_code)
         game = self.rooms[room_code]
         frame_time = game.FRAME_TIME
+        spectator_stride = max(1, round(game.FPS / max(settings.spectator_snapshot_hz, 0.001)))
+        keyframe_stride = max(1, round(game.FPS * settings.trajectory_keyframe_seconds))
+        encoder = TrajectoryEncoder()
+        self.trajectories[room_code] = encoder
+        if settings.record_latency and room_code not in self.latency:
+            recorder = self.recorders.get(room_code)
+            match_id = recorder.match_id if recorder else f"{room_code}-{int(time.time() * 1000)}"
+            self.latency[room_code] = LatencySeries(match_id)
+        tick = 0
+        next_tick = time.monotonic()
         
         try:
             while game.state.value in ["waiting", "playing"]:
-                loop_start = time.time()
+                paused = self.paused.get(room_code)
+                if paused is not None:
+                    await paused.wait()
+                    # Time stood still: restart the schedule, and give
+                    # clients fresh segments and a keyframe to extrapolate from
+                    next_tick = time.monotonic()
+                    encoder = self.trajectories[room_code] = TrajectoryEncoder()
+                    tick = 0
+                
+                started = time.monotonic()
+                lag = started - next_tick
                 
                 # Update game state
                 event = game.update()
                 
-                # Broadcast state to all players
+                # Broadcast state to all players, stamped with the tick's
+                # wall-clock time (ms) so clients can place it on their timeline.
+                # Trajectory clients only hear about changes in motion, plus a
+                # keyframe on the first tick, on scores and every few seconds
+                server_time = time.time() * 1000
                 state = game.get_state_dict()
-                await self.broadcast_to_room(room_code, state)
+                state["server_time"] = server_time
+                segment = encoder.update(game, server_time)
+                keyframe = tick % keyframe_stride == 0 or event == "score"
+                # Encoded once for every player, so all the tick's CPU work
+                # is done before the sends
+                state_text = json.dumps(state, separators=(",", ":"))
+                segment_text = json.dumps(segment, separators=(",", ":")) if segment is not None else None
+                
+                # Spectators get a thinned stream, encoded once for all of them
+                tick += 1
+                channel = self.spectators.get(room_code)
+                if channel and tick % spectator_stride == 0:
+                    channel.publish_text(state_text)
+                
+                # Busy time stops here. While the sends below wait on a slow
+                # socket the loop is free for other rooms, so counting that
+                # wait would make a few slow clients look like a full server
+                busy = time.monotonic() - started
+                await self.broadcast_state(room_code, state_text, segment_text, keyframe)
                 
                 # Handle events
                 if event == "score":
@@ -135,35 +682,91 @@ class ConnectionManager:
                     # Save to leaderboard
                     result = game.get_match_result()
                     if result:
+                        # Imported lazily: SQLModel is the slowest part of a cold start
+                        from database import add_match_result
+                        
                         p1_name, p2_name, p1_score, p2_score, avg_latency = result
                         
                         # Save both perspectives
-                        add_match_result(p1_name, p2_name, p1_score, p2_score, avg_latency)
-                        add_match_result(p2_name, p1_name, p2_score, p1_score, avg_latency)
+                        try:
+                            for entry in (
+                                await add_match_result(p1_name, p2_name, p1_score, p2_score, avg_latency),
+                                await add_match_result(p2_name, p1_name, p2_score, p1_score, avg_latency),
+                            ):
+                                self.rankings.record(entry.id, entry.player_name, entry.won,
+                                                     entry.player_score, entry.avg_latency_ms)
+                        except Exception as e:
+                            log.error("Could not save match result", error=e)
                     
-                    await self.broadcast_to_room(room_code, {
+                    game_over = {
                         "type": "game_over",
                         "winner": max(game.players.values(), key=lambda p: p.score).name
-                    })
+                    }
+                    await self.broadcast_to_room(room_code, game_over)
+                    self.close_spectators(room_code, game_over)
+                    self.update_lobby(room_code)
+                    await self.save_latency(room_code, game)
                     break
                 
-                # Sleep to maintain FPS
-                elapsed = time.time() - loop_start
-                sleep_time = max(0, frame_time - elapsed)
-                await asyncio.sleep(sleep_time)
+                self.tick_load.record(busy, lag)
+                if self.tick_listener:
+                    self.tick_listener(room_code, busy, lag)
+                
+                # Sleep until the next fixed step; the simulation always
+                # advances FRAME_TIME per tick, so pace against a schedule
+                next_tick += frame_time
+                sleep_time = next_tick - time.monotonic()
+                if sleep_time < -frame_time:
+                    # Too far behind to catch up smoothly; resync the schedule
+                    next_tick = time.monotonic()
+                    sleep_time = 0
+                await asyncio.sleep(max(0, sleep_time))
         
         except asyncio.CancelledError:
-            print(f"Game loop for room {room_code} cancelled")
+            log.info("Game loop cancelled")
         except Exception as e:
-            print(f"Error in game loop for room {room_code}: {e}")
+            log.error("Game loop crashed", error=e)
         finally:
             # Clean up
             if room_code in self.game_loops:
                 del self.game_loops[room_code]
+            if self.trajectories.get(room_code) is encoder:
+                del self.trajectories[room_code]
+            
+            recorder = self.recorders.pop(room_code, None)
+            if recorder:
+                recorder.close(game.tick)
+            self.latency.pop(room_code, None)
+    
+    def record_latency(self, room_code: str, player_id: str, latency_ms: float):
+        """Append a player's RTT sample to their match's time series."""
+        series = self.latency.get(room_code)
+        game = self.rooms.get(room_code)
+        if series is None or game is None or game.state != GameState.PLAYING:
+            return
+        for slot, pid in enumerate(list(game.players)[:2]):
+            if pid == player_id:
+                series.add(slot, latency_ms)
+    
+    async def save_latency(self, room_code: str, game: Game):
+        """Store a finished match's RTT series."""
+        series = self.latency.pop(room_code, None)
+        players = list(game.players.values())[:2]
+        if series is None or not len(series) or len(players) < 2:
+            return
+        
+        from database import add_match_latency
+        
+        winner_slot = 0 if players[0].score >= players[1].score else 1
+        try:
+            await add_match_latency(series, players[0].name, players[1].name, winner_slot)
+        except Exception as e:
+            log.error("Could not save latency series", match=series.match_id, error=e)
     
     def get_room(self, room_code: str) -> Optional[Game]:
         """Get a game room."""
-        return self.rooms.get(room_code.upper())
+        room_code = self.room_codes.normalize(room_code)
+        return self.rooms.get(room_code) if room_code else None
     
     def get_player_room(self, player_id: str) -> Optional[str]:
         """Get the room code for a player."""
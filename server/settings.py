@@ -0,0 +1,81 @@
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class Settings(BaseSettings):
+    """Server configuration, overridable via NETPONG_* environment variables."""
+    model_config = SettingsConfigDict(env_prefix="NETPONG_", env_file=".env", extra="ignore")
+
+    # Room codes
+    room_code_length: int = 4
+    room_code_alphabet: str = "23456789ABCDEFGHJKMNPQRSTUVWXYZ"  # No 0/O, 1/I/L
+    room_code_quarantine_seconds: float = 300.0
+
+    # WebSocket abuse protection
+    ws_max_message_bytes: int = 4096
+    ws_message_rate: float = 200.0
+    ws_message_burst: float = 100.0
+    ws_violation_rate: float = 2.0
+    ws_violation_burst: float = 50.0
+
+    # Quick match
+    matchmaking_base_tolerance_ms: float = 20.0
+    matchmaking_widen_ms_per_second: float = 15.0
+    matchmaking_max_tolerance_ms: float = 500.0
+    matchmaking_sweep_interval: float = 0.5
+
+    # Spectators
+    spectator_snapshot_hz: float = 20.0
+
+    # Lobby: /rooms pages and the /lobby change feed
+    lobby_page_size: int = 50
+    lobby_max_page_size: int = 200
+    lobby_flush_interval: float = 0.25  # Seconds of room changes coalesced per lobby_update
+
+    # Trajectory protocol: full game_state keyframes between segments
+    trajectory_keyframe_seconds: float = 2.0
+
+    # Admission control: refuse new rooms when ticks run out of headroom
+    tick_load_window_seconds: float = 5.0
+    admission_max_utilization: float = 0.75  # Share of the event loop spent ticking (0 disables)
+    admission_max_tick_lag_ms: float = 8.0  # Mean lateness of ticks (0 disables)
+    admission_retry_ms: int = 5000
+
+    # Deploys: drain, snapshot and resume
+    admin_token: str = ""  # Empty disables /admin endpoints
+    snapshot_path: str = "room_snapshot.bin"
+    snapshot_on_shutdown: bool = True
+    resume_window_seconds: float = 30.0
+    reconnect_grace_seconds: float = 20.0  # Seat kept (room paused) after a mid-match drop; 0 ends the match at once
+    drain_retry_ms: int = 250
+
+    # Optional UDP snapshot/input channel for native clients (0 disables)
+    udp_host: str = "0.0.0.0"
+    udp_port: int = 0
+    udp_simulate_loss: float = 0.0  # Fraction of datagrams dropped, both ways
+    udp_simulate_latency_ms: float = 0.0  # Added one-way delay, both ways
+
+    # Event loop stall watchdog
+    watchdog_enabled: bool = True
+    watchdog_interval_ms: float = 50.0  # Heartbeat period
+    watchdog_stall_ms: float = 100.0  # Heartbeat this overdue counts as a stall
+
+    # Logging
+    log_level: str = "INFO"
+    log_json: bool = False
+    log_repeat_window_seconds: float = 10.0  # Identical warnings/errors are counted, not printed, within this window
+
+    # Database: any SQLAlchemy URL; plain sqlite:// and postgres(ql):// get their async driver
+    database_url: str = "sqlite:///./netpong.db"
+    database_pool_size: int = 5
+    database_max_overflow: int = 5  # Extra connections allowed above the pool under bursts
+    database_pool_timeout_seconds: float = 10.0
+    database_statement_cache_size: int = 256  # Prepared statements kept per SQLite connection
+
+    # Match recording
+    record_matches: bool = True
+    replay_dir: str = "replays"
+    record_latency: bool = True  # Keep each match's RTT samples for /stats/latency
+    latency_stats_max_hours: int = 24 * 90  # Longest window /stats/latency will merge
+
+
+settings = Settings()
@@ -0,0 +1,343 @@
+"""
+Headless match simulator for physics and balance testing.
+
+Plays whole matches through Game.update() in virtual time: no sleeping and
+no wall clock, just fixed FRAME_TIME steps as fast as Python allows, spread
+over a process pool. Paddles are driven by scripted or AI policies.
+
+    python simulate.py --matches 5000 --left predictor --right tracker
+
+Reports rally lengths, how often each collision branch in Game.update()
+fires, and any tunnelling: a ball that crossed a paddle's face within
+reach of it during a step without bouncing.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+from game import Game, GameState, PlayerState
+
+
+# ===== POLICIES =====
+# (game, player, slot, rng, aim) -> direction (-1, 0 or 1). `aim` is this
+# approach's aiming error in pixels; perfect AIs would never lose a point.
+Policy = Callable[[Game, PlayerState, int, random.Random, float], int]
+
+
+def _move_toward(paddle_y: float, target: float, deadzone: float = 8.0) -> int:
+    if target < paddle_y - deadzone:
+        return -1
+    if target > paddle_y + deadzone:
+        return 1
+    return 0
+
+
+def policy_idle(game: Game, player: PlayerState, slot: int, rng: random.Random, aim: float) -> int:
+    """Never moves."""
+    return 0
+
+
+def policy_tracker(game: Game, player: PlayerState, slot: int, rng: random.Random, aim: float) -> int:
+    """Follows the ball's current height."""
+    return _move_toward(player.paddle.y, game.ball.position.y + aim)
+
+
+def policy_predictor(game: Game, player: PlayerState, slot: int, rng: random.Random, aim: float) -> int:
+    """Moves to where the ball will cross its paddle, bouncing off walls."""
+    ball = game.ball
+    paddle_x = (game.PADDLE_OFFSET + player.paddle.width
+                if slot == 0 else game.CANVAS_WIDTH - game.PADDLE_OFFSET - player.paddle.width)
+    incoming = ball.velocity.x < 0 if slot == 0 else ball.velocity.x > 0
+    if not incoming or ball.velocity.x == 0:
+        return _move_toward(player.paddle.y, game.CANVAS_HEIGHT / 2)
+
+    # Unfold the wall bounces: the ball travels a straight line in a
+    # mirrored corridor of height 2 * span
+    time_to_reach = (paddle_x - ball.position.x) / ball.velocity.x
+    low, span = ball.radius, game.CANVAS_HEIGHT - 2 * ball.radius
+    y = (ball.position.y + ball.velocity.y * time_to_reach - low) % (2 * span)
+    target = low + (y if y <= span else 2 * span - y)
+    return _move_toward(player.paddle.y, target + aim)
+
+
+def policy_random(game: Game, player: PlayerState, slot: int, rng: random.Random, aim: float) -> int:
+    """Holds a random direction, changing it now and then."""
+    if rng.random() < 0.05:
+        return rng.choice((-1, 0, 1))
+    return int(math.copysign(1, player.paddle.velocity)) if player.paddle.velocity else 0
+
+
+def policy_sweep(game: Game, player: PlayerState, slot: int, rng: random.Random, aim: float) -> int:
+    """Scripted: sweeps between the walls regardless of the ball."""
+    half = player.paddle.height / 2
+    if player.paddle.y <= half:
+        return 1
+    if player.paddle.y >= game.CANVAS_HEIGHT - half:
+        return -1
+    return 1 if player.paddle.velocity >= 0 else -1
+
+
+POLICIES: Dict[str, Policy] = {
+    "idle": policy_idle,
+    "tracker": policy_tracker,
+    "predictor": policy_predictor,
+    "random": policy_random,
+    "sweep": policy_sweep,
+}
+
+
+# ===== SIMULATION =====
+
+def play_match(
+    seed: int,
+    left: str,
+    right: str,
+    reaction_ticks: int = 6,
+    aim_error: float = 30.0,
+    max_seconds: float = 600.0,
+) -> dict:
+    """
+    Play one match to completion. Policies decide every `reaction_ticks`
+    ticks, which stands in for human reaction time or input latency, and
+    aim off by a Gaussian error (sd `aim_error` px) drawn per approach.
+    Matches still running after `max_seconds` of virtual time count as
+    stalemates.
+    """
+    game = Game("SIM", seed=seed)
+    game.add_player("left", "left")
+    game.add_player("right", "right")
+    policies = [POLICIES[left], POLICIES[right]]
+    policy_rng = random.Random(seed ^ 0x5EED)
+    players = list(game.players.values())
+    aims = [0.0, 0.0]
+    ball_heading = 0
+    max_ticks = int(max_seconds * game.FPS)
+
+    collisions: Counter = Counter()
+    tick_collisions: List[str] = []
+    game.collision_listener = tick_collisions.append
+
+    rallies: List[int] = []  # Paddle hits per point
+    rally_ticks: List[int] = []
+    hits = 0
+    point_started = 0
+    tunnels = 0
+    behind_hits = 0
+    dt = game.FRAME_TIME
+
+    while game.state == GameState.PLAYING and game.tick < max_ticks:
+        heading = 1 if game.ball.velocity.x > 0 else -1
+        if heading != ball_heading:
+            ball_heading = heading
+            aims = [policy_rng.gauss(0, aim_error) if aim_error > 0 else 0.0 for _ in players]
+        
+        if game.tick % reaction_ticks == 0:
+            for slot, player in enumerate(players):
+                direction = policies[slot](game, player, slot, policy_rng, aims[slot])
+                game.update_paddle_input(player.player_id, direction)
+
+        ball = game.ball
+        x0, y0, vx, vy = ball.position.x, ball.position.y, ball.velocity.x, ball.velocity.y
+
+        tick_collisions.clear()
+        event = game.update()
+        collisions.update(tick_collisions)
+
+        for slot, player in enumerate(players):
+            name = "paddle_left" if slot == 0 else "paddle_right"
+            paddle = player.paddle
+            if slot == 0:
+                face = game.PADDLE_OFFSET + paddle.width
+                gap_before, gap_after = (x0 - ball.radius) - face, (x0 + vx * dt - ball.radius) - face
+            else:
+                face = game.CANVAS_WIDTH - game.PADDLE_OFFSET - paddle.width
+                gap_before, gap_after = face - (x0 + ball.radius), face - (x0 + vx * dt + ball.radius)
+
+            if name in tick_collisions:
+                hits += 1
+                # The ball was already past the face before this step began
+                if gap_before < -abs(vx) * dt:
+                    behind_hits += 1
+            elif gap_before > 0 >= gap_after:
+                # Crossed the face this step: was the paddle there at the crossing?
+                t = gap_before / (gap_before - gap_after)
+                y_cross = y0 + vy * dt * t
+                if abs(y_cross - paddle.y) <= paddle.height / 2 + ball.radius:
+                    tunnels += 1
+
+        if event in ("score", "game_over"):
+            rallies.append(hits)
+            rally_ticks.append(game.tick - point_started)
+            hits = 0
+            point_started = game.tick
+
+    return {
+        "ticks": game.tick,
+        "finished": game.state == GameState.FINISHED,
+        "winner": 0 if players[0].score > players[1].score else 1,
+        "rallies": rallies,
+        "rally_ticks": rally_ticks,
+        "collisions": dict(collisions),
+        "tunnels": tunnels,
+        "behind_hits": behind_hits,
+    }
+
+
+def run_batch(args: Tuple[int, int, str, str, int, float, float]) -> dict:
+    """Play a contiguous range of seeds and merge the results (runs in a worker)."""
+    first_seed, count, left, right, reaction_ticks, aim_error, max_seconds = args
+    totals = {
+        "matches": 0, "stalemates": 0, "ticks": 0, "wins": [0, 0],
+        "rally_hits": Counter(), "rally_ticks": [], "collisions": Counter(),
+        "tunnels": 0, "behind_hits": 0, "tunnel_seeds": [],
+    }
+    for seed in range(first_seed, first_seed + count):
+        result = play_match(seed, left, right, reaction_ticks, aim_error, max_seconds)
+        totals["matches"] += 1
+        totals["stalemates"] += not result["finished"]
+        totals["ticks"] += result["ticks"]
+        totals["wins"][result["winner"]] += result["finished"]
+        totals["rally_hits"].update(result["rallies"])
+        totals["rally_ticks"].extend(result["rally_ticks"])
+        totals["collisions"].update(result["collisions"])
+        totals["tunnels"] += result["tunnels"]
+        totals["behind_hits"] += result["behind_hits"]
+        if result["tunnels"] and len(totals["tunnel_seeds"]) < 10:
+            totals["tunnel_seeds"].append(seed)
+    return totals
+
+
+def merge(results: List[dict]) -> dict:
+    merged = run_batch((0, 0, "idle", "idle", 1, 0.0, 0.0))
+    for r in results:
+        for key in ("matches", "stalemates", "ticks", "tunnels", "behind_hits"):
+            merged[key] += r[key]
+        merged["wins"] = [a + b for a, b in zip(merged["wins"], r["wins"])]
+        merged["rally_hits"].update(r["rally_hits"])
+        merged["rally_ticks"].extend(r["rally_ticks"])
+        merged["collisions"].update(r["collisions"])
+        merged["tunnel_seeds"].extend(r["tunnel_seeds"][:10 - len(merged["tunnel_seeds"])])
+    return merged
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(merged: dict, elapsed: float) -> dict:
+    """Turn merged counters into the report."""
+    points = sum(merged["rally_hits"].values())
+    rally_ticks = sorted(merged["rally_ticks"])
+    hits_sorted = sorted(merged["rally_hits"].elements())
+    return {
+        "matches": merged["matches"],
+        "stalemates": merged["stalemates"],
+        "elapsed_s": round(elapsed, 3),
+        "matches_per_s": round(merged["matches"] / elapsed, 1) if elapsed else None,
+        "ticks_per_s": round(merged["ticks"] / elapsed) if elapsed else None,
+        "wins": {"left": merged["wins"][0], "right": merged["wins"][1]},
+        "points": points,
+        "rally_hits": {
+            "histogram": dict(sorted(merged["rally_hits"].items())),
+            "mean": round(sum(hits_sorted) / points, 2) if points else 0,
+            "p50": percentile(hits_sorted, 50),
+            "p90": percentile(hits_sorted, 90),
+            "p99": percentile(hits_sorted, 99),
+            "max": hits_sorted[-1] if hits_sorted else 0,
+        },
+        "rally_seconds": {
+            "p50": round(percentile(rally_ticks, 50) * Game.FRAME_TIME, 2),
+            "p90": round(percentile(rally_ticks, 90) * Game.FRAME_TIME, 2),
+            "max": round((rally_ticks[-1] if rally_ticks else 0) * Game.FRAME_TIME, 2),
+        },
+        "collisions": dict(merged["collisions"].most_common()),
+        "tunnels": merged["tunnels"],
+        "tunnel_seeds": merged["tunnel_seeds"],
+        "behind_paddle_hits": merged["behind_hits"],
+    }
+
+
+def print_report(report: dict, left: str, right: str):
+    print(f"🏓 {report['matches']} matches ({left} vs {right}) in {report['elapsed_s']}s "
+          f"- {report['matches_per_s']} matches/s, {report['ticks_per_s']} ticks/s")
+    print(f"   Wins: left {report['wins']['left']}, right {report['wins']['right']}, "
+          f"stalemates {report['stalemates']}")
+
+    rally = report["rally_hits"]
+    print(f"\nRally length (paddle hits per point, {report['points']} points)")
+    print(f"   mean {rally['mean']}  p50 {rally['p50']}  p90 {rally['p90']}  "
+          f"p99 {rally['p99']}  max {rally['max']}")
+    # Bucket the histogram so long tails stay readable (--json has it all)
+    width = max(1, math.ceil((rally["max"] + 1) / 20))
+    buckets: Counter = Counter()
+    for hits, count in rally["histogram"].items():
+        buckets[hits // width] += count
+    widest = max(buckets.values(), default=1)
+    for bucket in range(max(buckets, default=-1) + 1):
+        low = bucket * width
+        label = f"{low}" if width == 1 else f"{low}-{low + width - 1}"
+        bar = "█" * round(40 * buckets[bucket] / widest)
+        print(f"   {label:>9} {bar} {buckets[bucket]}")
+    seconds = report["rally_seconds"]
+    print(f"   duration p50 {seconds['p50']}s  p90 {seconds['p90']}s  max {seconds['max']}s")
+
+    print("\nCollision paths")
+    for name, count in report["collisions"].items():
+        print(f"   {name:<22} {count}")
+
+    print("\nTunnelling")
+    print(f"   missed crossings  {report['tunnels']}"
+          + (f"  (seeds: {report['tunnel_seeds']})" if report["tunnel_seeds"] else ""))
+    print(f"   behind-paddle hits {report['behind_paddle_hits']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fast-forward NetPong matches headlessly.")
+    parser.add_argument("--matches", type=int, default=1000)
+    parser.add_argument("--left", choices=POLICIES, default="predictor")
+    parser.add_argument("--right", choices=POLICIES, default="tracker")
+    parser.add_argument("--reaction-ticks", type=int, default=6,
+                        help="Ticks between policy decisions (reaction time / input lag)")
+    parser.add_argument("--aim-error", type=float, default=30.0,
+                        help="Std. dev. of the AI's aiming error in pixels, drawn per approach")
+    parser.add_argument("--max-seconds", type=float, default=600.0,
+                        help="Virtual time after which a match counts as a stalemate")
+    parser.add_argument("--seed", type=int, default=1, help="First match seed; matches use consecutive seeds")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    workers = max(1, min(args.workers, args.matches))
+    per_batch = max(1, math.ceil(args.matches / (workers * 4)))
+    batches = [
+        (seed, min(per_batch, args.seed + args.matches - seed), args.left, args.right,
+         max(1, args.reaction_ticks), args.aim_error, args.max_seconds)
+        for seed in range(args.seed, args.seed + args.matches, per_batch)
+    ]
+
+    started = time.perf_counter()
+    if workers == 1:
+        results = [run_batch(batch) for batch in batches]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run_batch, batches))
+    report = summarize(merge(results), time.perf_counter() - started)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report, args.left, args.right)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import json
+import os
+import struct
+import zlib
+from typing import List
+
+
+# File layout: magic "NPS1" | payload length u32 | zlib-compressed JSON list
+# of room records ({"game": Game.to_snapshot(), "sessions": {player_id: token}}).
+MAGIC = b"NPS1"
+HEADER = struct.Struct("<4sI")
+
+
+def save_snapshot(path: str, rooms: List[dict]):
+    """Write room records atomically, so a crash never leaves half a file."""
+    payload = zlib.compress(json.dumps(rooms, separators=(",", ":")).encode("utf-8"), 6)
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(payload)))
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path: str, consume: bool = True) -> List[dict]:
+    """
+    Read room records written by save_snapshot. With `consume`, the file is
+    removed afterwards so the same rooms are never restored twice.
+    """
+    if not os.path.exists(path):
+        return []
+
+    with open(path, "rb") as f:
+        data = f.read()
+
+    if consume:
+        os.remove(path)
+
+    if len(data) < HEADER.size:
+        raise ValueError(f"Truncated snapshot: {path}")
+    magic, length = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or len(data) - HEADER.size != length:
+        raise ValueError(f"Not a NetPong snapshot: {path}")
+
+    try:
+        rooms = json.loads(zlib.decompress(data[HEADER.size:]))
+    except zlib.error as e:
+        raise ValueError(f"Corrupt snapshot: {path}: {e}") from e
+    if not isinstance(rooms, list):
+        raise ValueError(f"Not a NetPong snapshot: {path}")
+    return rooms
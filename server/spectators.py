@@ -0,0 +1,79 @@
+import asyncio
+import json
+from typing import Dict, Optional
+from fastapi import WebSocket
+from log import log
+
+
+class SpectatorChannel:
+    """
+    Fan-out of one room's snapshots to any number of spectators.
+
+    Each snapshot is encoded to JSON text once and shared by every watcher.
+    Publishing is synchronous and O(1) for the game loop: it swaps the latest
+    payload and resolves a shared future that all spectator senders wait on.
+    Every spectator has its own sender task, so a slow socket only delays
+    itself and simply skips to the newest snapshot when it catches up.
+    """
+
+    def __init__(self, room_code: str):
+        self.room_code = room_code
+        self.latest: Optional[str] = None
+        self.version = 0
+        self.closed = False
+        self._changed: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._senders: Dict[str, asyncio.Task] = {}  # spectator_id -> sender task
+
+    def __len__(self) -> int:
+        return len(self._senders)
+
+    def publish(self, message: dict):
+        """Encode a message once and wake every spectator sender."""
+        self.publish_text(json.dumps(message, separators=(",", ":")))
+
+    def publish_text(self, text: str):
+        if self.closed:
+            return
+        self.latest = text
+        self.version += 1
+        changed, self._changed = self._changed, asyncio.get_running_loop().create_future()
+        changed.set_result(None)
+
+    def add(self, spectator_id: str, websocket: WebSocket):
+        """Attach a spectator and start its sender."""
+        self.remove(spectator_id)
+        self._senders[spectator_id] = asyncio.create_task(self._sender(spectator_id, websocket))
+
+    def remove(self, spectator_id: str):
+        """Detach a spectator and stop its sender."""
+        task = self._senders.pop(spectator_id, None)
+        if task:
+            task.cancel()
+
+    def close(self, final_message: Optional[dict] = None):
+        """Publish a last message and let senders drain and exit."""
+        if final_message is not None:
+            self.publish(final_message)
+        self.closed = True
+        if not self._changed.done():
+            self._changed.set_result(None)
+
+    async def _sender(self, spectator_id: str, websocket: WebSocket):
+        sent_version = 0
+        try:
+            while True:
+                if self.version == sent_version:
+                    if self.closed:
+                        return
+                    await self._changed
+                    continue
+                sent_version = self.version
+                await websocket.send_text(self.latest)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            log.warning("Spectator send failed", room=self.room_code, error=e)
+        finally:
+            # A dead spectator stops counting; add() may already have replaced this task
+            if self._senders.get(spectator_id) is asyncio.current_task():
+                del self._senders[spectator_id]
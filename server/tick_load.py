@@ -0,0 +1,69 @@
+import time
+from collections import deque
+from typing import Callable, Deque
+
+
+class TickLoad:
+    """
+    How much of the event loop the game ticks are using, over the last
+    `window_seconds`.
+
+    Every room's loop reports each tick's busy time (simulation and
+    serialization; awaited sends are left out, since the loop is free while
+    a slow socket drains) and how late the tick started against its fixed
+    schedule.
+    Utilization is total busy time over wall time: at 1.0 the single event
+    loop has no room left to keep any match at FRAME_TIME. Lag catches the
+    same saturation when the time goes elsewhere (blocking I/O, other
+    handlers). Samples go into one-second buckets, so recording is O(1) and
+    old load ages out without a timer.
+    """
+
+    def __init__(self, window_seconds: float = 5.0, clock: Callable[[], float] = time.monotonic):
+        self.window = max(1, int(window_seconds))
+        self.clock = clock
+        self.buckets: Deque[list] = deque()  # [second, busy seconds, lag seconds, ticks]
+
+    def record(self, busy: float, lag: float):
+        """Account one tick: seconds spent on it, seconds it started late."""
+        second = int(self.clock())
+        if not self.buckets or self.buckets[-1][0] != second:
+            self.buckets.append([second, 0.0, 0.0, 0])
+            self._expire(second)
+        bucket = self.buckets[-1]
+        bucket[1] += busy
+        bucket[2] += max(0.0, lag)
+        bucket[3] += 1
+
+    def _expire(self, second: int):
+        while self.buckets and self.buckets[0][0] <= second - self.window:
+            self.buckets.popleft()
+
+    def _span(self, now: float) -> float:
+        # Time the buckets cover, counting the current partial second
+        if not self.buckets:
+            return float(self.window)
+        return max(1.0, min(float(self.window), now - self.buckets[0][0]))
+
+    @property
+    def utilization(self) -> float:
+        now = self.clock()
+        self._expire(int(now))
+        return sum(b[1] for b in self.buckets) / self._span(now)
+
+    @property
+    def lag_ms(self) -> float:
+        """Mean tick lateness, in milliseconds."""
+        self._expire(int(self.clock()))
+        ticks = sum(b[3] for b in self.buckets)
+        return sum(b[2] for b in self.buckets) / ticks * 1000 if ticks else 0.0
+
+    def snapshot(self) -> dict:
+        now = self.clock()
+        self._expire(int(now))
+        ticks = sum(b[3] for b in self.buckets)
+        return {
+            "tick_utilization": round(self.utilization, 3),
+            "tick_lag_ms": round(self.lag_ms, 2),
+            "ticks_per_second": round(ticks / self._span(now), 1),
+        }
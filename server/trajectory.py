@@ -0,0 +1,92 @@
+from typing import List, Optional, Tuple
+
+from game import Game
+
+
+class TrajectoryEncoder:
+    """
+    Describes a room's motion as trajectory segments instead of positions.
+
+    Between collisions the ball moves in a straight line and each paddle at
+    a constant velocity (clamped to the court), so a segment (origin,
+    velocity, tick it starts on) is enough for clients to compute every
+    intermediate position themselves. After each tick the encoder checks
+    whether the real state still lies on the last segment it sent; only
+    when it doesn't (bounce, score, reset, new input) is a new one emitted.
+
+    Segments are kept at full float precision so client extrapolation
+    matches the simulation, not a rounded copy of it.
+    """
+
+    EPSILON = 0.01  # Pixels of disagreement that force a new segment
+
+    def __init__(self):
+        self.ball: Optional[Tuple[int, float, float, float, float]] = None  # tick, x, y, vx, vy
+        self.paddles: List[Optional[Tuple[int, float, float]]] = []  # per slot: tick, y, vy
+        self.scores: Optional[List[int]] = None
+
+    def update(self, game: Game, server_time: float) -> Optional[dict]:
+        """Segments that changed on this tick, or None if clients can extrapolate."""
+        return self._encode(game, server_time, force=False)
+
+    def keyframe(self, game: Game, server_time: float) -> dict:
+        """Every current segment, for a client that just switched modes."""
+        return self._encode(game, server_time, force=True)
+
+    def _encode(self, game: Game, server_time: float, force: bool) -> Optional[dict]:
+        tick = game.tick
+        dt = game.FRAME_TIME
+        message = {"type": "trajectory", "tick": tick, "server_time": server_time}
+        changed = False
+
+        ball = game.ball
+        if force or self._ball_diverged(ball.position.x, ball.position.y, ball.velocity.x, ball.velocity.y, tick, dt):
+            self.ball = (tick, ball.position.x, ball.position.y, ball.velocity.x, ball.velocity.y)
+            message["ball"] = {
+                "x": ball.position.x,
+                "y": ball.position.y,
+                "vx": ball.velocity.x,
+                "vy": ball.velocity.y
+            }
+            changed = True
+
+        players = list(game.players.values())
+        if len(self.paddles) != len(players):
+            self.paddles = [None] * len(players)
+        paddles = []
+        for slot, player in enumerate(players):
+            paddle = player.paddle
+            if force or self._paddle_diverged(slot, paddle, game, tick, dt):
+                self.paddles[slot] = (tick, paddle.y, paddle.velocity)
+                paddles.append({"slot": slot, "y": paddle.y, "vy": paddle.velocity})
+        if paddles:
+            message["paddles"] = paddles
+            changed = True
+
+        scores = [p.score for p in players]
+        if force or scores != self.scores:
+            self.scores = scores
+            message["scores"] = scores
+            changed = True
+
+        return message if changed else None
+
+    def _ball_diverged(self, x: float, y: float, vx: float, vy: float, tick: int, dt: float) -> bool:
+        if self.ball is None:
+            return True
+        start, x0, y0, vx0, vy0 = self.ball
+        if vx != vx0 or vy != vy0:
+            return True
+        elapsed = (tick - start) * dt
+        return abs(x0 + vx0 * elapsed - x) > self.EPSILON or abs(y0 + vy0 * elapsed - y) > self.EPSILON
+
+    def _paddle_diverged(self, slot: int, paddle, game: Game, tick: int, dt: float) -> bool:
+        segment = self.paddles[slot]
+        if segment is None:
+            return True
+        start, y0, vy0 = segment
+        if paddle.velocity != vy0:
+            return True
+        half = paddle.height / 2
+        predicted = max(half, min(game.CANVAS_HEIGHT - half, y0 + vy0 * (tick - start) * dt))
+        return abs(predicted - paddle.y) > self.EPSILON
@@ -0,0 +1,174 @@
+import asyncio
+import random
+import struct
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional, Tuple
+
+from rate_limit import MESSAGE_LIMITS, TokenBucket
+
+
+# Datagram layout: kind u8 | sequence u32 | payload
+HELLO = 1     # client -> server, payload: session token (utf-8)
+WELCOME = 2   # server -> client, no payload
+SNAPSHOT = 3  # server -> client, payload: game_state JSON
+INPUT = 4     # client -> server, payload: direction i8
+
+HEADER = struct.Struct("<BI")
+DIRECTION = struct.Struct("<b")
+MAX_DATAGRAM = 1200  # Stay under typical path MTU; snapshots are ~300 bytes
+
+Address = Tuple[str, int]
+
+
+@dataclass
+class UDPPeer:
+    """A player whose snapshots and inputs travel over UDP."""
+    player_id: str
+    address: Address
+    snapshot_seq: int = 0
+    input_seq: int = 0
+    inputs: TokenBucket = field(default_factory=lambda: TokenBucket(*MESSAGE_LIMITS["paddle_input"]))
+
+
+class UDPTransport(asyncio.DatagramProtocol):
+    """
+    Optional unreliable channel for native clients.
+
+    Session setup and reliable events stay on /ws. A client binds its UDP
+    address by sending HELLO with the session token it got on /ws (and
+    repeats it until WELCOME arrives). From then on its game_state snapshots
+    go out as datagrams: each is complete, so the client keeps the highest
+    sequence and drops anything older instead of waiting for retransmits.
+
+    Inputs are numbered too, and the client sends each one several times a
+    few milliseconds apart, so a lost copy is covered by the next. Only the
+    newest direction is applied: directions are absolute, not deltas, so
+    missing an intermediate one does not matter.
+
+    `loss` and `latency_ms` impair traffic in both directions, for testing
+    over localhost.
+    """
+
+    def __init__(
+        self,
+        resolve_token: Callable[[str], Optional[str]],
+        on_input: Callable[[str, int], None],
+        loss: float = 0.0,
+        latency_ms: float = 0.0,
+        rng: Optional[random.Random] = None,
+    ):
+        self.resolve_token = resolve_token
+        self.on_input = on_input
+        self.loss = loss
+        self.latency = latency_ms / 1000
+        self.rng = rng or random.Random()
+        self.transport: Optional[asyncio.DatagramTransport] = None
+        self.peers: Dict[str, UDPPeer] = {}  # player_id -> peer
+        self.by_address: Dict[Address, UDPPeer] = {}
+        self.hellos = TokenBucket(50.0, 100.0)  # Transport-wide cap on bind attempts
+        self.dropped = 0
+
+    def connection_made(self, transport: asyncio.DatagramTransport):
+        self.transport = transport
+
+    def connection_lost(self, exc: Optional[Exception]):
+        self.transport = None
+
+    def close(self):
+        if self.transport:
+            self.transport.close()
+
+    def is_bound(self, player_id: str) -> bool:
+        return player_id in self.peers
+
+    def unbind(self, player_id: str):
+        """Stop sending a player's snapshots over UDP."""
+        peer = self.peers.pop(player_id, None)
+        if peer and self.by_address.get(peer.address) is peer:
+            del self.by_address[peer.address]
+
+    def send_snapshot(self, player_id: str, payload: bytes) -> bool:
+        """Send an encoded game_state to a bound player. False if not bound."""
+        peer = self.peers.get(player_id)
+        if peer is None:
+            return False
+        peer.snapshot_seq += 1
+        self._send(HEADER.pack(SNAPSHOT, peer.snapshot_seq) + payload, peer.address)
+        return True
+
+    def datagram_received(self, data: bytes, address: Address):
+        if self._impaired():
+            return
+        if self.latency > 0:
+            asyncio.get_running_loop().call_later(self.latency, self._handle, data, address)
+        else:
+            self._handle(data, address)
+
+    def _handle(self, data: bytes, address: Address):
+        if len(data) < HEADER.size or len(data) > MAX_DATAGRAM:
+            return
+        kind, seq = HEADER.unpack_from(data, 0)
+
+        if kind == HELLO:
+            if not self.hellos.consume():
+                return
+            try:
+                token = data[HEADER.size:].decode("utf-8")
+            except UnicodeDecodeError:
+                return
+            player_id = self.resolve_token(token)
+            if player_id is None:
+                return
+            self._bind(player_id, address)
+            self._send(HEADER.pack(WELCOME, seq), address)
+
+        elif kind == INPUT:
+            peer = self.by_address.get(address)
+            if peer is None or not peer.inputs.consume():
+                return
+            # Redundant copies and late arrivals carry an old sequence
+            if len(data) < HEADER.size + DIRECTION.size or seq <= peer.input_seq:
+                return
+            (direction,) = DIRECTION.unpack_from(data, HEADER.size)
+            peer.input_seq = seq
+            self.on_input(peer.player_id, (direction > 0) - (direction < 0))
+
+    def _bind(self, player_id: str, address: Address):
+        peer = self.peers.get(player_id)
+        if peer is not None and peer.address == address:
+            return
+        self.unbind(player_id)
+        # New address for this player, or a reused address: start both fresh
+        previous = self.by_address.pop(address, None)
+        if previous is not None:
+            self.peers.pop(previous.player_id, None)
+        peer = UDPPeer(player_id, address)
+        self.peers[player_id] = peer
+        self.by_address[address] = peer
+
+    def _send(self, packet: bytes, address: Address):
+        if self.transport is None or self._impaired():
+            return
+        if self.latency > 0:
+            asyncio.get_running_loop().call_later(self.latency, self._sendto, packet, address)
+        else:
+            self._sendto(packet, address)
+
+    def _sendto(self, packet: bytes, address: Address):
+        if self.transport is not None:
+            self.transport.sendto(packet, address)
+
+    def _impaired(self) -> bool:
+        if self.loss > 0 and self.rng.random() < self.loss:
+            self.dropped += 1
+            return True
+        return False
+
+
+async def start_udp_transport(host: str, port: int, **kwargs) -> UDPTransport:
+    """Bind the UDP channel and return its protocol."""
+    _, protocol = await asyncio.get_running_loop().create_datagram_endpoint(
+        lambda: UDPTransport(**kwargs),
+        local_addr=(host, port),
+    )
+    return protocol
@@ -0,0 +1,146 @@
+"""
+Event-loop stall watchdog.
+
+Every room ticks on the one event loop, so any synchronous work on it (a
+SQLite commit, a slow query, a blocked write) freezes all matches at once.
+A heartbeat task on the loop measures how late its wake-ups are; a side
+thread watches the heartbeat and, when it stops for longer than the
+threshold, grabs the loop thread's stack right then, while the blocking
+call is still on it. Stalls are counted by call site: the innermost frame
+in server code, since the time is usually spent in a library it called.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from bisect import bisect_left
+from collections import Counter, deque
+from typing import Deque, Dict, List, Optional
+
+from log import log
+
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Upper bounds (ms) of the lag histogram buckets; the last is +Inf
+LAG_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+class LoopWatchdog:
+    """Measures event-loop lag and attributes stalls to the code causing them."""
+
+    def __init__(self, interval_ms: float = 50.0, stall_ms: float = 100.0, stack_depth: int = 12):
+        self.interval = interval_ms / 1000
+        self.stall = stall_ms / 1000
+        self.stack_depth = stack_depth
+
+        # Lag histogram (ms), Prometheus style: counts per bucket plus sum and count
+        self.lag_buckets = [0] * (len(LAG_BUCKETS_MS) + 1)
+        self.lag_sum_ms = 0.0
+        self.lag_count = 0
+        self.max_lag_ms = 0.0
+
+        self.stalls: Counter = Counter()  # call site -> stalls
+        self.stacks: Dict[str, List[str]] = {}  # call site -> latest stack
+        self.recent: Deque[dict] = deque(maxlen=50)
+
+        self._lock = threading.Lock()
+        self._heartbeat = time.monotonic()
+        self._stalling: Optional[dict] = None
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """Start the heartbeat on the running loop and the watcher thread."""
+        self._loop_thread = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._beat())
+        self._thread = threading.Thread(target=self._watch, name="netpong-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+
+    async def _beat(self):
+        expected = time.monotonic() + self.interval
+        while True:
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag_ms = max(0.0, now - expected) * 1000
+            expected = now + self.interval
+
+            with self._lock:
+                self._heartbeat = now
+                self.lag_buckets[bisect_left(LAG_BUCKETS_MS, lag_ms)] += 1
+                self.lag_sum_ms += lag_ms
+                self.lag_count += 1
+                self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+                stall, self._stalling = self._stalling, None
+
+            # Logged from the loop once it is free again, so the log line
+            # carries how long the stall really lasted
+            if stall is not None:
+                stall["duration_ms"] = round(lag_ms, 1)
+                log.warning("Event loop stalled", site=stall["site"], ms=stall["duration_ms"])
+
+    def _watch(self):
+        while not self._stop.wait(self.interval / 2):
+            # Only the frame and the heartbeat are taken under the lock: _beat
+            # needs it too, and walking the stack (linecache reads included)
+            # would hold the loop up for longer than the stall being measured
+            with self._lock:
+                heartbeat = self._heartbeat
+                overdue = time.monotonic() - heartbeat - self.interval
+                if overdue < self.stall or self._stalling is not None:
+                    continue
+                frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+
+            stack = traceback.extract_stack(frame)
+            site = self.call_site(stack)
+            lines = traceback.format_list(stack[-self.stack_depth:])
+            del frame
+
+            with self._lock:
+                if self._heartbeat != heartbeat:
+                    continue  # The loop moved on meanwhile; the stack is no longer the stall's
+                self.stalls[site] += 1
+                self.stacks[site] = lines
+                self._stalling = {"site": site, "at": time.time(), "duration_ms": None}
+                self.recent.append(self._stalling)
+
+    @staticmethod
+    def call_site(stack: traceback.StackSummary) -> str:
+        """Innermost server frame, outside this module; else the innermost frame."""
+        for frame in reversed(stack):
+            path = os.path.abspath(frame.filename)
+            if os.path.dirname(path) == SERVER_DIR and path != os.path.abspath(__file__):
+                return f"{os.path.basename(path)}:{frame.lineno} {frame.name}"
+        frame = stack[-1]
+        return f"{os.path.basename(frame.filename)}:{frame.lineno} {frame.name}"
+
+    def report(self) -> dict:
+        """Stall counts by call site (with their latest stacks) and lag stats."""
+        with self._lock:
+            return {
+                "stall_threshold_ms": self.stall * 1000,
+                "stalls_total": sum(self.stalls.values()),
+                "sites": [
+                    {"site": site, "stalls": count, "stack": self.stacks.get(site, [])}
+                    for site, count in self.stalls.most_common()
+                ],
+                "recent": list(self.recent),
+                "lag_ms": {
+                    "mean": round(self.lag_sum_ms / self.lag_count, 3) if self.lag_count else 0.0,
+                    "max": round(self.max_lag_ms, 3),
+                    "samples": self.lag_count,
+                },
+            }
@@ -0,0 +1,95 @@
+// NetPong 2025 - Clock Sync
+// NTP-style estimate of the server clock from ping/pong exchanges.
+// Loaded by the page and by net_worker.js (importScripts).
+
+class ClockSync {
+    constructor(windowSize = 16) {
+        this.windowSize = windowSize;
+        this.samples = [];
+
+        // Server time ~= local + offset + drift * (local - reference)
+        this.offset = 0;
+        this.drift = 0;
+        this.reference = 0;
+        this.delay = null; // Best round trip in the window, minus server time
+    }
+
+    get ready() {
+        return this.delay !== null;
+    }
+
+    // t0: client send, t1: server receive, t2: server send, t3: client receive (ms)
+    addSample(t0, t1, t2, t3) {
+        if (![t0, t1, t2, t3].every(Number.isFinite)) return;
+
+        const delay = (t3 - t0) - (t2 - t1);
+        const offset = ((t1 - t0) + (t2 - t3)) / 2;
+        if (delay < 0) return;
+
+        this.samples.push({ at: t3, offset, delay });
+        if (this.samples.length > this.windowSize) {
+            this.samples.shift();
+        }
+        this.update();
+    }
+
+    update() {
+        // Queueing only ever adds delay (and skews the offset), so trust the
+        // fastest half of the window
+        const best = [...this.samples]
+            .sort((a, b) => a.delay - b.delay)
+            .slice(0, Math.ceil(this.samples.length / 2));
+
+        const n = best.length;
+        const meanAt = best.reduce((sum, s) => sum + s.at, 0) / n;
+        const meanOffset = best.reduce((sum, s) => sum + s.offset, 0) / n;
+
+        // Drift is the least-squares slope of offset over local time; it is
+        // only meaningful once the samples span a decent stretch of time
+        let drift = 0;
+        const span = Math.max(...best.map(s => s.at)) - Math.min(...best.map(s => s.at));
+        if (n >= 3 && span >= 10000) {
+            let num = 0;
+            let den = 0;
+            for (const s of best) {
+                num += (s.at - meanAt) * (s.offset - meanOffset);
+                den += (s.at - meanAt) ** 2;
+            }
+            drift = Math.max(-ClockSync.MAX_DRIFT, Math.min(ClockSync.MAX_DRIFT, num / den));
+        }
+
+        this.reference = meanAt;
+        this.offset = meanOffset;
+        this.drift = drift;
+        this.delay = best[0].delay;
+    }
+
+    toServerTime(localMs) {
+        return localMs + this.offset + this.drift * (localMs - this.reference);
+    }
+
+    toLocalTime(serverMs) {
+        return (serverMs - this.offset + this.drift * this.reference) / (1 + this.drift);
+    }
+
+    // How long ago (ms) the server produced something stamped serverMs
+    oneWayDelay(serverMs, localMs) {
+        return this.toServerTime(localMs) - serverMs;
+    }
+
+    // Plain object so the worker can post its estimate to the page
+    export() {
+        return { offset: this.offset, drift: this.drift, reference: this.reference, delay: this.delay };
+    }
+
+    load(state) {
+        if (!state || state.delay === null) return;
+        this.offset = state.offset;
+        this.drift = state.drift;
+        this.reference = state.reference;
+        this.delay = state.delay;
+    }
+}
+
+// Clocks drift tens of ppm; anything far beyond that is measurement noise
+ClockSync.MAX_DRIFT = 500e-6;
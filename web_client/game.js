@@ -13,11 +13,19 @@ class NetPongClient {
             userAgent: navigator.userAgent.substring(0, 50)
         });
         
-        // WebSocket
+        // WebSocket (owned by a network worker when available)
         this.ws = null;
+        this.netWorker = null;
+        this.workerConnected = false;
+        this.snapshotMeta = null;
         this.serverUrl = window.NETPONG_CONFIG.WS_URL;
         this.playerId = null;
         this.roomCode = null;
+        this.sessionToken = null;
+        this.reconnectDelay = 3000;
+        // Room code format; the server sends its own on connect
+        this.roomCodeLength = 4;
+        this.roomCodeAlphabet = null;
         
         // Sound
         this.soundManager = new window.SoundManager();
@@ -67,6 +75,14 @@ class NetPongClient {
         // Latency tracking
         this.pingInterval = null;
         this.latencySamples = [];
+        this.clock = new ClockSync();
+        this.oneWayLatency = null; // ms from server tick to snapshot arrival
+        
+        // Trajectory protocol: the server sends motion segments only when
+        // something changes and we fill in the frames in between
+        this.useTrajectory = true;
+        this.trajectory = null; // { ball, paddles } segments, each with a local start time
+        this.pauseMessage = null; // Shown over the court while the match is paused
         
         // UI Elements
         this.screens = {
@@ -327,7 +343,7 @@ class NetPongClient {
         const sendDirectionIfNeeded = (dir) => {
             if (dir !== this.currentInput) {
                 this.currentInput = dir;
-                if (!this.practiceMode && this.ws && this.ws.readyState === WebSocket.OPEN) {
+                if (!this.practiceMode && this.isConnected()) {
                     this.send({ type: 'paddle_input', direction: dir });
                 }
             }
@@ -410,7 +426,7 @@ class NetPongClient {
                 const dir = approx && Math.abs(y - approx) > 5 ? (y > approx ? 1 : -1) : 0;
                 if (dir !== this.currentInput) {
                     this.currentInput = dir;
-                    if (this.ws && this.ws.readyState === WebSocket.OPEN) {
+                    if (this.isConnected()) {
                         this.send({ type: 'paddle_input', direction: dir });
                     }
                 }
@@ -426,6 +442,12 @@ class NetPongClient {
     connect() {
         this.updateConnectionStatus('Connecting...', false);
         
+        // Prefer the worker so JSON decoding never competes with rendering
+        if (this.startNetWorker()) {
+            this.netWorker.postMessage({ cmd: 'connect', url: this.serverUrl });
+            return;
+        }
+        
         this.ws = new WebSocket(this.serverUrl);
         
         this.ws.onopen = () => {
@@ -446,24 +468,162 @@ class NetPongClient {
         this.ws.onclose = () => {
             console.log('Disconnected from server');
             this.updateConnectionStatus('OFFLINE', false);
-            
-            // Attempt reconnect after 3 seconds
-            setTimeout(() => this.connect(), 3000);
+            this.scheduleReconnect();
         };
     }
     
+    scheduleReconnect() {
+        // Mid-match the server holds our seat only for a short grace period,
+        // so come straight back; otherwise wait (longer if it is restarting)
+        const inMatch = this.roomCode && this.sessionToken && !this.practiceMode;
+        const delay = inMatch ? Math.min(this.reconnectDelay, 500) : this.reconnectDelay;
+        this.trajectory = null; // Freeze the court until fresh segments arrive
+        setTimeout(() => this.connect(), delay);
+        this.reconnectDelay = 3000;
+    }
+    
     send(data) {
-        if (this.ws && this.ws.readyState === WebSocket.OPEN) {
+        if (this.netWorker) {
+            this.netWorker.postMessage({ cmd: 'send', data });
+        } else if (this.isConnected()) {
             this.ws.send(JSON.stringify(data));
         }
     }
     
+    isConnected() {
+        if (this.netWorker) return this.workerConnected;
+        return !!(this.ws && this.ws.readyState === WebSocket.OPEN);
+    }
+    
+    // ===== NETWORK WORKER =====
+    
+    startNetWorker() {
+        if (this.netWorker) return true;
+        if (typeof Worker === 'undefined') return false;
+        
+        try {
+            this.netWorker = new Worker('net_worker.js');
+        } catch (error) {
+            console.warn('Network worker unavailable, using main thread:', error);
+            return false;
+        }
+        
+        this.netWorker.onmessage = (event) => this.handleWorkerMessage(event.data);
+        return true;
+    }
+    
+    handleWorkerMessage(msg) {
+        switch (msg.kind) {
+            case 'open':
+                console.log('Connected to server');
+                this.workerConnected = true;
+                this.updateConnectionStatus('ONLINE', true);
+                break;
+            
+            case 'close':
+                console.log('Disconnected from server');
+                this.workerConnected = false;
+                this.updateConnectionStatus('OFFLINE', false);
+                this.scheduleReconnect();
+                break;
+            
+            case 'error':
+                this.updateConnectionStatus('ERROR', false);
+                break;
+            
+            case 'message':
+                this.handleMessage(msg.data);
+                break;
+            
+            case 'latency':
+                this.recordLatency(msg.latency);
+                this.clock.load(msg.clock);
+                break;
+            
+            case 'state':
+                this.updateGameState(this.decodeSnapshot(msg));
+                // Hand the buffer back so the worker can reuse it
+                this.netWorker.postMessage({ cmd: 'release', buffer: msg.buffer }, [msg.buffer]);
+                break;
+        }
+    }
+    
+    decodeSnapshot(msg) {
+        // Field offsets must match SNAPSHOT_FIELDS in net_worker.js
+        const f = new Float64Array(msg.buffer);
+        if (msg.meta) this.snapshotMeta = msg.meta;
+        const meta = this.snapshotMeta || { state: 'playing', players: [] };
+        
+        const players = [];
+        if (f[11] >= 2) {
+            for (let i = 0; i < 2; i++) {
+                const base = 5 + i * 3;
+                players.push({
+                    id: meta.players[i] ? meta.players[i].id : null,
+                    name: meta.players[i] ? meta.players[i].name : '',
+                    paddle_y: f[base],
+                    score: f[base + 1],
+                    latency_ms: f[base + 2]
+                });
+            }
+        }
+        
+        return {
+            type: 'game_state',
+            state: meta.state,
+            frame: f[0],
+            ball: { x: f[1], y: f[2], vx: f[3], vy: f[4] },
+            players,
+            received_at: f[12],
+            server_time: f[13] || undefined
+        };
+    }
+    
     handleMessage(data) {
         console.log('Received:', data.type);
         
         switch (data.type) {
             case 'connected':
                 this.playerId = data.player_id;
+                this.freshSessionToken = data.session_token;
+                if (data.room_code_length) {
+                    this.roomCodeLength = data.room_code_length;
+                    this.roomCodeAlphabet = data.room_code_alphabet || null;
+                    document.getElementById('room-code-input').maxLength = this.roomCodeLength;
+                }
+                // Reclaim our seat if we were mid-match when the link dropped
+                if (this.sessionToken && this.roomCode && !this.practiceMode) {
+                    this.send({ type: 'resume', session_token: this.sessionToken });
+                } else {
+                    this.sessionToken = data.session_token;
+                }
+                if (this.useTrajectory) {
+                    this.send({ type: 'set_protocol', mode: 'trajectory' });
+                }
+                break;
+            
+            case 'resumed':
+                this.playerId = data.player_id;
+                this.roomCode = data.room_code;
+                this.sessionToken = data.session_token;
+                this.playerIndex = -1;
+                this.trajectory = null;
+                this.pauseMessage = null;
+                this.updateGameState(data.state);
+                this.showScreen('game');
+                this.startPingInterval();
+                this.startGameLoop();
+                break;
+            
+            case 'resume_failed':
+                this.sessionToken = this.freshSessionToken;
+                this.roomCode = null;
+                this.stopPingInterval();
+                this.showScreen('menu');
+                break;
+            
+            case 'server_draining':
+                this.reconnectDelay = data.retry_after_ms || 250;
                 break;
             
             case 'room_created':
@@ -474,6 +634,7 @@ class NetPongClient {
             
             case 'room_joined':
                 this.roomCode = data.room_code;
+                this.trajectory = null;
                 this.showScreen('game');
                 this.startPingInterval();
                 this.startGameLoop(); // Start continuous rendering
@@ -510,7 +671,7 @@ class NetPongClient {
                 const dir = approx && Math.abs(y - approx) > 5 ? (y > approx ? 1 : -1) : 0;
                 if (dir !== this.currentInput) {
                     this.currentInput = dir;
-                    if (this.ws && this.ws.readyState === WebSocket.OPEN) {
+                    if (this.isConnected()) {
                         this.send({ type: 'paddle_input', direction: dir });
                     }
                 }
@@ -523,6 +684,7 @@ class NetPongClient {
         canvas.addEventListener('touchcancel', endDrag, { passive: false });
             case 'player_joined':
                 // Second player joined, start game
+                this.trajectory = null;
                 this.showScreen('game');
                 this.startPingInterval();
                 this.startGameLoop(); // Start continuous rendering
@@ -532,6 +694,10 @@ class NetPongClient {
                 this.updateGameState(data);
                 break;
             
+            case 'trajectory':
+                this.applyTrajectory(data);
+                break;
+            
             case 'pong':
                 this.handlePong(data);
                 break;
@@ -545,7 +711,18 @@ class NetPongClient {
                 this.soundManager.playVictory();
                 break;
             
+            case 'player_detached':
+                // The match is paused while the server holds their seat
+                this.trajectory = null;
+                this.pauseMessage = 'Opponent reconnecting...';
+                break;
+            
+            case 'player_resumed':
+                this.pauseMessage = null;
+                break;
+            
             case 'player_disconnected':
+                this.pauseMessage = null;
                 this.handlePlayerDisconnect();
                 break;
             
@@ -579,8 +756,9 @@ class NetPongClient {
         const playerName = document.getElementById('player-name').value.trim() || 'Player';
         const roomCode = document.getElementById('room-code-input').value.trim().toUpperCase();
         
-        if (roomCode.length !== 4) {
-            alert('Please enter a 4-character room code');
+        const validChars = !this.roomCodeAlphabet || [...roomCode].every(c => this.roomCodeAlphabet.includes(c));
+        if (roomCode.length !== this.roomCodeLength || !validChars) {
+            alert(`Please enter a ${this.roomCodeLength}-character room code`);
             return;
         }
         
@@ -613,10 +791,19 @@ class NetPongClient {
         if (this.updateCount % 60 === 0) {
             console.log('📦 Game state update #' + this.updateCount + ':', {
                 ball: data.ball ? `(${Math.round(data.ball.x)}, ${Math.round(data.ball.y)})` : 'none',
-                players: data.players ? data.players.length : 0
+                players: data.players ? data.players.length : 0,
+                oneWayMs: this.oneWayLatency !== null ? Math.round(this.oneWayLatency) : 'n/a'
             });
         }
         
+        // Place the snapshot on the shared timeline: when the server produced
+        // it in our clock, and how long it took to get here
+        if (data.server_time && this.clock.ready) {
+            const arrivedAt = data.received_at || Date.now();
+            data.local_time = this.clock.toLocalTime(data.server_time);
+            this.oneWayLatency = this.clock.oneWayDelay(data.server_time, arrivedAt);
+        }
+        
         // Detect collisions by velocity changes (optimized)
         if (this.gameState && data.ball && this.soundManager.enabled) {
             const oldVelX = this.lastBallVelocity.x;
@@ -656,12 +843,12 @@ class NetPongClient {
     
     updateHUD(data) {
         if (data.players.length >= 2) {
-            // Player names and scores
-            document.getElementById('player1-name').textContent = data.players[0].name;
-            document.getElementById('player1-score').textContent = data.players[0].score;
+            // Only touch the DOM for values that changed (avoids 60 Hz relayouts)
+            this.setHUDText('player1-name', data.players[0].name);
+            this.setHUDText('player1-score', data.players[0].score);
             
-            document.getElementById('player2-name').textContent = data.players[1].name;
-            document.getElementById('player2-score').textContent = data.players[1].score;
+            this.setHUDText('player2-name', data.players[1].name);
+            this.setHUDText('player2-score', data.players[1].score);
             
             // Latency indicators
             this.updateLatencyIndicator('player1', data.players[0].latency_ms);
@@ -669,12 +856,19 @@ class NetPongClient {
         }
     }
     
+    setHUDText(elementId, value) {
+        if (!this.hudCache) this.hudCache = {};
+        const text = String(value);
+        if (this.hudCache[elementId] === text) return false;
+        this.hudCache[elementId] = text;
+        document.getElementById(elementId).textContent = text;
+        return true;
+    }
+    
     updateLatencyIndicator(playerId, latencyMs) {
-        const pingEl = document.getElementById(`${playerId}-ping`);
+        if (!this.setHUDText(`${playerId}-ping`, `${Math.round(latencyMs)}ms`)) return;
         const barEl = document.getElementById(`${playerId}-latency-bar`);
         
-        pingEl.textContent = `${Math.round(latencyMs)}ms`;
-        
         // Color based on latency
         let color, width;
         if (latencyMs < 50) {
@@ -695,57 +889,125 @@ class NetPongClient {
         barEl.style.setProperty('--latency-color', color);
     }
     
-    drawEnhancedBall(ctx, x, y, radius) {
-        // Ball trail effect (only on high-end devices)
+    // ===== RENDERING =====
+    
+    createLayer(width, height) {
+        // Offscreen canvas for pre-rendered sprites and static layers
+        if (typeof OffscreenCanvas !== 'undefined') {
+            return new OffscreenCanvas(width, height);
+        }
+        const layer = document.createElement('canvas');
+        layer.width = width;
+        layer.height = height;
+        return layer;
+    }
+    
+    ensureLayers() {
+        // Rebuild only when the canvas size or quality tier changes
+        const key = `${this.canvas.width}x${this.canvas.height}:${this.isLowEnd}`;
+        if (this.layers && this.layers.key === key) return this.layers;
+        
+        const width = this.canvas.width;
+        const height = this.canvas.height;
+        const paddleWidth = 20;
+        const paddleHeight = 100;
+        const ballRadius = 10;
+        const glow = this.isLowEnd ? 0 : 15;
+        
+        // Court: background and center line
+        const court = this.createLayer(width, height);
+        const courtCtx = court.getContext('2d');
+        courtCtx.fillStyle = '#000';
+        courtCtx.fillRect(0, 0, width, height);
+        courtCtx.strokeStyle = 'rgba(0, 243, 255, 0.3)';
+        courtCtx.lineWidth = 2;
+        courtCtx.beginPath();
+        courtCtx.moveTo(width / 2, 0);
+        courtCtx.lineTo(width / 2, height);
+        courtCtx.stroke();
+        
+        // Paddles: gradient plus baked-in glow, padded so the glow isn't clipped
+        const paddleMargin = glow * 2;
+        const makePaddle = (stops, glowColor) => {
+            const sprite = this.createLayer(paddleWidth + paddleMargin * 2, paddleHeight + paddleMargin * 2);
+            const sctx = sprite.getContext('2d');
+            const gradient = sctx.createLinearGradient(0, paddleMargin, 0, paddleMargin + paddleHeight);
+            stops.forEach(([offset, color]) => gradient.addColorStop(offset, color));
+            sctx.fillStyle = gradient;
+            if (glow) {
+                sctx.shadowColor = glowColor;
+                sctx.shadowBlur = glow;
+            }
+            sctx.fillRect(paddleMargin, paddleMargin, paddleWidth, paddleHeight);
+            return sprite;
+        };
+        
+        // Ball: trail halo, gradient body, glow and highlight in one sprite
+        const ballMargin = this.isLowEnd ? 2 : 30;
+        const ballSize = (ballRadius + ballMargin) * 2;
+        const ball = this.createLayer(ballSize, ballSize);
+        const bctx = ball.getContext('2d');
+        const c = ballSize / 2;
+        
         if (!this.isLowEnd) {
-            // Draw trail particles
-            ctx.globalAlpha = 0.3;
+            bctx.globalAlpha = 0.3;
             for (let i = 1; i <= 3; i++) {
-                const trailRadius = radius * (1 - i * 0.2);
-                const gradient = ctx.createRadialGradient(x, y, 0, x, y, trailRadius * 2);
-                gradient.addColorStop(0, 'rgba(255, 255, 255, 0.8)');
-                gradient.addColorStop(0.5, 'rgba(0, 243, 255, 0.4)');
-                gradient.addColorStop(1, 'rgba(0, 243, 255, 0)');
-                
-                ctx.fillStyle = gradient;
-                ctx.beginPath();
-                ctx.arc(x, y, trailRadius * 2, 0, Math.PI * 2);
-                ctx.fill();
+                const trailRadius = ballRadius * (1 - i * 0.2);
+                const trail = bctx.createRadialGradient(c, c, 0, c, c, trailRadius * 2);
+                trail.addColorStop(0, 'rgba(255, 255, 255, 0.8)');
+                trail.addColorStop(0.5, 'rgba(0, 243, 255, 0.4)');
+                trail.addColorStop(1, 'rgba(0, 243, 255, 0)');
+                bctx.fillStyle = trail;
+                bctx.beginPath();
+                bctx.arc(c, c, trailRadius * 2, 0, Math.PI * 2);
+                bctx.fill();
             }
-            ctx.globalAlpha = 1;
+            bctx.globalAlpha = 1;
         }
         
-        // Main ball with gradient
-        const gradient = ctx.createRadialGradient(
-            x - radius * 0.3, y - radius * 0.3, 0,
-            x, y, radius
+        const body = bctx.createRadialGradient(
+            c - ballRadius * 0.3, c - ballRadius * 0.3, 0,
+            c, c, ballRadius
         );
-        gradient.addColorStop(0, '#ffffff');
-        gradient.addColorStop(0.4, '#f0f0f0');
-        gradient.addColorStop(0.8, '#00f3ff');
-        gradient.addColorStop(1, '#00b8d4');
-        
-        ctx.fillStyle = gradient;
+        body.addColorStop(0, '#ffffff');
+        body.addColorStop(0.4, '#f0f0f0');
+        body.addColorStop(0.8, '#00f3ff');
+        body.addColorStop(1, '#00b8d4');
+        bctx.fillStyle = body;
+        if (!this.isLowEnd) {
+            bctx.shadowBlur = 20;
+            bctx.shadowColor = '#00f3ff';
+        }
+        bctx.beginPath();
+        bctx.arc(c, c, ballRadius, 0, Math.PI * 2);
+        bctx.fill();
         
-        // Outer glow
         if (!this.isLowEnd) {
-            ctx.shadowBlur = 20;
-            ctx.shadowColor = '#00f3ff';
+            bctx.shadowBlur = 0;
+            bctx.fillStyle = 'rgba(255, 255, 255, 0.6)';
+            bctx.beginPath();
+            bctx.arc(c - ballRadius * 0.3, c - ballRadius * 0.3, ballRadius * 0.4, 0, Math.PI * 2);
+            bctx.fill();
         }
         
-        ctx.beginPath();
-        ctx.arc(x, y, radius, 0, Math.PI * 2);
-        ctx.fill();
+        this.layers = {
+            key,
+            court,
+            paddleMargin,
+            leftPaddle: makePaddle([[0, '#00f3ff'], [0.5, '#00d4ff'], [1, '#00a0c8']], '#00f3ff'),
+            rightPaddle: makePaddle([[0, '#ff00ff'], [0.5, '#ff00d4'], [1, '#c800a0']], '#ff00ff'),
+            ball,
+            ballOffset: c
+        };
+        return this.layers;
+    }
+    
+    drawEnhancedBall(ctx, x, y, radius) {
+        const layers = this.ensureLayers();
+        ctx.drawImage(layers.ball, x - layers.ballOffset, y - layers.ballOffset);
         
-        // Inner highlight
+        // Pulse ring is the only animated part of the ball
         if (!this.isLowEnd) {
-            ctx.shadowBlur = 0;
-            ctx.fillStyle = 'rgba(255, 255, 255, 0.6)';
-            ctx.beginPath();
-            ctx.arc(x - radius * 0.3, y - radius * 0.3, radius * 0.4, 0, Math.PI * 2);
-            ctx.fill();
-            
-            // Pulse ring effect
             const pulseRadius = radius + Math.sin(Date.now() / 200) * 2;
             ctx.strokeStyle = 'rgba(0, 243, 255, 0.5)';
             ctx.lineWidth = 2;
@@ -762,84 +1024,42 @@ class NetPongClient {
         
         const ctx = this.ctx;
         const canvas = this.canvas;
+        const layers = this.ensureLayers();
         
         // NO THROTTLING - render every frame to ensure smooth animation
         this.lastRenderTime = performance.now();
         
-        // Clear canvas efficiently
-        ctx.fillStyle = '#000';
-        ctx.fillRect(0, 0, canvas.width, canvas.height);
+        // Static court is a single blit; it also clears the previous frame
+        ctx.drawImage(layers.court, 0, 0);
         
-        // Draw center line (simpler on low-end)
-        ctx.strokeStyle = 'rgba(0, 243, 255, 0.3)';
-        ctx.lineWidth = 2;
-        ctx.beginPath();
-        ctx.moveTo(canvas.width / 2, 0);
-        ctx.lineTo(canvas.width / 2, canvas.height);
-        ctx.stroke();
+        // Paddles are pre-rendered sprites (gradient + glow)
+        const paddleWidth = 20;
+        const paddleHeight = 100;
+        const paddleOffset = 30;
+        const margin = layers.paddleMargin;
         
-        if (data.players.length >= 2) {
-            // Draw paddles - NO shadows on low-end devices
-            const paddleWidth = 20;
-            const paddleHeight = 100;
-            const paddleOffset = 30;
-            
-            // Reset shadow for high-end devices
-            if (!this.isLowEnd) {
-                ctx.shadowBlur = 10;
-            } else {
-                ctx.shadowBlur = 0; // Disable shadows completely on low-end
-            }
-            
-            // Left paddle with gradient
-            const leftGradient = ctx.createLinearGradient(
-                paddleOffset, data.players[0].paddle_y - paddleHeight / 2,
-                paddleOffset, data.players[0].paddle_y + paddleHeight / 2
-            );
-            leftGradient.addColorStop(0, '#00f3ff');
-            leftGradient.addColorStop(0.5, '#00d4ff');
-            leftGradient.addColorStop(1, '#00a0c8');
-            ctx.fillStyle = leftGradient;
-            
-            if (!this.isLowEnd) {
-                ctx.shadowColor = '#00f3ff';
-                ctx.shadowBlur = 15;
-            }
-            
-            ctx.fillRect(
-                paddleOffset,
-                data.players[0].paddle_y - paddleHeight / 2,
-                paddleWidth,
-                paddleHeight
-            );
-            
-            // Right paddle with gradient
-            const rightGradient = ctx.createLinearGradient(
-                canvas.width - paddleOffset - paddleWidth, data.players[1].paddle_y - paddleHeight / 2,
-                canvas.width - paddleOffset - paddleWidth, data.players[1].paddle_y + paddleHeight / 2
-            );
-            rightGradient.addColorStop(0, '#ff00ff');
-            rightGradient.addColorStop(0.5, '#ff00d4');
-            rightGradient.addColorStop(1, '#c800a0');
-            ctx.fillStyle = rightGradient;
-            
-            if (!this.isLowEnd) {
-                ctx.shadowColor = '#ff00ff';
-                ctx.shadowBlur = 15;
-            }
-            
-            ctx.fillRect(
-                canvas.width - paddleOffset - paddleWidth,
-                data.players[1].paddle_y - paddleHeight / 2,
-                paddleWidth,
-                paddleHeight
-            );
-            
-            // Draw ball with enhanced effects
-            this.drawEnhancedBall(ctx, data.ball.x, data.ball.y, 10);
-            
-            // Reset shadow
-            ctx.shadowBlur = 0;
+        ctx.drawImage(
+            layers.leftPaddle,
+            paddleOffset - margin,
+            data.players[0].paddle_y - paddleHeight / 2 - margin
+        );
+        ctx.drawImage(
+            layers.rightPaddle,
+            canvas.width - paddleOffset - paddleWidth - margin,
+            data.players[1].paddle_y - paddleHeight / 2 - margin
+        );
+        
+        // Draw ball with enhanced effects
+        this.drawEnhancedBall(ctx, data.ball.x, data.ball.y, 10);
+        
+        if (this.pauseMessage && !this.practiceMode) {
+            ctx.fillStyle = 'rgba(10, 10, 15, 0.6)';
+            ctx.fillRect(0, canvas.height / 2 - 40, canvas.width, 80);
+            ctx.fillStyle = '#00f3ff';
+            ctx.font = "bold 28px 'Courier New', monospace";
+            ctx.textAlign = 'center';
+            ctx.textBaseline = 'middle';
+            ctx.fillText(this.pauseMessage, canvas.width / 2, canvas.height / 2);
         }
     }
     
@@ -870,7 +1090,7 @@ class NetPongClient {
             this.currentInput = newInput;
             
             // Only send to server if not in practice mode
-            if (!this.practiceMode && this.ws && this.ws.readyState === WebSocket.OPEN) {
+            if (!this.practiceMode && this.isConnected()) {
                 this.send({
                     type: 'paddle_input',
                     direction: newInput
@@ -882,6 +1102,11 @@ class NetPongClient {
     // ===== LATENCY TRACKING =====
     
     startPingInterval() {
+        if (this.netWorker) {
+            this.netWorker.postMessage({ cmd: 'startPing', intervalMs: 1000 });
+            return;
+        }
+        
         // Send ping every second
         this.pingInterval = setInterval(() => {
             this.send({
@@ -892,12 +1117,74 @@ class NetPongClient {
     }
     
     stopPingInterval() {
+        if (this.netWorker) {
+            this.netWorker.postMessage({ cmd: 'stopPing' });
+        }
         if (this.pingInterval) {
             clearInterval(this.pingInterval);
             this.pingInterval = null;
         }
     }
     
+    applyTrajectory(data) {
+        const arrivedAt = data.received_at || Date.now();
+        // Play segments back on the same delay frames would have had (the
+        // best one-way latency), so a bounce's segment is normally here
+        // before the ball reaches the wall; without clock sync, use arrival
+        let start = arrivedAt;
+        if (this.clock.ready && data.server_time) {
+            start = this.clock.toLocalTime(data.server_time) + this.clock.delay / 2;
+        }
+        
+        if (!this.trajectory) {
+            this.trajectory = { ball: null, paddles: [] };
+        }
+        if (data.ball) {
+            this.trajectory.ball = { ...data.ball, start };
+        }
+        for (const paddle of data.paddles || []) {
+            this.trajectory.paddles[paddle.slot] = { y: paddle.y, vy: paddle.vy, start };
+        }
+        
+        // Names and ids come with keyframes; until the first one, just collect
+        if (!this.gameState || !this.gameState.players) return;
+        
+        // Run the new segment through the usual path for sounds and the HUD
+        const state = {
+            ...this.gameState,
+            ball: { ...this.gameState.ball },
+            players: this.gameState.players.map(p => ({ ...p })),
+            server_time: data.server_time,
+            received_at: arrivedAt
+        };
+        if (data.ball) {
+            Object.assign(state.ball, data.ball);
+        }
+        (data.scores || []).forEach((score, slot) => {
+            if (state.players[slot]) state.players[slot].score = score;
+        });
+        this.updateGameState(state);
+    }
+    
+    extrapolateTrajectory(state, now) {
+        // Ball and paddles move in straight lines between segments; clamp to
+        // the court in case a bounce's segment is running late
+        const { ball, paddles } = this.trajectory;
+        if (ball && state.ball) {
+            const elapsed = (now - ball.start) / 1000;
+            const radius = 10;
+            state.ball.x = ball.x + ball.vx * elapsed;
+            state.ball.y = Math.max(radius, Math.min(600 - radius, ball.y + ball.vy * elapsed));
+        }
+        paddles.forEach((paddle, slot) => {
+            const player = paddle && state.players && state.players[slot];
+            if (!player) return;
+            const elapsed = (now - paddle.start) / 1000;
+            const half = 50;
+            player.paddle_y = Math.max(half, Math.min(600 - half, paddle.y + paddle.vy * elapsed));
+        });
+    }
+    
     // ===== GAME LOOP =====
     
     startGameLoop() {
@@ -927,6 +1214,9 @@ class NetPongClient {
             
             // Render current game state if available (or local state for practice mode)
             const stateToRender = this.practiceMode ? this.localGameState : this.gameState;
+            if (stateToRender && !this.practiceMode && this.trajectory) {
+                this.extrapolateTrajectory(stateToRender, performance.timeOrigin + performance.now());
+            }
             if (stateToRender) {
                 try {
                     this.render(stateToRender);
@@ -975,10 +1265,8 @@ class NetPongClient {
         const now = Date.now();
         const latency = now - data.client_timestamp;
         
-        this.latencySamples.push(latency);
-        if (this.latencySamples.length > 20) {
-            this.latencySamples.shift();
-        }
+        this.recordLatency(latency);
+        this.clock.addSample(data.client_timestamp, data.server_received_ms, data.server_sent_ms, now);
         
         // Send latency update to server
         this.send({
@@ -987,11 +1275,19 @@ class NetPongClient {
         });
     }
     
+    recordLatency(latency) {
+        this.latencySamples.push(latency);
+        if (this.latencySamples.length > 20) {
+            this.latencySamples.shift();
+        }
+    }
+    
     // ===== GAME OVER =====
     
     handleGameOver(data) {
         this.stopPingInterval();
         this.stopGameLoop();
+        this.roomCode = null;
         
         const winnerText = document.getElementById('winner-text');
         winnerText.textContent = `${data.winner} WINS!`;
@@ -1009,6 +1305,7 @@ class NetPongClient {
     }
     
     handlePlayerDisconnect() {
+        this.roomCode = null;
         this.stopPingInterval();
         alert('Opponent disconnected');
         this.showScreen('menu');
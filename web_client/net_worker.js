@@ -0,0 +1,175 @@
+// NetPong 2025 - Network Worker
+// Owns the WebSocket, JSON decoding, ping timer and snapshot buffering so the
+// main thread only has to draw. Snapshots are packed into Float64Arrays and
+// handed over as transferable buffers; the main thread returns each buffer
+// after reading it, and while none is free only the newest snapshot is kept.
+
+importScripts('clock_sync.js');
+
+// Snapshot layout (Float64Array)
+const SNAPSHOT_FIELDS = {
+    FRAME: 0,
+    BALL_X: 1,
+    BALL_Y: 2,
+    BALL_VX: 3,
+    BALL_VY: 4,
+    P1_Y: 5,
+    P1_SCORE: 6,
+    P1_LATENCY: 7,
+    P2_Y: 8,
+    P2_SCORE: 9,
+    P2_LATENCY: 10,
+    PLAYER_COUNT: 11,
+    RECEIVED_AT: 12,
+    SERVER_TIME: 13,
+    LENGTH: 14
+};
+
+let ws = null;
+let pingTimer = null;
+const clock = new ClockSync();
+
+// Two buffers ping-pong between worker and main thread
+const freeBuffers = [
+    new ArrayBuffer(SNAPSHOT_FIELDS.LENGTH * 8),
+    new ArrayBuffer(SNAPSHOT_FIELDS.LENGTH * 8)
+];
+const staging = new Float64Array(SNAPSHOT_FIELDS.LENGTH);
+let stagingDirty = false;
+
+// Rarely-changing parts of the state (names, ids, phase) go as plain objects
+let lastMetaKey = '';
+let pendingMeta = null;
+
+function connect(url) {
+    if (ws) {
+        ws.onclose = null;
+        ws.close();
+    }
+
+    ws = new WebSocket(url);
+
+    ws.onopen = () => postMessage({ kind: 'open' });
+
+    ws.onmessage = (event) => {
+        const data = JSON.parse(event.data);
+
+        if (data.type === 'game_state') {
+            stageSnapshot(data);
+        } else if (data.type === 'pong') {
+            handlePong(data);
+        } else if (data.type === 'trajectory') {
+            // Segments are rare and tiny; just stamp when they got here
+            data.received_at = performance.timeOrigin + performance.now();
+            postMessage({ kind: 'message', data });
+        } else {
+            postMessage({ kind: 'message', data });
+        }
+    };
+
+    ws.onerror = () => postMessage({ kind: 'error' });
+
+    ws.onclose = () => {
+        stopPing();
+        postMessage({ kind: 'close' });
+    };
+}
+
+function send(data) {
+    if (ws && ws.readyState === WebSocket.OPEN) {
+        ws.send(JSON.stringify(data));
+    }
+}
+
+function stageSnapshot(data) {
+    const F = SNAPSHOT_FIELDS;
+    const players = data.players || [];
+
+    staging[F.FRAME] = data.frame || 0;
+    staging[F.BALL_X] = data.ball.x;
+    staging[F.BALL_Y] = data.ball.y;
+    staging[F.BALL_VX] = data.ball.vx;
+    staging[F.BALL_VY] = data.ball.vy;
+    staging[F.PLAYER_COUNT] = players.length;
+    staging[F.RECEIVED_AT] = performance.timeOrigin + performance.now();
+    staging[F.SERVER_TIME] = data.server_time || 0;
+
+    if (players.length >= 2) {
+        staging[F.P1_Y] = players[0].paddle_y;
+        staging[F.P1_SCORE] = players[0].score;
+        staging[F.P1_LATENCY] = players[0].latency_ms;
+        staging[F.P2_Y] = players[1].paddle_y;
+        staging[F.P2_SCORE] = players[1].score;
+        staging[F.P2_LATENCY] = players[1].latency_ms;
+    }
+
+    const meta = {
+        state: data.state,
+        players: players.map(p => ({ id: p.id, name: p.name }))
+    };
+    const metaKey = JSON.stringify(meta);
+    if (metaKey !== lastMetaKey) {
+        lastMetaKey = metaKey;
+        pendingMeta = meta;
+    }
+
+    stagingDirty = true;
+    flushSnapshot();
+}
+
+function flushSnapshot() {
+    if (!stagingDirty || freeBuffers.length === 0) return;
+
+    const buffer = freeBuffers.pop();
+    new Float64Array(buffer).set(staging);
+    stagingDirty = false;
+
+    postMessage({ kind: 'state', buffer, meta: pendingMeta }, [buffer]);
+    pendingMeta = null;
+}
+
+function startPing(intervalMs) {
+    stopPing();
+    pingTimer = setInterval(() => {
+        send({ type: 'ping', timestamp: Date.now() });
+    }, intervalMs);
+}
+
+function stopPing() {
+    if (pingTimer) {
+        clearInterval(pingTimer);
+        pingTimer = null;
+    }
+}
+
+function handlePong(data) {
+    const now = Date.now();
+    const latency = now - data.client_timestamp;
+    clock.addSample(data.client_timestamp, data.server_received_ms, data.server_sent_ms, now);
+    send({ type: 'latency_update', latency_ms: latency });
+    postMessage({ kind: 'latency', latency, clock: clock.export() });
+}
+
+onmessage = (event) => {
+    const msg = event.data;
+
+    switch (msg.cmd) {
+        case 'connect':
+            connect(msg.url);
+            break;
+        case 'send':
+            send(msg.data);
+            break;
+        case 'startPing':
+            startPing(msg.intervalMs || 1000);
+            break;
+        case 'stopPing':
+            stopPing();
+            break;
+        case 'release':
+            // Main thread finished reading a snapshot buffer
+            freeBuffers.push(msg.buffer);
+            flushSnapshot();
+            break;
+    }
+};
@@ -1,228 +1,183 @@
 // Sound Effects for NetPong
 // Simple Web Audio API implementation
+//
+// Every effect is rendered once, at init, into an AudioBuffer through an
+// OfflineAudioContext; playing it during a match is a single buffer-source
+// start into a shared volume node, instead of a new oscillator graph per hit.
+
+// Envelopes are rendered at this volume; the output gain scales from there
+const RENDER_VOLUME = 0.3;
+
+// note: { freq, start, duration } (seconds); gain is relative to the volume
+const SOUND_SPECS = {
+    paddleHit: { type: 'square', gain: 1, notes: [{ freq: 440, start: 0, duration: 0.1 }] }, // A4
+    wallHit: { type: 'square', gain: 0.5, notes: [{ freq: 880, start: 0, duration: 0.08 }] }, // A5 (higher)
+    // Score sound - ascending notes, C5, E5, G5
+    score: {
+        type: 'sine',
+        gain: 0.7,
+        notes: [523.25, 659.25, 783.99].map((freq, i) => ({ freq, start: i * 0.1, duration: 0.2 }))
+    },
+    countdown: { type: 'sine', gain: 1, notes: [{ freq: 600, start: 0, duration: 0.15 }] },
+    // Victory fanfare, C5 E5 G5 C6
+    victory: { type: 'triangle', gain: 1, notes: sequence(0, [[523.25, 0.2], [659.25, 0.2], [783.99, 0.2], [1046.50, 0.4]]) },
+    // Welcome/Intro sound - retro startup, C4 E4 G4 C5 E5 C5
+    intro: {
+        type: 'square',
+        gain: 0.6,
+        notes: sequence(0.1, [[261.63, 0.15], [329.63, 0.15], [392.00, 0.15], [523.25, 0.15], [659.25, 0.3], [523.25, 0.3]])
+    },
+    menuClick: { type: 'square', gain: 0.4, notes: [{ freq: 800, start: 0, duration: 0.08 }] },
+    menuHover: { type: 'sine', gain: 0.2, notes: [{ freq: 600, start: 0, duration: 0.05 }] } // Subtle
+};
+
+// Back-to-back notes from [freq, duration] pairs
+function sequence(start, pairs) {
+    let time = start;
+    return pairs.map(([freq, duration]) => {
+        const note = { freq, start: time, duration };
+        time += duration;
+        return note;
+    });
+}
 
 class SoundManager {
     constructor() {
         this.audioContext = null;
-        this.sounds = {};
+        this.output = null;
+        this.buffers = {};
+        this.ready = null;
+        this.rendered = false;
         this.enabled = true;
         this.volume = 0.3;
-        
+
         // Initialize on user interaction (required by browsers)
         this.initialized = false;
     }
-    
+
     init() {
         if (this.initialized) return;
-        
+
         try {
             this.audioContext = new (window.AudioContext || window.webkitAudioContext)();
+            this.output = this.audioContext.createGain();
+            this.output.gain.value = this.volume / RENDER_VOLUME;
+            this.output.connect(this.audioContext.destination);
             this.initialized = true;
+            this.ready = this.prerender();
             console.log('🔊 Sound system initialized');
         } catch (e) {
             console.warn('Web Audio API not supported:', e);
             this.enabled = false;
         }
     }
-    
+
+    // Render every effect into a buffer, all in parallel
+    async prerender() {
+        try {
+            await Promise.all(Object.entries(SOUND_SPECS).map(async ([name, spec]) => {
+                this.buffers[name] = await this.render(spec);
+            }));
+        } catch (e) {
+            console.warn('Could not pre-render sounds:', e);
+        }
+        this.rendered = true;
+    }
+
+    render(spec) {
+        const Offline = window.OfflineAudioContext || window.webkitOfflineAudioContext;
+        const rate = this.audioContext.sampleRate;
+        const end = Math.max(...spec.notes.map(note => note.start + note.duration));
+        const offline = new Offline(1, Math.ceil(end * rate), rate);
+
+        spec.notes.forEach(note => {
+            const oscillator = offline.createOscillator();
+            const gainNode = offline.createGain();
+
+            oscillator.connect(gainNode);
+            gainNode.connect(offline.destination);
+
+            oscillator.frequency.value = note.freq;
+            oscillator.type = spec.type;
+
+            gainNode.gain.setValueAtTime(RENDER_VOLUME * spec.gain, note.start);
+            gainNode.gain.exponentialRampToValueAtTime(0.01, note.start + note.duration);
+
+            oscillator.start(note.start);
+            oscillator.stop(note.start + note.duration);
+        });
+
+        // Older WebKit fires oncomplete instead of returning a promise
+        return new Promise((resolve, reject) => {
+            offline.oncomplete = (e) => resolve(e.renderedBuffer);
+            const rendering = offline.startRendering();
+            if (rendering) rendering.then(resolve, reject);
+        });
+    }
+
+    play(name) {
+        if (!this.enabled || !this.initialized) return;
+
+        const buffer = this.buffers[name];
+        if (!buffer) {
+            // Only right after init, while rendering is still under way
+            if (!this.rendered) this.ready.then(() => this.play(name));
+            return;
+        }
+
+        const source = this.audioContext.createBufferSource();
+        source.buffer = buffer;
+        source.connect(this.output);
+        source.start();
+    }
+
     // Generate beep sound for paddle hit
     playPaddleHit() {
-        if (!this.enabled || !this.initialized) return;
-        
-        const oscillator = this.audioContext.createOscillator();
-        const gainNode = this.audioContext.createGain();
-        
-        oscillator.connect(gainNode);
-        gainNode.connect(this.audioContext.destination);
-        
-        oscillator.frequency.value = 440; // A4 note
-        oscillator.type = 'square';
-        
-        gainNode.gain.setValueAtTime(this.volume, this.audioContext.currentTime);
-        gainNode.gain.exponentialRampToValueAtTime(0.01, this.audioContext.currentTime + 0.1);
-        
-        oscillator.start(this.audioContext.currentTime);
-        oscillator.stop(this.audioContext.currentTime + 0.1);
+        this.play('paddleHit');
     }
-    
+
     // Generate higher pitch for wall hit
     playWallHit() {
-        if (!this.enabled || !this.initialized) return;
-        
-        const oscillator = this.audioContext.createOscillator();
-        const gainNode = this.audioContext.createGain();
-        
-        oscillator.connect(gainNode);
-        gainNode.connect(this.audioContext.destination);
-        
-        oscillator.frequency.value = 880; // A5 note (higher)
-        oscillator.type = 'square';
-        
-        gainNode.gain.setValueAtTime(this.volume * 0.5, this.audioContext.currentTime);
-        gainNode.gain.exponentialRampToValueAtTime(0.01, this.audioContext.currentTime + 0.08);
-        
-        oscillator.start(this.audioContext.currentTime);
-        oscillator.stop(this.audioContext.currentTime + 0.08);
+        this.play('wallHit');
     }
-    
-    // Score sound - ascending notes
+
     playScore() {
-        if (!this.enabled || !this.initialized) return;
-        
-        const notes = [523.25, 659.25, 783.99]; // C5, E5, G5
-        notes.forEach((freq, i) => {
-            const oscillator = this.audioContext.createOscillator();
-            const gainNode = this.audioContext.createGain();
-            
-            oscillator.connect(gainNode);
-            gainNode.connect(this.audioContext.destination);
-            
-            oscillator.frequency.value = freq;
-            oscillator.type = 'sine';
-            
-            const startTime = this.audioContext.currentTime + (i * 0.1);
-            gainNode.gain.setValueAtTime(this.volume * 0.7, startTime);
-            gainNode.gain.exponentialRampToValueAtTime(0.01, startTime + 0.2);
-            
-            oscillator.start(startTime);
-            oscillator.stop(startTime + 0.2);
-        });
+        this.play('score');
     }
-    
+
     // Game start countdown beeps
     playCountdown() {
-        if (!this.enabled || !this.initialized) return;
-        
-        const oscillator = this.audioContext.createOscillator();
-        const gainNode = this.audioContext.createGain();
-        
-        oscillator.connect(gainNode);
-        gainNode.connect(this.audioContext.destination);
-        
-        oscillator.frequency.value = 600;
-        oscillator.type = 'sine';
-        
-        gainNode.gain.setValueAtTime(this.volume, this.audioContext.currentTime);
-        gainNode.gain.exponentialRampToValueAtTime(0.01, this.audioContext.currentTime + 0.15);
-        
-        oscillator.start(this.audioContext.currentTime);
-        oscillator.stop(this.audioContext.currentTime + 0.15);
+        this.play('countdown');
     }
-    
-    // Victory fanfare
+
     playVictory() {
-        if (!this.enabled || !this.initialized) return;
-        
-        const melody = [
-            { freq: 523.25, duration: 0.2 }, // C5
-            { freq: 659.25, duration: 0.2 }, // E5
-            { freq: 783.99, duration: 0.2 }, // G5
-            { freq: 1046.50, duration: 0.4 } // C6
-        ];
-        
-        let time = this.audioContext.currentTime;
-        melody.forEach(note => {
-            const oscillator = this.audioContext.createOscillator();
-            const gainNode = this.audioContext.createGain();
-            
-            oscillator.connect(gainNode);
-            gainNode.connect(this.audioContext.destination);
-            
-            oscillator.frequency.value = note.freq;
-            oscillator.type = 'triangle';
-            
-            gainNode.gain.setValueAtTime(this.volume, time);
-            gainNode.gain.exponentialRampToValueAtTime(0.01, time + note.duration);
-            
-            oscillator.start(time);
-            oscillator.stop(time + note.duration);
-            
-            time += note.duration;
-        });
+        this.play('victory');
     }
-    
-    // Welcome/Intro sound - retro startup
+
     playIntro() {
-        if (!this.enabled || !this.initialized) return;
-        
-        const introMelody = [
-            { freq: 261.63, duration: 0.15 }, // C4
-            { freq: 329.63, duration: 0.15 }, // E4
-            { freq: 392.00, duration: 0.15 }, // G4
-            { freq: 523.25, duration: 0.15 }, // C5
-            { freq: 659.25, duration: 0.3 },  // E5 (longer)
-            { freq: 523.25, duration: 0.3 }   // C5 (longer)
-        ];
-        
-        let time = this.audioContext.currentTime + 0.1;
-        introMelody.forEach(note => {
-            const oscillator = this.audioContext.createOscillator();
-            const gainNode = this.audioContext.createGain();
-            
-            oscillator.connect(gainNode);
-            gainNode.connect(this.audioContext.destination);
-            
-            oscillator.frequency.value = note.freq;
-            oscillator.type = 'square'; // Retro square wave
-            
-            gainNode.gain.setValueAtTime(this.volume * 0.6, time);
-            gainNode.gain.exponentialRampToValueAtTime(0.01, time + note.duration);
-            
-            oscillator.start(time);
-            oscillator.stop(time + note.duration);
-            
-            time += note.duration;
-        });
+        this.play('intro');
     }
-    
+
     // Menu button click sound
     playMenuClick() {
-        if (!this.enabled || !this.initialized) return;
-        
-        const oscillator = this.audioContext.createOscillator();
-        const gainNode = this.audioContext.createGain();
-        
-        oscillator.connect(gainNode);
-        gainNode.connect(this.audioContext.destination);
-        
-        oscillator.frequency.value = 800;
-        oscillator.type = 'square';
-        
-        gainNode.gain.setValueAtTime(this.volume * 0.4, this.audioContext.currentTime);
-        gainNode.gain.exponentialRampToValueAtTime(0.01, this.audioContext.currentTime + 0.08);
-        
-        oscillator.start(this.audioContext.currentTime);
-        oscillator.stop(this.audioContext.currentTime + 0.08);
+        this.play('menuClick');
     }
-    
-    // Menu hover sound (subtle)
+
     playMenuHover() {
-        if (!this.enabled || !this.initialized) return;
-        
-        const oscillator = this.audioContext.createOscillator();
-        const gainNode = this.audioContext.createGain();
-        
-        oscillator.connect(gainNode);
-        gainNode.connect(this.audioContext.destination);
-        
-        oscillator.frequency.value = 600;
-        oscillator.type = 'sine';
-        
-        gainNode.gain.setValueAtTime(this.volume * 0.2, this.audioContext.currentTime);
-        gainNode.gain.exponentialRampToValueAtTime(0.01, this.audioContext.currentTime + 0.05);
-        
-        oscillator.start(this.audioContext.currentTime);
-        oscillator.stop(this.audioContext.currentTime + 0.05);
+        this.play('menuHover');
     }
-    
+
     // Toggle sound on/off
     toggle() {
         this.enabled = !this.enabled;
         return this.enabled;
     }
-    
+
     setVolume(vol) {
         this.volume = Math.max(0, Math.min(1, vol));
+        if (this.output) {
+            this.output.gain.value = this.volume / RENDER_VOLUME;
+        }
     }
 }
 
@@ -0,0 +1,63 @@
+// Service worker for NetPong
+// Serves the client's static files from the cache straight away, so repeat
+// visits start without waiting on the network, and refreshes each file in the
+// background (stale-while-revalidate). A deploy is stored on the visit after
+// it goes live and used from the load after that; nothing needs bumping.
+
+const CACHE_NAME = 'netpong-shell-v2'; // Change only if the cached layout changes
+const ASSETS = [
+    './',
+    'index.html',
+    'style.css',
+    'config.js',
+    'sounds.js',
+    'clock_sync.js',
+    'game.js',
+    'net_worker.js'
+];
+
+self.addEventListener('install', (event) => {
+    event.waitUntil(
+        caches.open(CACHE_NAME)
+            // 'reload' skips the HTTP cache so the offline copy starts out current
+            .then(cache => cache.addAll(ASSETS.map(url => new Request(url, { cache: 'reload' }))))
+            .then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener('activate', (event) => {
+    event.waitUntil(
+        caches.keys()
+            .then(keys => Promise.all(
+                keys.filter(key => key.startsWith('netpong-') && key !== CACHE_NAME)
+                    .map(key => caches.delete(key))
+            ))
+            .then(() => self.clients.claim())
+    );
+});
+
+self.addEventListener('fetch', (event) => {
+    const request = event.request;
+    const url = new URL(request.url);
+    // API calls and the WebSocket go to the game server; only our own files are cached
+    if (request.method !== 'GET' || url.origin !== self.location.origin) return;
+
+    // Any page navigation is the app shell (Netlify rewrites /* to index.html too)
+    const key = request.mode === 'navigate' ? 'index.html' : url.pathname.split('/').pop();
+    if (!ASSETS.includes(key)) return;
+
+    event.respondWith(staleWhileRevalidate(event, request, key));
+});
+
+function staleWhileRevalidate(event, request, key) {
+    const network = fetch(request);
+    // Refresh the cached copy in the background; the clone is taken as soon as
+    // the response arrives, before the page reads the body. waitUntil keeps
+    // the worker alive until the write lands.
+    event.waitUntil(network.then((response) => {
+        if (!response.ok) return;
+        const copy = response.clone();
+        return caches.open(CACHE_NAME).then(cache => cache.put(key, copy));
+    }).catch(() => {}));
+    return caches.match(key, { cacheName: CACHE_NAME }).then(cached => cached || network);
+}